@@ -1,24 +1,22 @@
-import os
-import io
+import base64
+import hashlib
 import json
-import re
-import wave
-from pathlib import Path
-from typing import Dict, List
+import os
 
 import streamlit as st
-import requests
-from gtts import gTTS
-from pydub import AudioSegment
-from rapidfuzz import fuzz
+import streamlit.components.v1 as components
+
+from language import GREETING, reply_language   # light: thin-client mode never imports engine
+from ollama_client import DEFAULT_LLM
+from scheduler import Busy
 
 
 # =========================================================
 # CONFIG
 # =========================================================
-MODEL_DIR = Path("models")
-OLLAMA_URL = "http://127.0.0.1:11434/api/generate"
-DEFAULT_LLM = "llama3.2:1b"
+# Set to e.g. http://127.0.0.1:8765 to use a running `uvicorn service:app`;
+# unset, the pipeline runs inside this Streamlit process.
+SERVICE_URL = os.environ.get("RIVERWOOD_SERVICE", "")
 
 
 # =========================================================
@@ -146,42 +144,26 @@ h3 {
 
 
 # =========================================================
-# DEFAULT PROJECT MEMORY
+# ENGINE (in-process, or the headless service over HTTP)
 # =========================================================
-DEFAULT_PROJECT = {
-    "project_name": "Riverwood Residences – Tower A",
-    "overall_progress": "48%",
-    "milestones": [
-        "Foundation and raft completed",
-        "Ground + 3 slabs poured",
-        "Blockwork up to Level 2 finished",
-        "MEP rough-ins started at Level 1",
-    ],
-    "materials": {
-        "cement": "Sufficient for next 10 days",
-        "steel": "Next lot arriving tomorrow 11 AM",
-        "bricks": "Stock for 7 days; fresh order placed",
-        "tiles": "Shortlisted; vendor confirmation pending"
-    },
-    "delays": ["One-day slip due to heavy rain last week", "Tile vendor sample re-approval pending"],
-    "safety": ["Daily toolbox talk at 9 AM", "PPE compliance at 97%", "Scaffold tag checks completed"],
-    "team": {"site_engineer": "Asha Kulkarni", "contractor": "Rao Constructions", "electricians": 8, "masons": 24, "carpenters": 14},
-    "next_steps": ["Slab shuttering for Level 4", "Brickwork Level 3", "Electrical conduits Level 2", "Lift shaft shuttering"],
-    "site_hours": "Mon–Sat · 8:00–18:00",
-    "contact": "site@riverwoodhomes.in · +91-98765-43210",
-    "weather_note": "Light showers possible later today; concreting planned before 4 PM."
-}
+@st.cache_resource(show_spinner=False)
+def get_engine():
+    if SERVICE_URL:
+        from engine_client import RemoteEngine
+        return RemoteEngine(SERVICE_URL).start()
+    from engine import VoiceEngine
+    return VoiceEngine().start()
+
+
+ENGINE = get_engine()
 
 
 
 # =========================================================
 # SESSION STATE INIT
 # =========================================================
-if "project_mem" not in st.session_state:
-    st.session_state.project_mem = DEFAULT_PROJECT.copy()
-
-if "chat_history" not in st.session_state:
-    st.session_state.chat_history: List[Dict[str, str]] = []
+if "sid" not in st.session_state:
+    st.session_state.sid = ENGINE.new_session()
 
 if "transcript" not in st.session_state:
     st.session_state.transcript = ""
@@ -195,213 +177,216 @@ if "last_audio" not in st.session_state:
 if "show_transcription" not in st.session_state:
     st.session_state.show_transcription = False
 
+if "live_audio_id" not in st.session_state:
+    st.session_state.live_audio_id = None
 
-
-# =========================================================
-# AUDIO HELPERS
-# =========================================================
-def to_wav_16k(raw: bytes):
-    audio = AudioSegment.from_file(io.BytesIO(raw))
-    audio = audio.set_channels(1).set_frame_rate(16000).set_sample_width(2)
-    buf = io.BytesIO()
-    audio.export(buf, format="wav")
-    return buf.getvalue()
-
-
-@st.cache_resource(show_spinner=False)
-def load_vosk_model(lang):
-    from vosk import Model
-    path = MODEL_DIR / (
-        "vosk-model-small-hi-0.22" if lang == "hi"
-        else "vosk-model-small-en-in-0.4"
-    )
-    return Model(str(path))
-
-
-def transcribe_vosk(lang, wav_bytes):
-    from vosk import KaldiRecognizer
-    with wave.open(io.BytesIO(wav_bytes), "rb") as wf:
-        rec = KaldiRecognizer(load_vosk_model(lang), wf.getframerate())
-        text = ""
-        while True:
-            data = wf.readframes(4000)
-            if not data: break
-            if rec.AcceptWaveform(data):
-                text += json.loads(rec.Result()).get("text", "") + " "
-        text += json.loads(rec.FinalResult()).get("text", "")
-    return text.strip()
-
-
-
-def speak(text, lang="en"):
-    tts = gTTS(text=text, lang=lang, slow=False)
-    buf = io.BytesIO()
-    tts.write_to_fp(buf)
-    buf.seek(0)
-    return buf.read()
+state = ENGINE.state(st.session_state.sid)
 
 
 
 # =========================================================
-# INTENT ENGINE (improved fuzzy)
+# STREAMED REPLY RENDERING
 # =========================================================
-STOP = set("the a an is are was were be been to for on in at from of with and or as what tell give show how when where who which do does can please kindly".split())
-
-REPL = {
-    "updation": "update",
-    "constructions": "construction",
-    "material": "materials",
-    "safety update": "safety",
-    "worksite": "site",
+# Play queue living in the page (the component iframes share its origin):
+# each sentence is appended as it arrives and played when the previous ends.
+# The player is created in the parent window so it outlives the iframe.
+PLAY_QUEUE_JS = """
+const w = window.parent;
+if (!w.riverwoodPlay) {
+  w.riverwoodPlay = new w.Function("clip", "first", `
+    const q = window.riverwoodQueue = window.riverwoodQueue || {clips: [], audio: null};
+    if (first) { q.clips = []; if (q.audio) q.audio.pause(); q.audio = null; }
+    q.clips.push(clip);
+    const next = () => {
+      const src = q.clips.shift();
+      q.audio = src ? new Audio(src) : null;
+      if (q.audio) { q.audio.onended = next; q.audio.play().catch(next); }
+    };
+    if (!q.audio) next();
+  `);
 }
+w.riverwoodPlay(%s, %s);
+"""
 
-INTENTS = {
-    "daily_update": ["construction update", "project update", "progress", "status", "what happened today"],
-    "delays": ["delay", "blocked", "stuck", "issue"],
-    "materials": ["materials", "cement", "steel", "brick", "tiles", "delivery"],
-    "next_steps": ["next step", "tomorrow", "upcoming"],
-    "team": ["team", "workforce", "workers"],
-    "safety": ["safety", "ppe", "scaffold"],
-    "weather": ["weather", "rain", "hot", "wind"],
-    "percentage": ["percentage", "overall progress"],
-    "contacts": ["contact", "reach"],
-    "site_hours": ["site hours", "timings", "working hours"],
-}
-
-
-def normalize(t):
-    t = t.lower()
-    t = re.sub(r"[^\w\s]", " ", t)
-    for k, v in REPL.items(): t = t.replace(k, v)
-    return " ".join([w for w in t.split() if w not in STOP])
-
-
-def detect_intent(text):
-    t = normalize(text)
-    best, score = "daily_update", 0
-    for intent, keys in INTENTS.items():
-        for k in keys:
-            sc = fuzz.partial_ratio(t, k)
-            if sc > score:
-                score, best = sc, intent
-    return best
-
-
-
-# =========================================================
-# TEMPLATES
-# =========================================================
-def template_answer(intent, mem, lang):
-    hi = (lang == "hi")
-
-    if intent == "daily_update":
-        return (
-            f"{'नमस्ते!' if hi else 'Hello!'} "
-            f"{'आज का अपडेट —' if hi else 'Here is today update —'} "
-            f"{mem['project_name']} · {mem['overall_progress']} complete. "
-            f"{mem['milestones'][0]}, {mem['milestones'][1]}. "
-            f"{mem['weather_note']}"
-        )
-
-    if intent == "materials":
-        m = mem["materials"]
-        return f"Materials: Cement {m['cement']}, Steel {m['steel']}, Bricks {m['bricks']}, Tiles {m['tiles']}."
-
-    if intent == "delays":
-        return "Delays: " + ", ".join(mem["delays"]) if mem["delays"] else "No major delays."
-
-    if intent == "team":
-        t = mem["team"]
-        return f"Team on site: {t['masons']} masons, {t['carpenters']} carpenters, {t['electricians']} electricians."
 
-    if intent == "next_steps":
-        return "Next steps: " + "; ".join(mem["next_steps"])
+def queue_clip(data, mime, seq):
+    """Append one clip to the page's play queue; seq 0 starts a new reply."""
+    src = f"data:{mime};base64,{base64.b64encode(data).decode()}"
+    components.html(f"<script>{PLAY_QUEUE_JS % (json.dumps(src), json.dumps(seq == 0))}</script>", height=0)
 
-    if intent == "safety":
-        return "Safety measures: " + "; ".join(mem["safety"])
 
-    if intent == "weather":
-        return mem["weather_note"]
+def stream_reply(user_text, lang, backend=None):
+    """Render tokens into the response card and play each sentence as it arrives.
 
-    if intent == "percentage":
-        return f"Overall progress: {mem['overall_progress']}"
+    Consumes ENGINE.reply_events to the end. Clips play back to back through
+    the page's play queue and stay listed as players for replay.
+    Returns (text, audio bytes).
+    """
+    st.markdown("---")
+    st.markdown("### ✅ Miss Riverwood says:")
+    card = st.empty()
+    players = st.container()
 
-    if intent == "contacts":
-        return "Contact: " + mem["contact"]
+    text, final = "", None
+    for ev in ENGINE.reply_events(st.session_state.sid, user_text, lang, backend):
+        if ev["type"] == "token":
+            text += ev["text"]
+            card.markdown(f"<div class='card'>{text}▌</div>", unsafe_allow_html=True)
+        elif ev["type"] == "audio":
+            queue_clip(ev["data"], ev["mime"], ev["seq"])
+            players.audio(ev["data"], format=ev["mime"])
+        elif ev["type"] == "done":
+            card.markdown(f"<div class='card'>{ev['text']}</div>", unsafe_allow_html=True)
+            final = ev["text"], ev["audio"]
+    return final or (text.strip(), None)
 
-    if intent == "site_hours":
-        return "Site hours: " + mem["site_hours"]
 
-    return template_answer("daily_update", mem, lang)
+def show_route(state):
+    r = state["last_route"]
+    if not r:
+        return
+    facts = f" · {r['facts']} facts retrieved" if r.get("facts") else ""
+    ahead = " · 🔮 prepared ahead" if r.get("speculated") else ""
+    st.caption(f"{'⚡' if r['path'] in ('template', 'cache') else '🧠'} {r['path']} · intent `{r['intent']}` ({r['score']:.0f}){facts}{ahead}")
+    if r["path"] == "llm" and state["last_llm_stats"]:
+        s = state["last_llm_stats"]
+        st.caption(f"🧮 {s['prompt_tokens']} prompt tokens · prefill {s['prefill_ms']:.0f} ms · context {s['context_tokens']}")
 
 
 
 # =========================================================
-# LLM GENERATION WITH MEMORY
+# SIDEBAR
 # =========================================================
-def generate_answer(user_text, lang):
-    intent = detect_intent(user_text)
-    draft = template_answer(intent, st.session_state.project_mem, lang)
+st.sidebar.title("⚙️ Controls")
 
-    history = st.session_state.chat_history[-7:]
-    history_text = "\n".join([f"{h['role']}: {h['content']}" for h in history])
+lang_choice = st.sidebar.selectbox(
+    "Speech / Reply Language", ["Auto (Hindi / English)", "Indian English", "Hindi"],
+    help="Auto runs both speech models on the first seconds of audio and keeps the more confident one; replies follow the detected language.",
+)
+lang_key = {"Hindi": "hi", "Indian English": "en"}.get(lang_choice, "auto")
+if lang_key == "auto" and state["detected_lang"]:
+    scores = " · ".join(f"{l} {sc:.2f}" for l, sc in (state["lang_scores"] or {}).items())
+    st.sidebar.caption(f"🌐 Detected: **{'Hindi' if state['detected_lang'] == 'hi' else 'Indian English'}** ({scores})")
 
-    prompt = f"""
-You are Miss Riverwood, a friendly bilingual (Hindi/English) site assistant.
+st.sidebar.text_input("Ollama LLM", DEFAULT_LLM)
 
-Base memory:
-{json.dumps(st.session_state.project_mem, ensure_ascii=False)}
+settings = state["settings"]
+fast_path_score = st.sidebar.slider(
+    "⚡ Template fast-path confidence", 50, 101, int(settings["fast_path_score"]),
+    help="Intent score at which the template answer is returned without calling the LLM (101 = always use the LLM).",
+)
 
-Recent conversation:
-{history_text}
+tts_backend = st.sidebar.selectbox(
+    "Voice engine", ENGINE.backends(),
+    help="gTTS needs internet; espeak / pyttsx3 synthesize offline on this machine.",
+)
+tts_mime = ENGINE.mime(tts_backend)
 
-User asked: {user_text}
-Draft answer: {draft}
+live_stt = st.sidebar.toggle("🎧 Live transcription", value=True, help="Decode audio as soon as a recording arrives and show partial text while it runs.")
 
-Give a polished, short, helpful answer in the SAME LANGUAGE as the user.
-"""
+stream_replies = st.sidebar.toggle("⚡ Stream replies", value=True, help="Show text as it is generated and start speaking after the first sentence.")
 
-    try:
-        r = requests.post(
-            OLLAMA_URL,
-            json={"model": DEFAULT_LLM, "prompt": prompt, "stream": False},
-            timeout=60,
-        ).json()
+projects = {p["id"]: p for p in ENGINE.projects()}
+project_id = st.sidebar.selectbox(
+    "🏗️ Project", list(projects), index=list(projects).index(state["project_id"]),
+    format_func=lambda pid: projects[pid]["name"],
+)
+if project_id != state["project_id"]:
+    state = ENGINE.update_settings(st.session_state.sid, project_id=project_id)
 
-        final = r.get("response", draft)
+with st.sidebar.expander("🧠 Project Memory (edit)", expanded=False):
+    st.caption(f"Shared by every session · version {projects[state['project_id']]['version']}")
+    pm = dict(state["project_mem"])
+    pm["project_name"] = st.text_input("Project Name", pm["project_name"])
+    pm["overall_progress"] = st.text_input("Overall Progress", pm["overall_progress"])
+    pm["weather_note"] = st.text_area("Weather Note", pm["weather_note"])
+    pm["site_hours"] = st.text_input("Site Hours", pm["site_hours"])
+    pm["contact"] = st.text_input("Contact", pm["contact"])
 
-    except:
-        final = draft
+# Saved to the project store: every session sees the edit, old cached answers are dropped
+if pm != state["project_mem"]:
+    state = ENGINE.update_memory(st.session_state.sid, pm)
 
-    st.session_state.chat_history.append({"role": "user", "content": user_text})
-    st.session_state.chat_history.append({"role": "assistant", "content": final})
-    st.session_state.chat_history = st.session_state.chat_history[-12:]
+with st.sidebar.expander("📓 Site log", expanded=False):
+    log_entry = st.text_area("Today's entry", placeholder="e.g., Level 4 shuttering 60% done; crane idle 2 h for maintenance.")
+    if st.button("Add to log") and log_entry.strip():
+        state = ENGINE.add_site_log(st.session_state.sid, log_entry.strip())
+        st.caption("✅ Added — relevant entries are retrieved into answers.")
 
-    return final
+cache_similarity = st.sidebar.slider(
+    "♻️ Answer cache similarity", 50, 100, int(settings["cache_similarity"]),
+    help="How close a rephrased question must be to reuse a cached LLM answer.",
+)
+if (fast_path_score, cache_similarity) != (settings["fast_path_score"], settings["cache_similarity"]):
+    state = ENGINE.update_settings(
+        st.session_state.sid, fast_path_score=fast_path_score, cache_similarity=cache_similarity,
+    )
 
+engine_stats = ENGINE.stats()
+rc = engine_stats["response_cache"]
+st.sidebar.caption(
+    f"♻️ Answer cache · {rc['hits']} hits ({rc['fuzzy_hits']} fuzzy) / {rc['misses']} misses "
+    f"· {rc['hit_rate']:.0%} · {rc['items']} answers"
+)
 
+tts_stats = engine_stats["tts_cache"]
+st.sidebar.caption(f"🔊 TTS cache · {tts_stats['hits']} hits / {tts_stats['misses']} misses · {tts_stats['disk_items']} clips")
 
-# =========================================================
-# SIDEBAR
-# =========================================================
-st.sidebar.title("⚙️ Controls")
+spec = engine_stats["speculation"]
+if spec["enabled"]:
+    st.sidebar.caption(
+        f"🔮 Prepared ahead · {spec['hits']} hits / {spec['misses']} misses · {spec['hit_rate']:.0%} · "
+        f"{spec['wasted_share']:.0%} of {(spec['used_ms'] + spec['wasted_ms']) / 1000:.0f} s wasted"
+    )
 
-lang_choice = st.sidebar.selectbox("Speech / Reply Language", ["Indian English", "Hindi"])
-lang_key = "hi" if lang_choice == "Hindi" else "en"
+models = engine_stats["models"]
+host = models.get("host_stats") or {}
+st.sidebar.caption(
+    f"🧠 Vosk models · this process {models['rss_mb']} MB RSS · "
+    + (f"shared host {host.get('rss_mb', '?')} MB" if models["host"] else "loaded in-process")
+)
 
-st.sidebar.text_input("Ollama LLM", DEFAULT_LLM)
+for name, q in engine_stats["scheduler"].items():
+    st.sidebar.caption(
+        f"🚦 {name.upper()} · {q['running']}/{q['concurrency']} running · {q['depth']} queued · "
+        f"wait p50 {q['wait_p50_ms']:.0f} / p95 {q['wait_p95_ms']:.0f} ms · {q['rejected']} busy"
+    )
 
-with st.sidebar.expander("🧠 Project Memory (edit)", expanded=False):
-    pm = st.session_state.project_mem
-    pm["project_name"] = st.text_input("Project Name", pm["project_name"])
-    pm["overall_progress"] = st.text_input("Overall Progress", pm["overall_progress"])
-    pm["weather_note"] = st.text_area("Weather Note", pm["weather_note"])
-    pm["site_hours"] = st.text_input("Site Hours", pm["site_hours"])
-    pm["contact"] = st.text_input("Contact", pm["contact"])
-    st.session_state.project_mem = pm
+READY_ICON = {"pending": "⏸️", "loading": "⏳", "ready": "✅", "failed": "⚠️"}
+
+
+@st.fragment(run_every=None if engine_stats["startup"]["ready"] else 1)
+def show_readiness():
+    """Warm-up progress; polls once a second until everything has loaded."""
+    boot = ENGINE.stats()["startup"]
+    with st.expander("🚀 Startup " + ("· ready" if boot["ready"] else "· warming up…"), expanded=not boot["ready"]):
+        for name, t in boot["tasks"].items():
+            took = f" · {t['ms']:.0f} ms" if t["ms"] is not None else ""
+            at = f" (at +{t['start_s']:.1f} s)" if t["start_s"] is not None else ""
+            st.caption(f"{READY_ICON[t['state']]} {name}{took}{at}" + (f" — {t['error']}" if t["error"] else ""))
+        st.caption(f"Up {boot['uptime_s']:.0f} s")
+
+
+with st.sidebar:
+    show_readiness()
+
+traces = engine_stats["tracing"]
+with st.sidebar.expander("🔬 Latency traces", expanded=traces["enabled"]):
+    tracing_on = st.toggle("Trace every turn", value=traces["enabled"],
+                           help="Per-stage timings (decode, STT, intent, LLM, TTS); exported as JSONL when RIVERWOOD_TRACE is set.")
+    if tracing_on != traces["enabled"]:
+        traces = ENGINE.set_tracing(tracing_on)
+    if traces["stages"]:
+        st.dataframe(
+            [{"stage": k, "n": v["count"], "p50 ms": v["p50_ms"], "p95 ms": v["p95_ms"]} for k, v in traces["stages"].items()],
+            hide_index=True, use_container_width=True,
+        )
+        st.caption(f"{traces['turns']} turns · {traces['errors']} with errors" + (f" · → `{traces['path']}`" if traces["path"] else ""))
+    elif tracing_on:
+        st.caption("No traced turns yet.")
 
 if st.sidebar.button("🔁 Reset conversation"):
-    st.session_state.chat_history = []
+    ENGINE.reset(st.session_state.sid)
     st.session_state.transcript = ""
     st.session_state.last_response = ""
     st.session_state.last_audio = None
@@ -456,11 +441,8 @@ with colg1:
     st.write("**Hi! I'm Miss Riverwood — your friendly site buddy. Speak or type in Hinglish/English; I'll respond fast and clearly.**")
 with colg2:
     if st.button("▶️ Play Greeting"):
-        greeting_audio = speak(
-            "Namaste! Main Miss Riverwood hoon — aapke daily construction updates ki saathi. Aap Hindi ya English mix mein puch sakte ho, aur main turant jawab dungi.",
-            "hi"
-        )
-        st.audio(greeting_audio, format="audio/mp3")
+        greeting_audio = ENGINE.speak(GREETING, "hi", tts_backend)
+        st.audio(greeting_audio, format=tts_mime)
 
 
 
@@ -497,13 +479,47 @@ mode = st.selectbox("🔄 Mode", ["Voice", "Text"], label_visibility="collapsed"
 if mode == "Voice":
 
     st.markdown("### 🎙️ Record your voice")
+    boot = engine_stats["startup"]["tasks"]
+    if any(boot.get(f"vosk-{l}", {}).get("state") in ("pending", "loading") for l in ("hi", "en")):
+        st.caption("⏳ Speech models are still loading; the first transcription may take a few extra seconds.")
     audio_bytes = st.audio_input("Mic input")
+    live_caption = st.empty()
+
+    # Live mode: feed a new recording straight into the session recognizer
+    if live_stt and audio_bytes:
+        raw = audio_bytes.getvalue()
+        audio_id = hashlib.sha1(raw).hexdigest()
+        if audio_id != st.session_state.live_audio_id:
+            st.session_state.live_audio_id = audio_id
+            try:
+                text = ENGINE.transcribe(
+                    st.session_state.sid, raw, lang_key,
+                    on_partial=lambda t: live_caption.caption(f"🎧 {t}"),
+                )
+                if text:
+                    st.session_state.transcript = text
+                    st.session_state.show_transcription = True
+                    st.rerun()
+                else:
+                    live_caption.warning("⚠️ No speech detected. Please try again.")
+            except Busy as e:
+                st.session_state.live_audio_id = None   # retry on the next rerun
+                live_caption.warning(f"⏳ Miss Riverwood is busy with other requests, try again in ~{e.retry_after:.0f}s.")
+            except Exception as e:
+                live_caption.error(f"❌ Transcription error: {str(e)}")
 
     st.markdown("### 📝 Transcription")
     
     # Show transcription status
     if st.session_state.show_transcription and st.session_state.transcript:
         st.success(f"✅ Transcribed successfully!")
+        if state["last_vad"]:
+            v = state["last_vad"]
+            st.caption(f"🔇 {v['speech_s']:.1f} s of speech in {v['audio_s']:.1f} s · {v['skipped']:.0%} silence skipped")
+        if state["last_stt"]:
+            t = state["last_stt"]
+            detail = f"confidence {t['confidence']:.0%}" if t["confidence"] is not None else f"{t['corrections']} site-term corrections"
+            st.caption(f"🏗️ Decoded with {t['mode']} vocabulary · {detail}")
     
     # Editable text area - CRITICAL: No key, use default value from session state
     transcript_text = st.text_area(
@@ -528,8 +544,7 @@ if mode == "Voice":
         else:
             with st.spinner("🎧 Transcribing your voice..."):
                 try:
-                    wav16 = to_wav_16k(audio_bytes.getvalue())
-                    text = transcribe_vosk(lang_key, wav16)
+                    text = ENGINE.transcribe(st.session_state.sid, audio_bytes.getvalue(), lang_key)
                     
                     if text:
                         st.session_state.transcript = text
@@ -538,16 +553,30 @@ if mode == "Voice":
                     else:
                         st.warning("⚠️ No speech detected. Please try again.")
                         
+                except Busy as e:
+                    st.warning(f"⏳ Miss Riverwood is busy with other requests, try again in ~{e.retry_after:.0f}s.")
                 except Exception as e:
                     st.error(f"❌ Transcription error: {str(e)}")
 
     # Handle reply generation
+    streamed = False
     if generate_btn:
         # Use the current value from the text area (which includes any manual edits)
         final_text = transcript_text.strip()
         
         if final_text == "":
             st.warning("⚠️ Please transcribe voice first or type text in the box above.")
+        elif stream_replies:
+            # Update transcript with any manual edits
+            st.session_state.transcript = final_text
+            try:
+                # Tokens and per-sentence audio are rendered as they arrive
+                final, audio_response = stream_reply(final_text, lang_key, tts_backend)
+                st.session_state.last_response = final
+                st.session_state.last_audio = audio_response
+                streamed = True
+            except Exception as e:
+                st.error(f"❌ Generation error: {str(e)}")
         else:
             with st.spinner("🤔 Miss Riverwood is thinking..."):
                 try:
@@ -555,11 +584,11 @@ if mode == "Voice":
                     st.session_state.transcript = final_text
                     
                     # Generate response
-                    final = generate_answer(final_text, lang_key)
+                    final = ENGINE.reply(st.session_state.sid, final_text, lang_key, tts_backend)
                     st.session_state.last_response = final
                     
                     # Generate audio
-                    audio_response = speak(final, "hi" if lang_key=="hi" else "en")
+                    audio_response = ENGINE.speak(final, reply_language(final_text, lang_key), tts_backend)
                     st.session_state.last_audio = audio_response
                     
                     st.rerun()
@@ -568,13 +597,14 @@ if mode == "Voice":
                     st.error(f"❌ Generation error: {str(e)}")
     
     # Display response if available
-    if st.session_state.last_response:
+    if st.session_state.last_response and not streamed:
         st.markdown("---")
         st.markdown("### ✅ Miss Riverwood says:")
         st.markdown(f"<div class='card'>{st.session_state.last_response}</div>", unsafe_allow_html=True)
+        show_route(state)
         
         if st.session_state.last_audio:
-            st.audio(st.session_state.last_audio, format="audio/mp3")
+            st.audio(st.session_state.last_audio, format=tts_mime)
 
 
 
@@ -585,16 +615,25 @@ else:
     st.markdown("### ⌨️ Type your message")
     msg = st.text_input("Ask Miss Riverwood…", placeholder="e.g., What is the construction update today?")
 
+    streamed = False
     if st.button("🤖 Generate Reply", use_container_width=True):
         if msg.strip() == "":
             st.warning("⚠️ Please type something.")
+        elif stream_replies:
+            try:
+                final, audio_response = stream_reply(msg.strip(), lang_key, tts_backend)
+                st.session_state.last_response = final
+                st.session_state.last_audio = audio_response
+                streamed = True
+            except Exception as e:
+                st.error(f"❌ Generation error: {str(e)}")
         else:
             with st.spinner("🤔 Miss Riverwood is thinking..."):
                 try:
-                    final = generate_answer(msg.strip(), lang_key)
+                    final = ENGINE.reply(st.session_state.sid, msg.strip(), lang_key, tts_backend)
                     st.session_state.last_response = final
                     
-                    audio_response = speak(final, "hi" if lang_key=="hi" else "en")
+                    audio_response = ENGINE.speak(final, reply_language(msg, lang_key), tts_backend)
                     st.session_state.last_audio = audio_response
                     
                     st.rerun()
@@ -602,13 +641,14 @@ else:
                     st.error(f"❌ Generation error: {str(e)}")
     
     # Display response if available
-    if st.session_state.last_response:
+    if st.session_state.last_response and not streamed:
         st.markdown("---")
         st.markdown("### ✅ Miss Riverwood says:")
         st.markdown(f"<div class='card'>{st.session_state.last_response}</div>", unsafe_allow_html=True)
+        show_route(state)
         
         if st.session_state.last_audio:
-            st.audio(st.session_state.last_audio, format="audio/mp3")
+            st.audio(st.session_state.last_audio, format=tts_mime)
 
 
 st.markdown("---")
@@ -618,15 +658,22 @@ st.markdown("---")
 # =========================================================
 st.markdown("### 🗂️ Recent Conversation")
 
-if not st.session_state.chat_history:
+conv_state = ENGINE.state(st.session_state.sid)
+history, conv = conv_state["chat_history"], conv_state["conversation"]
+if conv["summary"]:
+    with st.expander(f"📜 Earlier in this conversation (~{conv['summary_tokens']} tokens)"):
+        st.markdown(conv["summary"])
+if not history:
     st.caption("No previous messages yet.")
 else:
-    for h in st.session_state.chat_history[-7:]:
+    st.caption(f"{conv['messages']} recent messages · ~{conv['tokens']}/{conv['budget']} tokens kept verbatim")
+    for h in history:
         icon = "👤" if h["role"] == "user" else "🤖"
         role_color = "#19c37d" if h["role"] == "assistant" else "#9db7c8"
+        tag = f" <small style='color:#9db7c8'>· {h['path']}</small>" if h.get("path") else ""
         st.markdown(
             f"<div style='padding:8px; margin:5px 0; border-left:3px solid {role_color};'>"
-            f"{icon} <strong>{h['role'].title()}:</strong> {h['content']}"
+            f"{icon} <strong>{h['role'].title()}:</strong> {h['content']}{tag}"
             f"</div>",
             unsafe_allow_html=True
         )
@@ -0,0 +1,331 @@
+"""Offline batch processing of voice-note backlogs.
+
+    python batch.py NOTES_DIR_OR_MANIFEST [-o results.jsonl] [--lang auto|en|hi]
+                    [--answer] [--decoders 2] [--recognizers 4] [--shared-models]
+                    [--parquet results.parquet]
+
+The input is a directory (searched recursively for audio files) or a
+manifest: .txt with one path per line, or .jsonl with {"path", "lang"?}.
+Files go through a multi-process pipeline with a bounded queue between
+each pair of stages:
+
+    decode + VAD (--decoders processes)
+      -> Vosk STT (--recognizers processes, models loaded once each)
+      -> intent (+ LLM answer with --answer) and the JSONL writer, in this process
+
+Each result is appended to the JSONL file as soon as it is ready. A rerun
+skips files that already have an "ok" record, so an interrupted batch
+resumes where it stopped and failed files are retried. Progress lines and
+the final summary report files/s and audio-hours processed per hour.
+
+Each recognizer process normally loads its own copy of the Vosk models.
+With --shared-models (or RIVERWOOD_MODEL_HOST pointing at a running host)
+they decode on one model host process instead, see model_host.py. The
+summary lists every recognizer's RSS and model-load time either way.
+"""
+import argparse
+import json
+import multiprocessing as mp
+import os
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+AUDIO_EXT = {".wav", ".ogg", ".opus", ".mp3", ".m4a", ".aac", ".amr", ".flac", ".webm"}
+QUEUE_DEPTH = 8          # items buffered between stages (backpressure on decoding)
+DONE = None              # end-of-stream marker on a stage queue
+
+
+
+# =========================================================
+# INPUT
+# =========================================================
+def load_jobs(src, lang):
+    """[(path, lang)] from a directory or a manifest."""
+    src = Path(src)
+    if src.is_dir():
+        return [(str(p), lang) for p in sorted(src.rglob("*")) if p.suffix.lower() in AUDIO_EXT]
+    jobs = []
+    for line in src.read_text(encoding="utf-8").splitlines():
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        if line.startswith("{"):
+            rec = json.loads(line)
+            path, job_lang = rec["path"], rec.get("lang", lang)
+        else:
+            path, job_lang = line, lang
+        if not os.path.isabs(path):
+            path = str(src.parent / path)
+        jobs.append((path, job_lang))
+    return jobs
+
+
+def completed(out):
+    """Paths that already have a successful record in the output file."""
+    done = set()
+    if out.exists():
+        for line in out.read_text(encoding="utf-8").splitlines():
+            try:
+                rec = json.loads(line)
+            except ValueError:
+                continue      # a line cut short by the interruption
+            if rec.get("status") == "ok":
+                done.add(rec["path"])
+    return done
+
+
+
+# =========================================================
+# STAGE WORKERS (separate processes)
+# =========================================================
+def decode_worker(jobs, stt_q):
+    """Read, decode to 16 kHz mono and VAD-trim each file."""
+    import vad
+    from engine import TARGET_RATE, to_pcm_16k
+    while True:
+        job = jobs.get()
+        if job is DONE:
+            stt_q.put(DONE)
+            return
+        path, lang = job
+        t0 = time.perf_counter()
+        try:
+            pcm = to_pcm_16k(Path(path).read_bytes())
+            segments, stats = vad.trim(pcm)
+        except Exception as e:
+            # sent down the pipeline, not straight to out_q, so it cannot
+            # arrive after the recognizers' end markers
+            stt_q.put({"path": path, "status": "error", "stage": "decode", "error": str(e)})
+            continue
+        stt_q.put({
+            "path": path, "lang": lang, "segments": segments, "vad": stats,
+            "audio_s": round(len(pcm) / TARGET_RATE, 2), "decode_ms": round((time.perf_counter() - t0) * 1000, 1),
+        })
+
+
+def stt_worker(stt_q, out_q):
+    """Transcribe decoded speech; each process loads each Vosk model once."""
+    import numpy as np
+    from engine import identify_language, recognizer_pool, transcribe_vosk
+    while True:
+        item = stt_q.get()
+        if item is DONE:
+            from engine import model_stats
+            out_q.put({"status": "worker", **model_stats()})
+            out_q.put(DONE)
+            return
+        if item.get("status") == "error":
+            out_q.put(item)
+            continue
+        t0 = time.perf_counter()
+        segments, lang = item.pop("segments"), item["lang"]
+        try:
+            if segments and lang == "auto":
+                lang, item["lang_scores"] = identify_language(np.concatenate(segments))
+            item["lang"] = lang if lang != "auto" else None
+            if segments:
+                with recognizer_pool(lang).transcriber() as live:
+                    item["text"] = transcribe_vosk(lang, segments, live=live)
+            else:
+                item["text"] = ""
+            item["stt_ms"] = round((time.perf_counter() - t0) * 1000, 1)
+            item["status"] = "ok"
+        except Exception as e:
+            item.update(status="error", stage="stt", error=str(e))
+        out_q.put(item)
+
+
+
+# =========================================================
+# INTENT / ANSWER + WRITER (this process)
+# =========================================================
+def finish(item, answer):
+    """Add intent (and optionally the assistant's answer) to a transcribed item."""
+    from engine import Session, generate_answer, reply_language
+    from intents import detect_intents
+    if item.get("status") != "ok" or not item["text"]:
+        return item
+    (intent, score), = detect_intents(item["text"], 1)
+    item.update(intent=intent, intent_score=round(score, 1))
+    if answer:
+        t0 = time.perf_counter()
+        s = Session()
+        item["answer"] = generate_answer(s, item["text"], reply_language(item["text"], item["lang"] or "auto"))
+        item["answer_path"] = s.last_route["path"]
+        item["answer_ms"] = round((time.perf_counter() - t0) * 1000, 1)
+    return item
+
+
+class Progress:
+    def __init__(self, total, every=5.0):
+        self.total, self.every = total, every
+        self.t0 = self.last = time.perf_counter()
+        self.files = self.errors = 0
+        self.audio_s = 0.0
+        self.workers = []     # model_stats() of each recognizer process
+
+    def add(self, item):
+        self.files += 1
+        self.errors += item.get("status") != "ok"
+        self.audio_s += item.get("audio_s", 0.0)
+        now = time.perf_counter()
+        if now - self.last >= self.every or self.files == self.total:
+            self.last = now
+            print(self.line(), file=sys.stderr, flush=True)
+
+    def line(self):
+        wall = time.perf_counter() - self.t0
+        return (
+            f"{self.files}/{self.total} files · {self.errors} errors · {self.files / wall:.2f} files/s · "
+            f"{self.audio_s / 3600:.2f} h audio · {self.audio_s / wall:.1f} audio-h/h"
+        )
+
+
+def start_model_host(ctx, langs):
+    """Start a model host for this batch; spawned workers find it through the environment."""
+    from model_host import DEFAULT_ADDRESS, new_key, serve, wait_for_host
+    address = os.path.join(tempfile.mkdtemp(prefix="riverwood-"), "vosk.sock") \
+        if DEFAULT_ADDRESS.endswith(".sock") else DEFAULT_ADDRESS
+    new_key()     # host and workers are spawned with it in their environment
+    host = ctx.Process(target=serve, args=(address, sorted(langs)), daemon=True)
+    host.start()
+    wait_for_host(address)
+    os.environ["RIVERWOOD_MODEL_HOST"] = address
+    return host, address
+
+
+def run(jobs, out, decoders, recognizers, answer, answer_workers, shared=False):
+    ctx = mp.get_context("spawn")     # Vosk/Kaldi state must not be forked
+    host = None
+    if shared and not os.environ.get("RIVERWOOD_MODEL_HOST"):
+        langs = {l for _, l in jobs if l != "auto"} | ({"hi", "en"} if any(l == "auto" for _, l in jobs) else set())
+        host, address = start_model_host(ctx, langs)
+        print(f"model host {address} up", file=sys.stderr)
+    job_q = ctx.Queue()
+    stt_q = ctx.Queue(QUEUE_DEPTH)
+    out_q = ctx.Queue(QUEUE_DEPTH)
+    for job in jobs:
+        job_q.put(job)
+
+    procs = [ctx.Process(target=decode_worker, args=(job_q, stt_q), daemon=True) for _ in range(decoders)]
+    procs += [ctx.Process(target=stt_worker, args=(stt_q, out_q), daemon=True) for _ in range(recognizers)]
+    for p in procs:
+        p.start()
+    for _ in range(decoders):
+        job_q.put(DONE)
+
+    progress = Progress(len(jobs))
+    write_lock = threading.Lock()
+
+    def write(item):
+        with write_lock:
+            fp.write(json.dumps(item, ensure_ascii=False) + "\n")
+            fp.flush()
+            progress.add(item)
+
+    def complete(item):
+        try:
+            item = finish(item, answer)
+        except Exception as e:
+            item.update(status="error", stage="answer", error=str(e))
+        write(item)
+
+    # Each decoder's end marker stops one recognizer. Once that many have
+    # stopped, every decoder is finished and the remaining recognizers are
+    # told to stop as well.
+    pool = ThreadPoolExecutor(answer_workers, thread_name_prefix="answer")
+    with out.open("a", encoding="utf-8") as fp:
+        if out.stat().st_size and not out.read_bytes().endswith(b"\n"):
+            fp.write("\n")   # end the record cut short by the interruption
+        stopped = 0
+        while stopped < recognizers:
+            item = out_q.get()
+            if item is DONE:
+                stopped += 1
+                if stopped == decoders:
+                    for _ in range(recognizers - decoders):
+                        stt_q.put(DONE)
+            elif item.get("status") == "worker":
+                progress.workers.append(item)
+            elif item.get("status") != "ok":
+                write(item)
+            else:
+                pool.submit(complete, item)
+        pool.shutdown(wait=True)
+    for p in procs:
+        p.join(timeout=5)
+    if host is not None:
+        host.terminate()
+    return progress
+
+
+def model_report(workers):
+    """Per-recognizer RSS / model-load lines (plus the model host's, if one was used)."""
+    lines = [
+        f"recognizer pid {w['pid']}: {w['rss_mb']} MB RSS · model load "
+        + (", ".join(f"{l} {t:.1f} s" for l, t in sorted(w["load_s"].items())) or ("on the model host" if w["host"] else "not loaded"))
+        for w in workers
+    ]
+    host = next((w["host_stats"] for w in reversed(workers) if w.get("host_stats")), None)
+    if host and "rss_mb" in host:
+        lines.append(
+            f"model host pid {host['pid']}: {host['rss_mb']} MB RSS · model load "
+            + ", ".join(f"{l} {t:.1f} s" for l, t in sorted(host["load_s"].items()))
+        )
+    return lines
+
+
+def to_parquet(jsonl, dest):
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        sys.exit("--parquet needs pyarrow (pip install pyarrow)")
+    rows = {}
+    for line in jsonl.read_text(encoding="utf-8").splitlines():
+        try:
+            rec = json.loads(line)
+        except ValueError:
+            continue
+        rows[rec["path"]] = {k: (json.dumps(v) if isinstance(v, (dict, list)) else v) for k, v in rec.items()}
+    pq.write_table(pa.Table.from_pylist(list(rows.values())), dest)   # latest record per file
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("input", help="directory of voice notes, or a .txt / .jsonl manifest")
+    ap.add_argument("-o", "--out", default="batch_results.jsonl")
+    ap.add_argument("--lang", default="auto", choices=["auto", "en", "hi"])
+    ap.add_argument("--answer", action="store_true", help="also generate the assistant's answer (needs Ollama)")
+    ap.add_argument("--decoders", type=int, default=max(1, (os.cpu_count() or 2) // 4))
+    ap.add_argument("--recognizers", type=int, default=max(1, (os.cpu_count() or 2) // 2))
+    ap.add_argument("--answer-workers", type=int, default=2)
+    ap.add_argument("--shared-models", action="store_true",
+                    help="load each Vosk model once in a model host shared by all recognizers")
+    ap.add_argument("--parquet", help="also write the results as a Parquet file (needs pyarrow)")
+    args = ap.parse_args()
+
+    out = Path(args.out)
+    jobs = load_jobs(args.input, args.lang)
+    done = completed(out)
+    todo = [j for j in jobs if j[0] not in done]
+    print(f"{len(jobs)} files · {len(done & {j[0] for j in jobs})} already done · {len(todo)} to process",
+          file=sys.stderr)
+
+    if todo:
+        decoders = min(args.decoders, len(todo))
+        recognizers = max(decoders, min(args.recognizers, len(todo)))
+        progress = run(todo, out, decoders, recognizers, args.answer, args.answer_workers, args.shared_models)
+        print(f"done: {progress.line()}", file=sys.stderr)
+        for line in model_report(progress.workers):
+            print(line, file=sys.stderr)
+    if args.parquet:
+        to_parquet(out, args.parquet)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,223 @@
+"""End-to-end pipeline benchmark, fully offline, with a regression check.
+
+    python benchmarks/bench_e2e.py [--concurrency 1 2 4 8] [--rounds 2]
+                                   [--first-token-ms 250] [--token-ms 25] [--tts-ms 40]
+                                   [--save-baseline | --baseline benchmarks/baseline_e2e.json]
+
+Drives VoiceEngine headless (the same entry points app.py and service.py
+use) over the corpus in corpus.json:
+
+* STT real-time factor: transcribe() time / audio duration per WAV
+  (skipped when vosk or the models are missing)
+* intent throughput: detect_intents() queries per second
+* reply turns: reply_events() against stub_ollama.StubOllama with a
+  silent TTS backend of fixed latency, with N concurrent sessions. Reports
+  turns/s, time to first audio and whole-turn p50/p95, and the route mix.
+
+The results are compared with a stored baseline. Any metric that is
+worse by more than --tolerance is reported as a regression and the
+exit status is 1. Baselines are machine-specific, so save one on the
+machine you compare on.
+"""
+import argparse
+import io
+import json
+import os
+import sys
+import tempfile
+import time
+import wave
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+HERE = Path(__file__).resolve().parent
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(HERE))
+
+from stub_ollama import StubOllama  # noqa: E402
+
+HIGHER_IS_BETTER = ("intent_qps", "turns_per_s")
+
+
+def pct(values, p):
+    w = sorted(values)
+    return w[min(len(w) - 1, int(p * len(w)))] if w else 0.0
+
+
+def start_stack(args):
+    """Stub Ollama + throwaway TTS cache, then import the engine against them."""
+    ollama = StubOllama(0, args.first_token_ms, args.token_ms).start()
+    os.environ["RIVERWOOD_OLLAMA"] = ollama.url
+    scratch = Path(tempfile.mkdtemp(prefix="riverwood-bench-"))
+    os.environ["RIVERWOOD_TTS_CACHE"] = str(scratch / "tts")
+    os.environ["RIVERWOOD_DB"] = str(scratch / "projects.db")   # fresh copy of the default project
+
+    import tts
+    from engine import VoiceEngine, get_ollama
+
+    class SilentBackend(tts.TTSBackend):
+        """Fixed-latency synthesis of 50 ms of silence per character."""
+        name = "bench"
+        mime = "audio/wav"
+        offline = True
+
+        def synthesize(self, text, lang="en"):
+            time.sleep(args.tts_ms / 1000)
+            out = io.BytesIO()
+            with wave.open(out, "wb") as w:
+                w.setnchannels(1)
+                w.setsampwidth(2)
+                w.setframerate(16000)
+                w.writeframes(b"\0\0" * 800 * len(text))
+            return out.getvalue()
+
+    tts.BACKENDS["bench"] = SilentBackend()
+    get_ollama().warm_up()
+    return ollama, VoiceEngine()
+
+
+def bench_stt(engine, corpus):
+    """Mean real-time factor over the corpus WAVs (None if Vosk is unavailable)."""
+    from engine import TARGET_RATE, load_vosk_model, to_pcm_16k
+    rows = []
+    for clip in corpus["audio"]:
+        raw = (ROOT / clip["path"]).read_bytes()
+        try:
+            for lang in (("hi", "en") if clip["lang"] == "auto" else (clip["lang"],)):
+                load_vosk_model(lang)   # load time is startup cost, not decode cost
+        except Exception as e:
+            print(f"  STT skipped: {e}")
+            return None
+        sid = engine.new_session()
+        audio_s = len(to_pcm_16k(raw)) / TARGET_RATE
+        t = time.perf_counter()
+        text = engine.transcribe(sid, raw, clip["lang"])
+        took = time.perf_counter() - t
+        rows.append(took / audio_s)
+        print(f"  {clip['path']:24s} {audio_s:6.1f}s audio  {took * 1000:7.0f} ms  RTF {took / audio_s:.3f}  {text[:40]!r}")
+    return sum(rows) / len(rows) if rows else None
+
+
+def bench_intent(queries, rounds=200):
+    from intents import detect_intents
+    detect_intents(queries[0], 1)
+    t = time.perf_counter()
+    for _ in range(rounds):
+        for q in queries:
+            detect_intents(q, 1)
+    return rounds * len(queries) / (time.perf_counter() - t)
+
+
+def run_session(engine, jobs):
+    """One user working through (text, lang) jobs; returns per-turn measurements."""
+    sid = engine.new_session()
+    engine.update_settings(sid, cache_similarity=100)   # identical questions only, no fuzzy reuse
+    out = []
+    for text, lang in jobs:
+        t0 = time.perf_counter()
+        first_audio, path = None, None
+        for ev in engine.reply_events(sid, text, lang, "bench"):
+            if ev["type"] == "audio" and first_audio is None:
+                first_audio = time.perf_counter() - t0
+            elif ev["type"] == "done":
+                path = ev["route"]["path"]
+        out.append({"turn_s": time.perf_counter() - t0, "ttfa_s": first_audio, "path": path})
+    return out
+
+
+def bench_turns(engine, jobs, concurrency, rounds):
+    from engine import DEFAULT_PROJECT_ID, project_store
+    from project_store import version_key
+    from response_cache import RESPONSE_CACHE
+    version = project_store().get(DEFAULT_PROJECT_ID)[0]
+    RESPONSE_CACHE.invalidate(version_key(DEFAULT_PROJECT_ID, version))   # each level starts cold
+    per_worker = jobs * rounds
+    t = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as pool:
+        turns = [r for rs in pool.map(lambda _: run_session(engine, per_worker), range(concurrency)) for r in rs]
+    wall = time.perf_counter() - t
+    ttfa = [r["ttfa_s"] for r in turns if r["ttfa_s"] is not None]
+    paths = {}
+    for r in turns:
+        paths[r["path"]] = paths.get(r["path"], 0) + 1
+    return {
+        "turns_per_s": len(turns) / wall,
+        "ttfa_p50_ms": pct(ttfa, 0.50) * 1000, "ttfa_p95_ms": pct(ttfa, 0.95) * 1000,
+        "turn_p50_ms": pct([r["turn_s"] for r in turns], 0.50) * 1000,
+        "turn_p95_ms": pct([r["turn_s"] for r in turns], 0.95) * 1000,
+    }, paths
+
+
+def compare(results, baseline, tolerance):
+    """Print the change per metric; return the names of regressed metrics."""
+    regressed = []
+    print(f"\n{'metric':24s} {'baseline':>10s} {'now':>10s} {'change':>8s}")
+    for name, now in results.items():
+        base = baseline.get(name)
+        if base is None or now is None or not base:
+            print(f"{name:24s} {'-':>10s} {now if now is not None else '-':>10}")
+            continue
+        change = (now - base) / base
+        worse = -change if name.split(".")[-1] in HIGHER_IS_BETTER else change
+        flag = "  REGRESSION" if worse > tolerance else ""
+        if flag:
+            regressed.append(name)
+        print(f"{name:24s} {base:10.3f} {now:10.3f} {change:+7.1%}{flag}")
+    return regressed
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--corpus", default=str(HERE / "corpus.json"))
+    ap.add_argument("--concurrency", nargs="*", type=int, default=[1, 2, 4, 8])
+    ap.add_argument("--rounds", type=int, default=2, help="passes over the queries per session")
+    ap.add_argument("--first-token-ms", type=float, default=250)
+    ap.add_argument("--token-ms", type=float, default=25)
+    ap.add_argument("--tts-ms", type=float, default=40)
+    ap.add_argument("--skip-stt", action="store_true")
+    ap.add_argument("--baseline", default=str(HERE / "baseline_e2e.json"))
+    ap.add_argument("--save-baseline", action="store_true")
+    ap.add_argument("--tolerance", type=float, default=0.15)
+    args = ap.parse_args()
+
+    corpus = json.loads(Path(args.corpus).read_text(encoding="utf-8"))
+    jobs = [(q, "hi" if group == "hi" else "en") for group, qs in corpus["queries"].items() for q in qs]
+    ollama, engine = start_stack(args)
+    print(f"stub Ollama {ollama.url} · first token {args.first_token_ms:.0f} ms · "
+          f"{args.token_ms:.0f} ms/token · TTS {args.tts_ms:.0f} ms/sentence")
+
+    results = {}
+    if not args.skip_stt:
+        print("\nSTT")
+        results["stt_rtf"] = bench_stt(engine, corpus)
+
+    results["intent_qps"] = bench_intent([q for q, _ in jobs])
+    print(f"\nintent  {results['intent_qps']:,.0f} queries/s")
+
+    print(f"\n{'sessions':>8s} {'turns/s':>8s} {'TTFA p50':>9s} {'p95':>7s} {'turn p50':>9s} {'p95':>7s}  routes")
+    for c in args.concurrency:
+        r, paths = bench_turns(engine, jobs, c, args.rounds)
+        print(f"{c:8d} {r['turns_per_s']:8.2f} {r['ttfa_p50_ms']:8.0f}ms {r['ttfa_p95_ms']:5.0f}ms "
+              f"{r['turn_p50_ms']:8.0f}ms {r['turn_p95_ms']:5.0f}ms  {paths}")
+        results.update({f"c{c}.{k}": v for k, v in r.items()})
+    print(f"\nstub Ollama served {ollama.calls} generate calls")
+
+    baseline = Path(args.baseline)
+    if args.save_baseline:
+        baseline.write_text(json.dumps(results, indent=2) + "\n", encoding="utf-8")
+        print(f"baseline saved to {baseline}")
+        return 0
+    if not baseline.exists():
+        print(f"no baseline at {baseline}; run with --save-baseline to record one")
+        return 0
+    regressed = compare(results, json.loads(baseline.read_text(encoding="utf-8")), args.tolerance)
+    if regressed:
+        print(f"\n{len(regressed)} metric(s) regressed by more than {args.tolerance:.0%}: {', '.join(regressed)}")
+        return 1
+    print(f"\nno regressions beyond {args.tolerance:.0%}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
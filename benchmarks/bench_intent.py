@@ -0,0 +1,93 @@
+"""Intent detection: compiled IntentIndex vs. the original nested fuzz loop.
+
+    python benchmarks/bench_intent.py [--sizes 45 200 1000 5000] [--queries 300]
+
+The intent table is padded with synthetic construction phrases to each
+size; both implementations classify the same queries. Reports per-query
+latency, speedup and how often the two agree on the top intent (the index
+matches phrases at word boundaries, so in-word hits like "rain" in
+"training" are expected disagreements).
+"""
+import argparse
+import random
+import re
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from rapidfuzz import fuzz  # noqa: E402
+
+from intents import INTENTS, REPL, STOP, IntentIndex  # noqa: E402
+
+WORDS = (
+    "slab shuttering level tower block brickwork plaster rebar steel cement tiles "
+    "crane lift shaft conduit plumbing drainage waterproofing curing formwork column "
+    "beam footing excavation backfill survey inspection handover snag painting "
+    "facade glazing railing staircase basement parking podium terrace"
+).split()
+
+QUERIES = [
+    "what is the construction update today", "any delays or blockers", "materials delivery status",
+    "what are the next steps tomorrow", "team on site today", "safety updates", "weather impact today",
+    "overall progress percentage", "contacts and site hours", "is the steel delivery stuck",
+    "how many workers came", "ppe compliance", "kal ka plan kya hai", "rain se kaam ruka kya",
+]
+
+
+# The implementation detect_intent used to have, kept verbatim for comparison
+def legacy_normalize(t):
+    t = t.lower()
+    t = re.sub(r"[^\w\s]", " ", t)
+    for k, v in REPL.items(): t = t.replace(k, v)
+    return " ".join([w for w in t.split() if w not in STOP])
+
+
+def legacy_detect(text, intents):
+    t = legacy_normalize(text)
+    best, score = "daily_update", 0
+    for intent, keys in intents.items():
+        for k in keys:
+            sc = fuzz.partial_ratio(t, k)
+            if sc > score:
+                score, best = sc, intent
+    return best
+
+
+def grow(size, rng):
+    table = {k: list(v) for k, v in INTENTS.items()}
+    n = sum(len(v) for v in table.values())
+    names = list(table)
+    while n < size:
+        table[rng.choice(names)].append(" ".join(rng.sample(WORDS, rng.randint(2, 4))))
+        n += 1
+    return table
+
+
+def timed(fn, queries):
+    t = time.perf_counter()
+    out = [fn(q) for q in queries]
+    return (time.perf_counter() - t) / len(queries), out
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--sizes", nargs="*", type=int, default=[45, 200, 1000, 5000])
+    ap.add_argument("--queries", type=int, default=300)
+    args = ap.parse_args()
+
+    rng = random.Random(0)
+    queries = [rng.choice(QUERIES) for _ in range(args.queries)]
+    print(f"{'phrases':>8s}  {'legacy':>10s}  {'index':>10s}  {'speedup':>7s}  {'agree':>6s}")
+    for size in args.sizes:
+        table = grow(size, rng)
+        index = IntentIndex(table)
+        old_s, old = timed(lambda q: legacy_detect(q, table), queries)
+        new_s, new = timed(lambda q: index.top(q, 1)[0][0], queries)
+        agree = sum(a == b for a, b in zip(old, new)) / len(queries)
+        print(f"{size:8d}  {old_s * 1e6:8.1f}us  {new_s * 1e6:8.1f}us  {old_s / new_s:6.1f}x  {agree:6.1%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""Throughput of parallel chunked transcription vs. core count.
+
+    python benchmarks/bench_parallel_stt.py [--lang en] [--minutes 5] [--workers 1 2 4 8]
+
+Uses the bundled temp_input.wav / last_audio.wav as-is and tiled into a
+synthetic long report (clips separated by 0.8 s pauses). Reports the real-
+time factor (decode time / audio time) and speedup over one worker.
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+import numpy as np  # noqa: E402
+
+from engine import model_path, to_pcm_16k  # noqa: E402
+from parallel_stt import RATE, ParallelTranscriber  # noqa: E402
+
+CLIPS = ["temp_input.wav", "last_audio.wav"]
+
+
+def corpus(minutes):
+    clips = [to_pcm_16k((ROOT / name).read_bytes()) for name in CLIPS]
+    gap = np.zeros(int(0.8 * RATE), dtype="<i2")
+    tiled, n = [], 0
+    while n < minutes * 60 * RATE:
+        for c in clips:
+            tiled += [c, gap]
+            n += len(c) + len(gap)
+    return [(name, c) for name, c in zip(CLIPS, clips)] + [(f"synthetic {minutes} min", np.concatenate(tiled))]
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--lang", default="en")
+    ap.add_argument("--minutes", type=float, default=5)
+    ap.add_argument("--workers", nargs="*", type=int, default=[1, 2, 4, 8])
+    args = ap.parse_args()
+
+    clips = corpus(args.minutes)
+    print(f"{'clip':20s} {'audio':>8s} {'workers':>7s} {'decode':>8s} {'RTF':>6s} {'speedup':>7s} {'chunks':>6s}")
+    for name, pcm in clips:
+        base = None
+        for n in args.workers:
+            stt = ParallelTranscriber(args.lang, model_path(args.lang), n)
+            stt.warm_up()
+            t = time.perf_counter()
+            out = stt.transcribe(pcm)
+            took = time.perf_counter() - t
+            stt.close()
+            base = base or took
+            audio_s = len(pcm) / RATE
+            print(f"{name:20s} {audio_s:7.1f}s {n:7d} {took:7.2f}s {took / audio_s:6.3f} {base / took:6.1f}x {len(out['chunks']):6d}")
+
+
+if __name__ == "__main__":
+    main()
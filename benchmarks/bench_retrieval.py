@@ -0,0 +1,87 @@
+"""Retrieval: prompt size and query latency as site logs pile up.
+
+    python benchmarks/bench_retrieval.py [--sizes 100 1000 5000 20000] [--k 6]
+
+Builds a BM25 index over the default project's records plus N synthetic
+daily site-log entries. It reports index build time, the cost of appending
+one new log entry, per-query latency,
+and the characters sent to the prompt: top-k snippets versus the whole
+memory dumped as JSON.
+"""
+import argparse
+import json
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from engine import DEFAULT_PROJECT, INTENT_FIELDS  # noqa: E402
+from intents import detect_intent  # noqa: E402
+from retrieval import BM25Index, snippet  # noqa: E402
+
+ACTIVITIES = [
+    "slab shuttering", "brickwork", "plastering", "rebar tying", "concreting", "waterproofing",
+    "conduit laying", "lift shaft shuttering", "curing", "scaffold inspection", "tile laying",
+]
+EVENTS = [
+    "steel lot delivered", "cement short by 40 bags", "crane idle for maintenance", "rain stopped work for 2 h",
+    "toolbox talk on working at height", "labour strength 52", "vendor sample rejected", "pump breakdown fixed",
+]
+QUERIES = [
+    "Why is the steel delivery late?", "Any delays because of rain this week?", "How is the slab shuttering going?",
+    "Is the crane working now?", "What happened with the tile vendor?", "How many workers were on site?",
+]
+
+
+def records(mem):
+    for kind, v in mem.items():
+        if isinstance(v, dict):
+            yield from ((kind, snippet(kind, k, x)) for k, x in v.items())
+        elif isinstance(v, list):
+            yield from ((kind, snippet(kind, None, x)) for x in v)
+        else:
+            yield kind, snippet(kind, None, v)
+
+
+def corpus(n, seed=7):
+    rnd = random.Random(seed)
+    docs = list(records(DEFAULT_PROJECT))
+    for i in range(n):
+        text = f"Level {rnd.randint(1, 9)} {rnd.choice(ACTIVITIES)}; {rnd.choice(EVENTS)}."
+        docs.append(("site_log", f"site log day {i}: {text}"))
+    return docs
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--sizes", nargs="*", type=int, default=[100, 1000, 5000, 20000])
+    ap.add_argument("--k", type=int, default=6)
+    ap.add_argument("--repeat", type=int, default=200)
+    args = ap.parse_args()
+
+    print(f"{'logs':>6s} {'docs':>6s} {'build':>8s} {'append':>8s} {'query':>9s} {'k chars':>8s} {'dump chars':>10s}")
+    for n in args.sizes:
+        docs = corpus(n)
+        t = time.perf_counter()
+        index = BM25Index([d for _, d in docs], [k for k, _ in docs])
+        build = time.perf_counter() - t
+
+        t = time.perf_counter()
+        index.add(["site log today: Level 5 slab shuttering; crane idle for maintenance."], ["site_log"])
+        append = time.perf_counter() - t
+
+        t = time.perf_counter()
+        for _ in range(args.repeat):
+            for q in QUERIES:
+                hits = index.search(q, args.k, prefer=INTENT_FIELDS.get(detect_intent(q), ()))
+        per_query = (time.perf_counter() - t) / (args.repeat * len(QUERIES))
+
+        k_chars = sum(len(d) for _, d in hits)
+        dump = len(json.dumps({**DEFAULT_PROJECT, "site_logs": [d for k, d in docs if k == "site_log"]}, ensure_ascii=False))
+        print(f"{n:6d} {len(docs):6d} {build * 1000:7.0f}ms {append * 1000:7.2f}ms {per_query * 1e6:7.0f}us {k_chars:8d} {dump:10d}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""Compare TTS backends: time-to-first-byte and real-time factor.
+
+    python benchmarks/bench_tts.py [--backends gtts espeak] [--workers 4]
+
+TTFB is the time until the first sentence's audio is available; RTF is
+synthesis time divided by the duration of the audio produced (lower is
+better, < 1 means faster than playback). The cache is bypassed.
+"""
+import argparse
+import io
+import sys
+import time
+import wave
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from tts import available_backends, get_backend  # noqa: E402
+
+SENTENCES = {
+    "en": [
+        "Overall progress: 48%.",
+        "Steel next lot arriving tomorrow 11 AM.",
+        "Next steps: slab shuttering for Level 4; brickwork Level 3.",
+        "Light showers possible later today; concreting planned before 4 PM.",
+    ],
+    "hi": [
+        "नमस्ते! आज का अपडेट — काम 48% पूरा हो चुका है।",
+        "स्टील की अगली खेप कल सुबह 11 बजे आएगी।",
+    ],
+}
+
+
+def duration(audio, mime):
+    if mime == "audio/wav":
+        with wave.open(io.BytesIO(audio), "rb") as w:
+            return w.getnframes() / w.getframerate()
+    from pydub import AudioSegment
+    return len(AudioSegment.from_file(io.BytesIO(audio))) / 1000.0
+
+
+def bench(name, workers):
+    engine = get_backend(name)
+    jobs = [(s, lang) for lang, ss in SENTENCES.items() for s in ss]
+
+    t0 = time.perf_counter()
+    first = engine.synthesize(*jobs[0])
+    ttfb = time.perf_counter() - t0
+
+    synth, audio_s = 0.0, duration(first, engine.mime)
+    synth += ttfb
+    for text, lang in jobs[1:]:
+        t = time.perf_counter()
+        clip = engine.synthesize(text, lang)
+        synth += time.perf_counter() - t
+        audio_s += duration(clip, engine.mime)
+
+    t = time.perf_counter()
+    with ThreadPoolExecutor(workers) as pool:
+        list(pool.map(lambda j: engine.synthesize(*j), jobs))
+    pooled = time.perf_counter() - t
+
+    return {
+        "backend": name,
+        "ttfb_ms": ttfb * 1000,
+        "rtf": synth / audio_s,
+        "serial_s": synth,
+        f"pool{workers}_s": pooled,
+        "speedup": synth / pooled,
+    }
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--backends", nargs="*", default=available_backends())
+    ap.add_argument("--workers", type=int, default=4)
+    args = ap.parse_args()
+
+    for name in args.backends:
+        try:
+            r = bench(name, args.workers)
+        except Exception as e:
+            print(f"{name:8s}  skipped: {e}")
+            continue
+        print(
+            f"{r['backend']:8s}  TTFB {r['ttfb_ms']:7.1f} ms  RTF {r['rtf']:.3f}  "
+            f"serial {r['serial_s']:.2f} s  pool({args.workers}) {r[f'pool{args.workers}_s']:.2f} s  "
+            f"x{r['speedup']:.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
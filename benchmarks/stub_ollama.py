@@ -0,0 +1,100 @@
+"""Local stand-in for Ollama's /api/generate, for offline benchmarks.
+
+    python benchmarks/stub_ollama.py [--port 11434] [--first-token-ms 250] [--token-ms 25]
+
+Streams a canned reply as NDJSON, one word per chunk, with a configurable
+time to first token (the "prefill") and per-token delay, and ends with a
+done chunk carrying the same fields Ollama reports (token counts,
+durations, context). An empty prompt is a warm-up and returns at once.
+"""
+import argparse
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+REPLY = (
+    "Namaste! Aaj ka update: Tower A ka kaam 48% complete hai. "
+    "Level 3 slab casting ho chuki hai aur Level 4 ki shuttering chal rahi hai. "
+    "Steel ki next lot kal subah 11 baje aayegi. Koi aur sawaal ho to bataiye!"
+)
+
+
+class StubOllama(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, port=0, first_token_ms=250.0, token_ms=25.0, reply=REPLY):
+        super().__init__(("127.0.0.1", port), Handler)
+        self.first_token_ms, self.token_ms, self.reply = first_token_ms, token_ms, reply
+        self.calls = 0
+        self.lock = threading.Lock()
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    def start(self):
+        threading.Thread(target=self.serve_forever, name="stub-ollama", daemon=True).start()
+        return self
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        if self.path != "/api/generate":
+            self.send_error(404)
+            return
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        srv = self.server
+        with srv.lock:
+            srv.calls += 1
+        prompt = body.get("prompt", "")
+        words = srv.reply.split(" ") if prompt else []
+        prompt_tokens = len((body.get("system", "") + prompt).split())
+        t0 = time.perf_counter()
+
+        try:
+            self.send_response(200)
+            self.send_header("Content-Type", "application/x-ndjson")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            if words:
+                time.sleep(srv.first_token_ms / 1000)
+            prefill_ns = int((time.perf_counter() - t0) * 1e9)
+            for i, w in enumerate(words):
+                if i:
+                    time.sleep(srv.token_ms / 1000)
+                self._chunk({"model": body.get("model"), "response": w + (" " if i < len(words) - 1 else ""), "done": False})
+            self._chunk({
+                "model": body.get("model"), "response": "", "done": True,
+                "context": list(body.get("context") or []) + list(range(prompt_tokens + len(words))),
+                "prompt_eval_count": prompt_tokens, "prompt_eval_duration": prefill_ns,
+                "eval_count": len(words), "eval_duration": int((time.perf_counter() - t0) * 1e9) - prefill_ns,
+            })
+            self.wfile.write(b"0\r\n\r\n")
+        except (BrokenPipeError, ConnectionResetError):
+            self.close_connection = True   # the client cancelled the stream (e.g. a preempted speculation)
+
+    def _chunk(self, obj):
+        data = (json.dumps(obj) + "\n").encode()
+        self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+        self.wfile.flush()
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--port", type=int, default=11434)
+    ap.add_argument("--first-token-ms", type=float, default=250)
+    ap.add_argument("--token-ms", type=float, default=25)
+    args = ap.parse_args()
+    srv = StubOllama(args.port, args.first_token_ms, args.token_ms)
+    print(f"stub Ollama on {srv.url}")
+    srv.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+import logging
+import os
+import re
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+
+# =========================================================
+# CONFIG
+# =========================================================
+TURN_BUDGET = int(os.environ.get("RIVERWOOD_HISTORY_TOKENS", 320))   # verbatim recent turns
+SUMMARY_BUDGET = int(os.environ.get("RIVERWOOD_SUMMARY_TOKENS", 120))
+MAX_TURNS = 64              # hard cap on buffered messages, whatever their size
+
+log = logging.getLogger("riverwood.conversation")
+_summarizer_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="summary")
+FIRST_SENTENCE = re.compile(r"^(.+?[.!?।])(\s|$)")
+
+
+def estimate_tokens(text):
+    """Rough token count (≈3.5 characters per token for Hinglish / Devanagari)."""
+    return max(1, round(len(text) / 3.5))
+
+
+def _clip(text, limit):
+    text = " ".join(text.split())
+    return text if len(text) <= limit else text[:limit - 1].rstrip() + "…"
+
+
+
+# =========================================================
+# SUMMARIZERS
+# =========================================================
+def template_summary(summary, evicted):
+    """Fold evicted messages into the summary as `question → gist` lines.
+
+    Keeps the newest lines that fit SUMMARY_BUDGET, so the summary rolls
+    forward instead of growing.
+    """
+    lines = [l for l in summary.split("\n") if l]
+    question = None
+    for m in evicted:
+        if m["role"] == "user":
+            question = _clip(m["content"], 70)
+        else:
+            first = FIRST_SENTENCE.match(m["content"].strip())
+            gist = _clip(first.group(1) if first else m["content"], 90)
+            lines.append(f"- {question or '…'} → {gist}")
+            question = None
+    while len(lines) > 1 and estimate_tokens("\n".join(lines)) > SUMMARY_BUDGET:
+        lines.pop(0)
+    return "\n".join(lines)
+
+
+
+# =========================================================
+# CONVERSATION MEMORY (token-budgeted ring + rolling summary)
+# =========================================================
+class ConversationMemory:
+    """Recent messages kept verbatim within TURN_BUDGET tokens.
+
+    Older messages are evicted oldest first and folded into a rolling
+    summary on a background thread. The prompt therefore carries long-range
+    context at a bounded cost: roughly TURN_BUDGET + SUMMARY_BUDGET tokens,
+    however long the conversation runs.
+
+    `summarizer(summary, evicted) -> summary` defaults to template_summary.
+    The engine can pass one that asks the LLM when it is idle, falling
+    back to the template.
+    """
+
+    def __init__(self, summarizer=template_summary, turn_budget=TURN_BUDGET):
+        self.summarizer, self.turn_budget = summarizer, turn_budget
+        self.lock = threading.Lock()
+        self.turns = deque(maxlen=MAX_TURNS)
+        self.tokens = 0
+        self.summary = ""
+        self.pending = []            # evicted, not yet folded into the summary
+        self.folding = None          # Future of the running fold
+        self.generation = 0          # bumped by clear() so stale folds are dropped
+
+    def append(self, role, content, **meta):
+        msg = {"role": role, "content": content, **meta, "tokens": estimate_tokens(content)}
+        with self.lock:
+            if len(self.turns) == self.turns.maxlen:
+                self._evict()
+            self.turns.append(msg)
+            self.tokens += msg["tokens"]
+            # keep at least the newest exchange verbatim, even if it alone is over budget
+            while self.tokens > self.turn_budget and len(self.turns) > 2:
+                self._evict()
+                if len(self.turns) > 1 and self.turns[0]["role"] != "user":
+                    self._evict()   # whole exchanges, so the summary pairs Q with A
+            if self.pending and self.folding is None:
+                self._schedule()
+
+    def _evict(self):
+        old = self.turns.popleft()
+        self.tokens -= old["tokens"]
+        self.pending.append(old)
+
+    def _schedule(self):
+        batch, self.pending = self.pending, []
+        summary, generation = self.summary, self.generation
+        self.folding = _summarizer_pool.submit(self._fold, summary, batch, generation)
+
+    def _fold(self, summary, batch, generation):
+        try:
+            new = self.summarizer(summary, batch)
+        except Exception as e:
+            log.warning("summarizer failed, using the template: %s", e)
+            new = template_summary(summary, batch)
+        with self.lock:
+            self.folding = None
+            if generation == self.generation:   # not cleared meanwhile
+                self.summary = new
+            if self.pending:                    # more was evicted while this fold ran
+                self._schedule()
+
+    def clear(self):
+        with self.lock:
+            self.turns.clear()
+            self.tokens = 0
+            self.summary = ""
+            self.pending = []
+            self.generation += 1
+
+    def messages(self):
+        with self.lock:
+            return [{k: v for k, v in m.items() if k != "tokens"} for m in self.turns]
+
+    def prompt_block(self):
+        """Summary + recent messages as prompt text ("" for a new conversation)."""
+        with self.lock:
+            turns, summary = list(self.turns), self.summary
+        text = ""
+        if summary:
+            text += f"Earlier in this conversation:\n{summary}\n"
+        if turns:
+            text += "Recent conversation:\n" + "\n".join(f"{m['role']}: {m['content']}" for m in turns) + "\n"
+        return text
+
+    def stats(self):
+        with self.lock:
+            return {
+                "messages": len(self.turns), "tokens": self.tokens, "budget": self.turn_budget,
+                "summary_tokens": estimate_tokens(self.summary) if self.summary else 0,
+                "pending": len(self.pending),
+            }
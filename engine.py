@@ -0,0 +1,1333 @@
+"""Miss Riverwood voice pipeline (STT -> intent -> LLM -> TTS), UI-free.
+
+Everything here is importable without Streamlit: app.py, service.py and the
+benchmarks all drive the same functions through VoiceEngine.
+"""
+import functools
+import io
+import json
+import logging
+import math
+import os
+import queue
+import re
+import struct
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from pathlib import Path
+from typing import List
+
+from startup import STARTUP
+
+_import_t0 = time.monotonic()
+import numpy as np
+
+from conversation import ConversationMemory, template_summary
+from intents import INTENTS, detect_intents, normalize
+from language import GREETING, reply_language
+from model_host import HOST_ADDRESS, RemoteRecognizer, host_stats, rss_mb, wait_for_host
+from ollama_client import DEFAULT_LLM, OLLAMA_HOST, Cancelled, OllamaClient
+from project_store import DEFAULT_PROJECT_ID, ProjectStore, version_key
+from response_cache import RESPONSE_CACHE, SIMILARITY, clamp_similarity
+from retrieval import RETRIEVE_K, project_index
+from scheduler import SCHEDULER, Busy
+from speculation import CANONICAL, SPECULATE_TOKENS, Speculator
+from tracing import TRACER, annotate, current, fail, record, span
+from tts import DEFAULT_BACKEND, SYNTH_POOL, TTS_CACHE, available_backends, get_backend, join_audio, prewarm, speak, submit
+from vocab import project_vocabulary
+import vad
+
+STARTUP.mark("engine-imports", _import_t0)   # numpy, rapidfuzz, requests
+
+
+# =========================================================
+# CONFIG
+# =========================================================
+MODEL_DIR = Path("models")
+SESSION_TTL = 60 * 60    # idle seconds before a session is dropped
+STT_PRIORITY_BYTES = 320_000   # ~10 s of 16 kHz int16; each step lowers STT priority
+LONG_AUDIO_S = 90              # recordings longer than this are decoded in parallel
+PARALLEL_STT_WORKERS = int(os.environ.get("RIVERWOOD_PARALLEL_STT", os.cpu_count() or 1))
+LLM_SUMMARY = os.environ.get("RIVERWOOD_LLM_SUMMARY", "") == "1"   # else template summaries
+COMMAND_GRAMMAR = os.environ.get("RIVERWOOD_COMMAND_GRAMMAR", "1") == "1"   # grammar pass for short queries
+COMMAND_MAX_S = 4.0            # speech up to this long is tried against the site grammar first
+GRAMMAR_MIN_CONF = 0.6         # mean word confidence a grammar result needs to be kept
+GRAMMAR_MAX_UNK = 0.25         # share of [unk] words above which open decoding is used
+
+log = logging.getLogger("riverwood")
+
+
+
+# =========================================================
+# DEFAULT PROJECT MEMORY (seeds the project store on first run)
+# =========================================================
+DEFAULT_PROJECT = {
+    "project_name": "Riverwood Residences – Tower A",
+    "overall_progress": "48%",
+    "milestones": [
+        "Foundation and raft completed",
+        "Ground + 3 slabs poured",
+        "Blockwork up to Level 2 finished",
+        "MEP rough-ins started at Level 1",
+    ],
+    "materials": {
+        "cement": "Sufficient for next 10 days",
+        "steel": "Next lot arriving tomorrow 11 AM",
+        "bricks": "Stock for 7 days; fresh order placed",
+        "tiles": "Shortlisted; vendor confirmation pending"
+    },
+    "delays": ["One-day slip due to heavy rain last week", "Tile vendor sample re-approval pending"],
+    "safety": ["Daily toolbox talk at 9 AM", "PPE compliance at 97%", "Scaffold tag checks completed"],
+    "team": {"site_engineer": "Asha Kulkarni", "contractor": "Rao Constructions", "electricians": 8, "masons": 24, "carpenters": 14},
+    "next_steps": ["Slab shuttering for Level 4", "Brickwork Level 3", "Electrical conduits Level 2", "Lift shaft shuttering"],
+    "site_hours": "Mon–Sat · 8:00–18:00",
+    "contact": "site@riverwoodhomes.in · +91-98765-43210",
+    "weather_note": "Light showers possible later today; concreting planned before 4 PM."
+}
+
+
+
+@functools.lru_cache(maxsize=None)
+def project_store():
+    """The shared, persistent project store (project_store.ProjectStore)."""
+    store = ProjectStore(seed={DEFAULT_PROJECT_ID: DEFAULT_PROJECT})
+    # answers generated from an old version of a project must not be reused
+    store.subscribe(lambda pid, old, new: RESPONSE_CACHE.invalidate(version_key(pid, old)))
+    return store
+
+
+
+# =========================================================
+# AUDIO HELPERS
+# =========================================================
+TARGET_RATE = 16000
+CHUNK_FRAMES = 4000
+
+
+def _wav_chunks(raw):
+    """Locate the fmt/data chunks of a RIFF/WAVE buffer without copying it.
+
+    Returns ((format_tag, channels, rate, bits), data memoryview) or None for
+    anything that is not an uncompressed WAV.
+    """
+    mv = memoryview(raw)
+    if len(mv) < 12 or mv[:4] != b"RIFF" or mv[8:12] != b"WAVE":
+        return None
+    pos, fmt = 12, None
+    while pos + 8 <= len(mv):
+        cid = bytes(mv[pos:pos + 4])
+        size = struct.unpack_from("<I", mv, pos + 4)[0]
+        body = mv[pos + 8:pos + 8 + size]
+        if cid == b"fmt ":
+            tag, ch, rate, _, _, bits = struct.unpack_from("<HHIIHH", body)
+            if tag == 0xFFFE and len(body) >= 26:  # WAVE_FORMAT_EXTENSIBLE
+                tag = struct.unpack_from("<H", body, 24)[0]
+            fmt = (tag, ch, rate, bits)
+        elif cid == b"data" and fmt:
+            return fmt, body
+        pos += 8 + size + (size & 1)
+    return None
+
+
+def _pcm_view(fmt, data):
+    """View WAV sample data as a (frames, channels) array on int16 scale."""
+    tag, ch, _, bits = fmt
+    width = bits // 8
+    frames = len(data) // (width * ch)
+    data = data[:frames * width * ch]
+    if tag == 1 and bits == 16:
+        x = np.frombuffer(data, dtype="<i2")
+    elif tag == 1 and bits == 8:
+        x = (np.frombuffer(data, dtype=np.uint8).astype(np.float32) - 128.0) * 256.0
+    elif tag == 1 and bits == 24:
+        b = np.frombuffer(data, dtype=np.uint8).reshape(-1, 3).astype(np.int32)
+        x = ((b[:, 0] | (b[:, 1] << 8) | (b[:, 2] << 16)) << 8 >> 16).astype(np.float32)
+    elif tag == 1 and bits == 32:
+        x = np.frombuffer(data, dtype="<i4").astype(np.float32) / 65536.0
+    elif tag == 3 and bits in (32, 64):
+        x = np.frombuffer(data, dtype="<f4" if bits == 32 else "<f8").astype(np.float32) * 32767.0
+    else:
+        return None
+    return x.reshape(-1, ch)
+
+
+@functools.lru_cache(maxsize=16)
+def _polyphase_filter(up, down, half_taps=10):
+    """Kaiser-windowed sinc low-pass split into `up` phases (rows)."""
+    m = max(up, down)
+    half = half_taps * m
+    t = np.arange(-half, half + 1, dtype=np.float64)
+    h = np.sinc(t / m) * np.kaiser(t.size, 5.0)
+    h *= up / h.sum()
+    n_phase = -(-h.size // up)
+    h = np.concatenate([h, np.zeros(n_phase * up - h.size)])
+    return h.reshape(n_phase, up).T.astype(np.float32), half
+
+
+def resample_poly(x, src_rate, dst_rate=TARGET_RATE, block=32768):
+    """Vectorized polyphase resampler (upsample, FIR, decimate in one pass).
+
+    Only the output samples that are kept are ever computed: each one is a dot
+    product between one filter phase and a short window of input.
+    """
+    g = math.gcd(src_rate, dst_rate)
+    up, down = dst_rate // g, src_rate // g
+    if up == down:
+        return x
+    phases, half = _polyphase_filter(up, down)
+    n_tap = phases.shape[1]
+    xp = np.concatenate([np.zeros(n_tap, np.float32), x.astype(np.float32, copy=False), np.zeros(n_tap, np.float32)])
+    n_out = -(-x.size * up // down)
+    taps = np.arange(n_tap)
+    out = np.empty(n_out, np.float32)
+    for start in range(0, n_out, block):
+        m = np.arange(start, min(start + block, n_out), dtype=np.int64) * down + half
+        idx = (m // up)[:, None] - taps[None, :] + n_tap
+        out[start:start + m.size] = np.einsum("ij,ij->i", phases[m % up], xp[idx])
+    return out
+
+
+def to_pcm_16k(raw: bytes):
+    """Decode an utterance to mono 16 kHz int16 PCM (a NumPy array).
+
+    Uncompressed WAV from the browser is read in place through a memoryview,
+    downmixed and resampled in-process; the common 16 kHz mono int16 case is
+    returned as a zero-copy view. Compressed formats fall back to ffmpeg.
+    """
+    with span("decode"):
+        found = _wav_chunks(raw)
+        x = _pcm_view(*found) if found else None
+        if x is None:
+            from pydub import AudioSegment
+            audio = AudioSegment.from_file(io.BytesIO(raw))
+            audio = audio.set_channels(1).set_frame_rate(TARGET_RATE).set_sample_width(2)
+            return np.frombuffer(audio.raw_data, dtype="<i2")
+
+        rate = found[0][2]
+        x = x[:, 0] if x.shape[1] == 1 else x.mean(axis=1, dtype=np.float32)
+    if rate == TARGET_RATE and x.dtype == np.dtype("<i2"):
+        return x
+    with span("resample", src_rate=rate):
+        y = resample_poly(x, rate)
+        return np.clip(np.rint(y), -32768, 32767).astype("<i2")
+
+
+def model_path(lang):
+    return MODEL_DIR / (
+        "vosk-model-small-hi-0.22" if lang == "hi"
+        else "vosk-model-small-en-in-0.4"
+    )
+
+
+_model_locks = {"hi": threading.Lock(), "en": threading.Lock()}
+_model_load_s = {}
+
+
+@functools.lru_cache(maxsize=None)
+def _load_model(lang):
+    from vosk import Model
+    t0 = time.perf_counter()
+    model = Model(str(model_path(lang)))
+    _model_load_s[lang] = round(time.perf_counter() - t0, 2)
+    return model
+
+
+def load_vosk_model(lang):
+    """Load (once) the Vosk model; a request racing the preload waits for it
+    instead of reading the model directory a second time."""
+    with _model_locks["hi" if lang == "hi" else "en"]:
+        return _load_model(lang)
+
+
+def vosk_recognizer(lang, rate=TARGET_RATE, grammar=None):
+    """A KaldiRecognizer on this process's model, or on the shared model host
+    when RIVERWOOD_MODEL_HOST is set (see model_host.py)."""
+    if HOST_ADDRESS:
+        return RemoteRecognizer(lang, rate, grammar)
+    from vosk import KaldiRecognizer
+    model = load_vosk_model(lang)
+    return KaldiRecognizer(model, rate, grammar) if grammar else KaldiRecognizer(model, rate)
+
+
+def model_stats():
+    """Where this process's models live, what they cost to load, and its RSS."""
+    out = {"pid": os.getpid(), "rss_mb": rss_mb(), "load_s": dict(_model_load_s), "host": HOST_ADDRESS or None}
+    if HOST_ADDRESS:
+        try:
+            out["host_stats"] = host_stats()
+        except (OSError, EOFError) as e:
+            out["host_stats"] = {"error": str(e)}
+    return out
+
+
+@functools.lru_cache(maxsize=None)
+def parallel_transcriber(lang):
+    """Process pool for long recordings (one model per worker, see parallel_stt)."""
+    from parallel_stt import ParallelTranscriber
+    return ParallelTranscriber(lang, model_path(lang), PARALLEL_STT_WORKERS)
+
+
+class LiveTranscriber:
+    """Long-lived Vosk recognizer fed audio chunks as they arrive.
+
+    `feed` returns the running transcript (finished segments + current
+    PartialResult), so the text is already complete when the audio ends.
+
+    With a `grammar` (JSON phrase list) decoding is constrained to those
+    phrases, and `finish` leaves the mean word `confidence` and the share
+    of `unknown` ([unk]) words of the result.
+    """
+
+    def __init__(self, lang, rate=TARGET_RATE, grammar=None):
+        self.lang, self.rate = lang, rate
+        self.rec = vosk_recognizer(lang, rate, grammar)
+        if grammar:
+            self.rec.SetWords(True)
+        self.segments: List[str] = []
+        self.partial = ""
+        self.words = []            # (word, conf), only filled with SetWords
+        self.confidence = self.unknown = None
+
+    @property
+    def text(self):
+        return " ".join(self.segments + ([self.partial] if self.partial else []))
+
+    def feed(self, pcm):
+        if self.rec.AcceptWaveform(bytes(pcm)):
+            self._segment(self.rec.Result())
+            self.partial = ""
+        else:
+            self.partial = json.loads(self.rec.PartialResult()).get("partial", "")
+        return self.text
+
+    def end_utterance(self):
+        """Flush the current utterance (e.g. at a VAD boundary) and keep going."""
+        self._segment(self.rec.FinalResult())
+        self.partial = ""
+        return self.text
+
+    def _segment(self, result):
+        res = json.loads(result)
+        if res.get("text"):
+            self.segments.append(res["text"])
+        self.words += [(w["word"], w["conf"]) for w in res.get("result", ())]
+
+    def finish(self):
+        self.end_utterance()
+        text = " ".join(self.segments).strip()
+        self.confidence = self.unknown = None
+        if self.words:
+            self.confidence = sum(c for _, c in self.words) / len(self.words)
+            self.unknown = sum(w == "[unk]" for w, _ in self.words) / len(self.words)
+        self.reset()
+        return text
+
+    def reset(self):
+        self.rec.Reset()
+        self.segments, self.partial, self.words = [], "", []
+
+
+class RecognizerPool:
+    """Idle recognizers for one language, all sharing the cached Model.
+
+    Building a KaldiRecognizer is cheap next to loading the model but not
+    free; reusing them (Reset between utterances) keeps it off the hot path.
+    """
+
+    def __init__(self, lang, size, grammar=None):
+        self.lang, self.size, self.grammar = lang, size, grammar
+        self.idle: List[LiveTranscriber] = []
+        self.lock = threading.Lock()
+
+    @contextmanager
+    def transcriber(self):
+        with self.lock:
+            live = self.idle.pop() if self.idle else None
+        if live is None:
+            live = LiveTranscriber(self.lang, grammar=self.grammar)
+        try:
+            yield live
+        finally:
+            live.reset()
+            with self.lock:
+                if len(self.idle) < self.size:
+                    self.idle.append(live)
+
+
+@functools.lru_cache(maxsize=None)
+def recognizer_pool(lang):
+    return RecognizerPool(lang, SCHEDULER.stt.concurrency)
+
+
+@functools.lru_cache(maxsize=16)
+def grammar_pool(vocab):
+    """Recognizers compiled with one project version's grammar (see vocab.py).
+
+    Keyed by the cached Vocabulary, so the grammar graph is built once per
+    project version and language, not per request.
+    """
+    return RecognizerPool(vocab.lang, SCHEDULER.stt.concurrency, vocab.grammar)
+
+
+def _compile_grammar(lang):
+    """Build one grammar recognizer for the default project ahead of the first query."""
+    with grammar_pool(Session().vocabulary(lang)).transcriber():
+        pass
+
+
+def transcribe_vosk(lang, pcm, on_partial=None, live=None):
+    """Decode 16 kHz int16 PCM (from to_pcm_16k) in CHUNK_FRAMES slices.
+
+    `pcm` may also be a list of VAD segments; each one is decoded as its own
+    utterance so words are not glued across the removed silence.
+    """
+    if live is None:
+        live = LiveTranscriber(lang)
+    step = CHUNK_FRAMES * 2
+    for part in (pcm if isinstance(pcm, list) else [pcm]):
+        buf = memoryview(part).cast("B")
+        for i in range(0, len(buf), step):
+            text = live.feed(buf[i:i + step])
+            if on_partial: on_partial(text)
+        live.end_utterance()
+    return live.finish()
+
+
+
+# =========================================================
+# LANGUAGE IDENTIFICATION (Hindi vs en-IN model)
+# =========================================================
+LANGS = ("hi", "en")
+LANG_PROBE_S = 2.0      # seconds of speech both models decode before one is picked
+_probe_pool = ThreadPoolExecutor(max_workers=len(LANGS), thread_name_prefix="langid")
+
+
+def _probe_score(lang, pcm):
+    """Mean word confidence of `lang`'s model on a short probe (0 if nothing heard)."""
+    rec = vosk_recognizer(lang)
+    rec.SetWords(True)
+    buf = memoryview(pcm).cast("B")
+    step = CHUNK_FRAMES * 2
+    for i in range(0, len(buf), step):
+        rec.AcceptWaveform(bytes(buf[i:i + step]))
+    words = json.loads(rec.FinalResult()).get("result", [])
+    return sum(w.get("conf", 0.0) for w in words) / len(words) if words else 0.0
+
+
+def identify_language(pcm):
+    """Run both models on the first LANG_PROBE_S of speech concurrently.
+
+    Returns (lang, {lang: score}); the model with the higher mean word
+    confidence wins, English on a tie.
+    """
+    probe = pcm[:int(LANG_PROBE_S * TARGET_RATE)]
+    scores = dict(zip(LANGS, _probe_pool.map(lambda l: _probe_score(l, probe), LANGS)))
+    lang = max(LANGS, key=lambda l: (scores[l], l == "en"))
+    log.info("language id: %s (%s)", lang, ", ".join(f"{l} {sc:.2f}" for l, sc in scores.items()))
+    return lang, scores
+
+
+
+# =========================================================
+# TEMPLATES
+# =========================================================
+# Fixed words of each template, per reply language (project facts stay as stored)
+TEMPLATE_TEXT = {
+    "en": {
+        "hello": "Hello!", "today": "Here is today update —", "complete": "complete",
+        "materials": "Materials: Cement {cement}, Steel {steel}, Bricks {bricks}, Tiles {tiles}.",
+        "delays": "Delays: ", "no_delays": "No major delays.",
+        "team": "Team on site: {masons} masons, {carpenters} carpenters, {electricians} electricians.",
+        "next_steps": "Next steps: ", "safety": "Safety measures: ", "percentage": "Overall progress: ",
+        "contacts": "Contact: ", "site_hours": "Site hours: ",
+    },
+    "hi": {
+        "hello": "नमस्ते!", "today": "आज का अपडेट —", "complete": "पूरा",
+        "materials": "सामग्री: सीमेंट {cement}, स्टील {steel}, ईंट {bricks}, टाइल {tiles}.",
+        "delays": "देरी: ", "no_delays": "कोई बड़ी देरी नहीं है।",
+        "team": "साइट पर टीम: {masons} मिस्त्री, {carpenters} बढ़ई, {electricians} इलेक्ट्रीशियन।",
+        "next_steps": "अगले काम: ", "safety": "सुरक्षा उपाय: ", "percentage": "कुल प्रगति: ",
+        "contacts": "संपर्क: ", "site_hours": "साइट का समय: ",
+    },
+}
+
+
+def template_answer(intent, mem, lang):
+    w = TEMPLATE_TEXT["hi" if lang == "hi" else "en"]
+
+    if intent == "daily_update":
+        return (
+            f"{w['hello']} {w['today']} "
+            f"{mem['project_name']} · {mem['overall_progress']} {w['complete']}. "
+            f"{mem['milestones'][0]}, {mem['milestones'][1]}. "
+            f"{mem['weather_note']}"
+        )
+
+    if intent == "materials":
+        return w["materials"].format(**mem["materials"])
+
+    if intent == "delays":
+        return w["delays"] + ", ".join(mem["delays"]) if mem["delays"] else w["no_delays"]
+
+    if intent == "team":
+        return w["team"].format(**mem["team"])
+
+    if intent == "next_steps":
+        return w["next_steps"] + "; ".join(mem["next_steps"])
+
+    if intent == "safety":
+        return w["safety"] + "; ".join(mem["safety"])
+
+    if intent == "weather":
+        return mem["weather_note"]
+
+    if intent == "percentage":
+        return w["percentage"] + mem["overall_progress"]
+
+    if intent == "contacts":
+        return w["contacts"] + mem["contact"]
+
+    if intent == "site_hours":
+        return w["site_hours"] + mem["site_hours"]
+
+    return template_answer("daily_update", mem, lang)
+
+
+
+# =========================================================
+# SESSION STATE
+# =========================================================
+class Session:
+    """Per-conversation state: selected project, history, LLM context, recognizers."""
+
+    def __init__(self, sid=None):
+        self.sid = sid or uuid.uuid4().hex
+        self.project_id = DEFAULT_PROJECT_ID
+        self.memory = ConversationMemory(llm_summary if LLM_SUMMARY else template_summary)
+        self.llm_context = None
+        self.last_route = None
+        self.last_llm_stats = None
+        self.fast_path_score = FAST_PATH_SCORE
+        self.cache_similarity = SIMILARITY
+        self.live = {}                  # lang -> LiveTranscriber
+        self.eos = {}                   # lang -> vad.EndOfSpeech
+        self.last_vad = None
+        self.last_stt = None            # {"mode", "confidence", "unknown", "corrections"}
+        self.detected_lang = None       # last language picked in "auto" mode
+        self.lang_scores = None
+        self.probe = bytearray()        # live "auto" audio held until LANG_PROBE_S
+        self.stream_lang = None
+        self.lock = threading.RLock()
+        self.touched = time.time()
+
+    @property
+    def project_mem(self):
+        """The project's memory as currently stored (shared, read-only)."""
+        return project_store().get(self.project_id)[1]
+
+    @property
+    def project_version(self):
+        return version_key(self.project_id, project_store().get(self.project_id)[0])
+
+    def vocabulary(self, lang):
+        """Site vocabulary of the current project version (grammar + biasing)."""
+        store = project_store()
+        return project_vocabulary(store, self.project_id, store.get(self.project_id)[0], lang)
+
+    def transcriber(self, lang):
+        """One recognizer per session and language, reused across recordings."""
+        live = self.live.get(lang)
+        if live is None:
+            live = self.live[lang] = LiveTranscriber(lang)
+        return live
+
+    def end_of_speech(self, lang):
+        eos = self.eos.get(lang)
+        if eos is None:
+            eos = self.eos[lang] = vad.EndOfSpeech()
+        return eos
+
+    @property
+    def chat_history(self):
+        return self.memory.messages()
+
+    def reset(self):
+        self.memory.clear()
+        self.llm_context = None
+        self.last_route = None
+        self.last_llm_stats = None
+
+    def state(self):
+        return {
+            "sid": self.sid,
+            "project_id": self.project_id,
+            "project_version": self.project_version,
+            "project_mem": self.project_mem,
+            "chat_history": self.chat_history,
+            "conversation": {**self.memory.stats(), "summary": self.memory.summary},
+            "last_route": self.last_route,
+            "last_llm_stats": self.last_llm_stats,
+            "last_vad": self.last_vad,
+            "last_stt": self.last_stt,
+            "detected_lang": self.detected_lang,
+            "lang_scores": self.lang_scores,
+            "settings": {"fast_path_score": self.fast_path_score, "cache_similarity": self.cache_similarity},
+        }
+
+
+
+# =========================================================
+# OLLAMA CLIENT (shared pool, warmed up by VoiceEngine.start)
+# =========================================================
+@functools.lru_cache(maxsize=None)
+def get_ollama():
+    return OllamaClient(OLLAMA_HOST, DEFAULT_LLM)
+
+
+def llm_summary(summary, evicted):
+    """Rolling conversation summary written by the LLM, but only while it is idle.
+
+    Runs on the summarizer thread; any contention or failure falls back to
+    conversation.template_summary so user turns never wait on it.
+    """
+    q = SCHEDULER.llm.stats()
+    if q["running"] or q["depth"]:
+        return template_summary(summary, evicted)
+    lines = "\n".join(f"{m['role']}: {m['content']}" for m in evicted)
+    prompt = (
+        "Update the running summary of a site-assistant conversation. Keep names, dates, "
+        "numbers and open questions; at most 60 words.\n"
+        f"Summary so far: {summary or '(none)'}\nNew turns:\n{lines}\nUpdated summary:"
+    )
+    try:   # gives the LLM back as soon as a user turn waits for it
+        r = background_generate({"model": DEFAULT_LLM, "prompt": prompt}, f"summary:{threading.get_ident()}", 100)
+    except Cancelled:
+        return template_summary(summary, evicted)
+    return r.get("response", "").strip() or template_summary(summary, evicted)
+
+
+BACKGROUND_LLM_S = 8.0   # wall-clock cap on one background (summary / speculative) generation
+
+
+def background_generate(payload, key, num_predict):
+    """LLM call for background work; returns Ollama's reply.
+
+    Takes the LLM slot at the lowest priority and gives it up as soon as a
+    user turn starts waiting for it (SCHEDULER.llm calls `preempt`). It is
+    also cut off after BACKGROUND_LLM_S or `num_predict` tokens. A
+    preempted call raises ollama_client.Cancelled.
+    """
+    client = get_ollama()
+    stopped = threading.Event()
+
+    def stop():
+        stopped.set()
+        client.cancel(key)
+
+    payload = {**payload, "options": {**payload.get("options", {}), "num_predict": num_predict}}
+    timer = threading.Timer(BACKGROUND_LLM_S, stop)
+    timer.daemon = True
+    with SCHEDULER.llm.slot(priority=9, preempt=stop):
+        if stopped.is_set():
+            raise Cancelled(key)
+        timer.start()
+        try:
+            return client.generate(payload, key=key)
+        finally:
+            timer.cancel()
+
+
+def prewarm_tts():
+    """Greeting + template replies for the default project, in both languages,
+    with every backend tts.prewarm_backends() picks."""
+    mem = project_store().get(DEFAULT_PROJECT_ID)[1]
+    phrases = [(GREETING, "hi")]
+    for intent in INTENTS:
+        for lang in ("en", "hi"):
+            phrases.append((template_answer(intent, mem, lang), lang))
+    return prewarm(phrases)
+
+
+
+# =========================================================
+# LLM GENERATION WITH MEMORY
+# =========================================================
+FAST_PATH_SCORE = 90   # detect_intent score at/above which the template is the answer
+FAST_PATH_WORDS = 8    # longer (normalized) queries are treated as open-ended
+OPEN_ENDED = re.compile(r"\b(why|explain|compare|should|suggest|recommend|reason|kyun|kyon|kaise|kyu)\b")
+
+
+def route_turn(session, user_text, lang, backend=None):
+    """Decide whether a turn can be answered without a fresh LLM call.
+
+    Returns a dict with intent, score, draft and path: "template" (high
+    confidence), "cache" (answer reused from RESPONSE_CACHE) or "llm". The
+    path may later become "busy" (LLM queue full), "fallback" (LLM error) or
+    "partial" (stream cut off after some text; not cached).
+    """
+    with span("intent"):
+        intent, score = detect_intents(user_text, 1)[0]
+    draft = template_answer(intent, session.project_mem, lang)
+    fast = (
+        score >= session.fast_path_score
+        and len(normalize(user_text).split()) <= FAST_PATH_WORDS
+        and not OPEN_ENDED.search(user_text.lower())
+    )
+    route = {
+        "intent": intent, "score": score, "draft": draft, "path": "template" if fast else "llm",
+        "query": normalize(user_text), "version": session.project_version,
+    }
+    if not fast:
+        with span("cache"):
+            hit = RESPONSE_CACHE.get(route["query"], intent, lang, route["version"], session.cache_similarity)
+        if hit is not None:
+            route.update(path="cache", answer=hit)
+    route["speculated"] = SPECULATOR.resolve(session.sid, route, lang, route["version"], backend or DEFAULT_BACKEND)
+    session.last_route = route
+    annotate(intent=intent, score=round(score, 1), path=route["path"], speculated=route["speculated"])
+    return route
+
+
+def cache_answer(route, lang, final):
+    if route["path"] == "llm" and final:
+        RESPONSE_CACHE.put(route["query"], route["intent"], lang, route["version"], final)
+
+
+SYSTEM_PROMPT = (
+    "You are Miss Riverwood, a friendly bilingual (Hindi/English) site assistant for "
+    "construction updates. Each turn gives you the relevant project facts and a draft "
+    "answer. Give a polished, short, helpful answer in the SAME LANGUAGE as the user."
+)
+CONTEXT_LIMIT = 1536   # tokens of carried-over KV context before starting afresh
+
+# Project-memory fields each intent actually needs in the prompt
+INTENT_FIELDS = {
+    "daily_update": ["project_name", "overall_progress", "milestones", "weather_note"],
+    "delays": ["delays", "weather_note"],
+    "materials": ["materials"],
+    "next_steps": ["next_steps", "milestones"],
+    "team": ["team"],
+    "safety": ["safety"],
+    "weather": ["weather_note"],
+    "percentage": ["overall_progress", "milestones"],
+    "contacts": ["contact", "site_hours"],
+    "site_hours": ["site_hours", "contact"],
+}
+
+
+def memory_slice(mem, intent):
+    """Compact `key: value` lines for the fields relevant to one intent."""
+    lines = []
+    for field in INTENT_FIELDS.get(intent, INTENT_FIELDS["daily_update"]):
+        v = mem.get(field)
+        if isinstance(v, dict):
+            v = ", ".join(f"{k} {x}" for k, x in v.items())
+        elif isinstance(v, list):
+            v = "; ".join(v)
+        lines.append(f"{field}: {v}")
+    return "\n".join(lines)
+
+
+def retrieve(session, user_text, intent, k=RETRIEVE_K):
+    """Top-k project records / site-log lines for this question.
+
+    BM25 over the project's records and daily logs, with the fields the
+    intent needs boosted. When nothing in the question matches the corpus
+    (e.g. a Devanagari-only query), it falls back to the intent's fields.
+    """
+    store = project_store()
+    version = store.get(session.project_id)[0]
+    with span("retrieve"):
+        index = project_index(store, session.project_id, version)
+        hits = index.search(user_text, k, prefer=INTENT_FIELDS.get(intent, INTENT_FIELDS["daily_update"]))
+    annotate(corpus=len(index), snippets=len(hits))
+    if hits:
+        return [doc for _, doc in hits]
+    return memory_slice(session.project_mem, intent).splitlines()
+
+
+def build_prompt(session, user_text, route):
+    """Ollama /api/generate payload for one turn.
+
+    Earlier turns ride along as the `context` tokens Ollama returned last
+    time, and those already begin with the persona. `system` is therefore
+    sent only when starting afresh; Ollama templates it in again on every
+    call that carries it. A continued turn prefills only its own text: the
+    few retrieved facts and the question. The `prompt_tokens` trace attribute
+    (Ollama's prompt_eval_count) shows it, split by `fresh_context`.
+    """
+    ctx = session.llm_context
+    if ctx and (ctx["version"] != route["version"] or len(ctx["tokens"]) > CONTEXT_LIMIT):
+        ctx = session.llm_context = None
+
+    facts = retrieve(session, user_text, route["intent"])
+    route["facts"] = len(facts)
+    turn = "Facts:\n" + "\n".join(facts) + "\n"
+    if not ctx:
+        turn += session.memory.prompt_block()   # summary + budgeted recent turns
+    turn += f"User asked: {user_text}\nDraft answer: {route['draft']}\n"
+
+    payload = {"model": DEFAULT_LLM, "prompt": turn}
+    if ctx:
+        payload["context"] = ctx["tokens"]
+    else:
+        payload["system"] = SYSTEM_PROMPT
+    annotate(fresh_context=not ctx)
+    return payload
+
+
+def record_llm_turn(session, reply, route):
+    """Keep Ollama's returned context for the next turn and log prefill cost."""
+    if reply.get("context"):
+        session.llm_context = {"tokens": reply["context"], "version": route["version"]}
+    stats = {
+        **(reply.get("timing") or {}),
+        "prompt_tokens": reply.get("prompt_eval_count", 0),
+        "prefill_ms": reply.get("prompt_eval_duration", 0) / 1e6,
+        "output_tokens": reply.get("eval_count", 0),
+        "generate_ms": reply.get("eval_duration", 0) / 1e6,
+        "context_tokens": len(reply.get("context") or ()),
+    }
+    session.last_llm_stats = stats
+    record("llm.connect", stats.get("connect_ms"))
+    record("llm.first_token", stats.get("first_token_ms"))
+    record("llm.prefill", stats["prefill_ms"] or None)
+    annotate(
+        prompt_tokens=stats["prompt_tokens"], output_tokens=stats["output_tokens"],
+        context_tokens=stats["context_tokens"],
+    )
+    log.info(
+        "llm turn: %(prompt_tokens)d prompt tokens, prefill %(prefill_ms).0f ms, "
+        "%(output_tokens)d output tokens in %(generate_ms).0f ms, context %(context_tokens)d", stats,
+    )
+
+
+def remember_turn(session, user_text, final, path="llm"):
+    session.memory.append("user", user_text)
+    session.memory.append("assistant", final, path=path)
+
+
+def generate_answer(session, user_text, lang, backend=None):
+    route = route_turn(session, user_text, lang, backend)
+    draft = route["draft"]
+
+    if route["path"] in ("template", "cache"):
+        final = route.get("answer", draft)
+        remember_turn(session, user_text, final, route["path"])
+        return final
+
+    with span("prompt"):
+        payload = build_prompt(session, user_text, route)
+
+    try:
+        with SCHEDULER.llm.slot(), span("llm"):
+            r = get_ollama().generate(payload, key=session.sid)
+        final = r.get("response") or draft
+        record_llm_turn(session, r, route)
+
+    except Busy as e:
+        log.info("llm queue full, answering with the template: %s", e)
+        final = draft
+        route["path"] = "busy"
+
+    except Exception as e:
+        log.warning("llm failed, answering with the template: %s", e)
+        fail(e)
+        final = draft
+        route["path"] = "fallback"
+
+    cache_answer(route, lang, final)
+    remember_turn(session, user_text, final, route["path"])
+
+    return final
+
+
+
+# =========================================================
+# STREAMING GENERATION (token stream -> sentences -> TTS)
+# =========================================================
+SENTENCE_END = re.compile(r"(?<=[.!?।])\s+")
+
+
+def split_sentences(buffer):
+    """Split off finished sentences; return (sentences, unfinished tail)."""
+    parts = SENTENCE_END.split(buffer)
+    return [p.strip() for p in parts[:-1] if p.strip()], parts[-1]
+
+
+def generate_answer_stream(session, user_text, lang, backend=None):
+    """Streaming twin of generate_answer: yields tokens, then records the turn."""
+    route = route_turn(session, user_text, lang, backend)
+    draft = route["draft"]
+
+    if route["path"] in ("template", "cache"):
+        final = route.get("answer", draft)
+        yield final
+        remember_turn(session, user_text, final, route["path"])
+        return
+
+    with span("prompt"):
+        payload = build_prompt(session, user_text, route)
+    final = ""
+    try:
+        with SCHEDULER.llm.slot(), span("llm"):
+            for tok in get_ollama().stream(
+                payload, key=session.sid, on_done=lambda chunk: record_llm_turn(session, chunk, route),
+            ):
+                final += tok
+                yield tok
+    except Busy as e:
+        log.info("llm queue full, answering with the template: %s", e)
+        final = draft
+        route["path"] = "busy"
+        yield draft
+    except Exception as e:
+        log.warning("llm stream failed after %d chars: %s", len(final), e)
+        fail(e)
+        if not final:
+            final = draft
+            route["path"] = "fallback"
+            yield draft
+        else:
+            route["path"] = "partial"   # cut off (error or a newer question): never cached
+
+    cache_answer(route, lang, final.strip())
+    remember_turn(session, user_text, final.strip() or draft, route["path"])
+
+
+def reply_events(session, user_text, lang, backend=None):
+    """Drive one streamed turn and yield UI-agnostic events.
+
+    {"type": "token", "text"}           as the LLM produces text
+    {"type": "audio", "seq", "mime", "data"}  each sentence, in order, as soon
+                                        as its synthesis (tts.submit) finishes
+    {"type": "done", "text", "route", "stats", "mime", "audio"}  the whole
+                                        reply with all clips joined
+    """
+    tts_lang = "hi" if lang == "hi" else "en"
+    mime = get_backend(backend).mime
+    text, tail = "", ""
+    clips, sent = [], 0
+    trace = current()
+
+    def synth(sentence):
+        if trace is None:
+            return submit(sentence, tts_lang, backend)
+
+        def timed():   # timed on the pool thread, before the future resolves
+            with trace.span("tts", chars=len(sentence)):
+                return speak(sentence, tts_lang, backend)
+        return SYNTH_POOL.submit(timed)
+
+    def first_audio():
+        if trace is not None and sent == 0:
+            trace.add("first_audio", (time.perf_counter() - trace.t0) * 1000, start_ms=0)
+
+    def clip(i):
+        try:
+            return clips[i].result()
+        except Exception as e:
+            log.warning("tts failed for sentence %d: %s", i, e)
+            return None
+
+    def ready():
+        nonlocal sent
+        while sent < len(clips) and clips[sent].done():
+            data = clip(sent)
+            if data:
+                first_audio()
+                yield {"type": "audio", "seq": sent, "mime": mime, "data": data}
+            sent += 1
+
+    for tok in generate_answer_stream(session, user_text, lang, backend):
+        text += tok
+        yield {"type": "token", "text": tok}
+        done, tail = split_sentences(tail + tok)
+        for s in done:
+            clips.append(synth(s))
+        yield from ready()
+
+    if tail.strip():
+        clips.append(synth(tail.strip()))
+    for i in range(sent, len(clips)):
+        data = clip(i)
+        if data:
+            if i == sent:
+                first_audio()
+            yield {"type": "audio", "seq": i, "mime": mime, "data": data}
+
+    audio = [a for a in (clip(i) for i in range(len(clips))) if a]
+    annotate(sentences=len(clips), reply_chars=len(text))
+    yield {
+        "type": "done", "text": text.strip(), "route": session.last_route,
+        "stats": session.last_llm_stats, "mime": mime,
+        "audio": join_audio(audio, backend) if audio else None,
+    }
+
+
+
+# =========================================================
+# SPECULATIVE PRE-GENERATION (likely next answers, while the user listens)
+# =========================================================
+def spoken_parts(text, streamed):
+    """The clips `text` is spoken as: per sentence when streamed (reply_events), else whole."""
+    if not streamed:
+        return [text]
+    done, tail = split_sentences(text)
+    return done + ([tail.strip()] if tail.strip() else [])
+
+
+def speculate(job, intent, polish):
+    """Speculator work for one predicted intent of the job's project version.
+
+    Synthesizes the template reply into the TTS cache. When `polish` is set,
+    the LLM stage is idle and the language has a canonical question, also
+    answers that question into RESPONSE_CACHE and synthesizes the answer.
+    The LLM call gives way to any user turn (see background_generate).
+    Returns the LLM answer or None.
+    """
+    x = job.extra
+    version, mem = project_store().get(x["project_id"])
+    if version_key(x["project_id"], version) != job.version:
+        return None                       # memory edited since the reply
+    tts_lang = "hi" if job.lang == "hi" else "en"
+
+    def synth(text):
+        for part in spoken_parts(text, x["streamed"]):
+            if job.cancelled.is_set():
+                return
+            speak(part, tts_lang, x["backend"])
+
+    draft = template_answer(intent, mem, job.lang)
+    synth(draft)
+    q = SCHEDULER.llm.stats()
+    if not polish or job.cancelled.is_set() or q["running"] or q["depth"]:
+        return None
+    question = CANONICAL.get(job.lang, {}).get(intent)
+    if question is None:
+        return None
+    payload = {
+        "model": DEFAULT_LLM, "system": SYSTEM_PROMPT,
+        "prompt": f"Facts:\n{memory_slice(mem, intent)}\nUser asked: {question}\nDraft answer: {draft}\n",
+    }
+    try:
+        answer = background_generate(payload, x["key"], SPECULATE_TOKENS).get("response", "").strip()
+    except Cancelled:
+        return None     # a user turn needed the LLM; the template audio is still ready
+    if not answer or job.cancelled.is_set():
+        return None
+    RESPONSE_CACHE.put(normalize(question), intent, job.lang, job.version, answer)
+    synth(answer)
+    return answer
+
+
+SPECULATOR = Speculator(speculate, on_cancel=lambda sid: get_ollama().cancel(f"speculate:{sid}"))
+
+
+def speculate_after(session, lang, backend=None, streamed=True):
+    """Start preparing the session's likely next answers (after a reply)."""
+    route = session.last_route
+    if route:
+        SPECULATOR.schedule(
+            session.sid, route["intent"], lang, route["version"], project_id=session.project_id,
+            backend=backend or DEFAULT_BACKEND, streamed=streamed, key=f"speculate:{session.sid}",
+        )
+
+
+
+# =========================================================
+# ENGINE (session registry + entry points for every front end)
+# =========================================================
+class VoiceEngine:
+    """In-process pipeline keyed by session id.
+
+    app.py (directly or through engine_client.RemoteEngine) and service.py
+    both talk to this interface, so the UI never touches models itself.
+    """
+
+    def __init__(self, session_ttl=SESSION_TTL):
+        self.sessions = {}
+        self.session_ttl = session_ttl
+        self.lock = threading.Lock()
+        self.started = False
+
+    def start(self):
+        """Preload both Vosk models, Ollama and the TTS cache in the
+        background and return at once (idempotent). Progress and timings
+        are in `stats()["startup"]`."""
+        with self.lock:
+            if self.started:
+                return self
+            self.started = True
+        if not HOST_ADDRESS:
+            STARTUP.run("vosk-import", lambda: __import__("vosk"))
+        for lang in LANGS:
+            if HOST_ADDRESS:   # models live in the shared host; only wait for it to come up
+                STARTUP.run(f"vosk-{lang}", wait_for_host)
+            else:
+                STARTUP.run(f"vosk-{lang}", functools.partial(load_vosk_model, lang), after=("vosk-import",))
+            if COMMAND_GRAMMAR:
+                STARTUP.run(f"grammar-{lang}", functools.partial(_compile_grammar, lang), after=(f"vosk-{lang}",))
+        STARTUP.run("ollama", lambda: get_ollama().warm_up())
+        STARTUP.run("tts-cache", lambda: prewarm_tts().join())
+        return self
+
+    # ---- sessions ---------------------------------------------------------
+    def session(self, sid=None):
+        now = time.time()
+        with self.lock:
+            for old in [k for k, s in self.sessions.items() if now - s.touched > self.session_ttl]:
+                del self.sessions[old]
+                SPECULATOR.forget(old)
+            s = self.sessions.get(sid)
+            if s is None:
+                s = Session(sid)
+                self.sessions[s.sid] = s
+            s.touched = now
+            return s
+
+    def new_session(self):
+        return self.session().sid
+
+    def state(self, sid):
+        return self.session(sid).state()
+
+    def reset(self, sid):
+        s = self.session(sid)
+        SPECULATOR.forget(s.sid)
+        get_ollama().cancel(s.sid)
+        with s.lock:
+            s.reset()
+
+    def update_memory(self, sid, mem):
+        s = self.session(sid)
+        with s.lock:
+            # bumps the version; every session on this project sees the edit and
+            # the store's listener drops answers cached against the old version
+            project_store().save(s.project_id, mem)
+        return s.state()
+
+    def update_settings(self, sid, **settings):
+        s = self.session(sid)
+        if settings.get("fast_path_score") is not None:
+            s.fast_path_score = settings["fast_path_score"]
+        if settings.get("cache_similarity") is not None:
+            s.cache_similarity = clamp_similarity(settings["cache_similarity"])
+        pid = settings.get("project_id")
+        if pid and pid != s.project_id:
+            project_store().get(pid)   # KeyError for an unknown project
+            with s.lock:
+                s.project_id = pid
+                s.llm_context = None
+        return s.state()
+
+    def projects(self):
+        return project_store().projects()
+
+    def add_site_log(self, sid, text, day=None):
+        """Append a daily site-log entry to the session's project (searched per turn)."""
+        s = self.session(sid)
+        project_store().add_log(s.project_id, text, day)
+        return s.state()
+
+    # ---- pipeline ---------------------------------------------------------
+    def transcribe(self, sid, raw, lang, on_partial=None):
+        """Decode one recording on a pooled recognizer.
+
+        Silence is trimmed by the VAD first, so only speech segments reach
+        Vosk. Runs through the STT stage: shorter clips are admitted first
+        and a full queue raises scheduler.Busy.
+        """
+        s = self.session(sid)
+        SPECULATOR.cancel(s.sid)   # the user is talking: free the CPU / LLM for this turn
+        with TRACER.turn("stt", sid=s.sid, lang=lang, bytes=len(raw)):
+            queued = time.perf_counter()
+            with SCHEDULER.stt.slot(priority=len(raw) // STT_PRIORITY_BYTES):
+                record("queue", (time.perf_counter() - queued) * 1000)
+                text = self._transcribe(s, raw, lang, on_partial)
+            annotate(chars=len(text))
+            return text
+
+    def _transcribe(self, s, raw, lang, on_partial):
+        pcm = to_pcm_16k(raw)
+        with span("vad"):
+            segments, s.last_vad = vad.trim(pcm)
+        annotate(audio_s=s.last_vad["audio_s"], speech_s=s.last_vad["speech_s"])
+        log.info(
+            "vad: %d segments, %.1f of %.1f s kept (%.0f%% skipped)", s.last_vad["segments"],
+            s.last_vad["speech_s"], s.last_vad["audio_s"], 100 * s.last_vad["skipped"],
+        )
+        if not segments:
+            return ""
+        if lang == "auto":
+            with span("langid"):
+                lang, s.lang_scores = identify_language(np.concatenate(segments))
+            s.detected_lang = lang
+            annotate(detected_lang=lang)
+        vocab = s.vocabulary(lang)
+        mode = "open"
+        if COMMAND_GRAMMAR and s.last_vad["speech_s"] <= COMMAND_MAX_S:
+            # short command-style query: decode against the site grammar first
+            with span("stt.grammar"), grammar_pool(vocab).transcriber() as live:
+                text = transcribe_vosk(lang, segments, live=live)
+                conf, unk = live.confidence, live.unknown
+            text = " ".join(w for w in text.split() if w != "[unk]")
+            if text and conf is not None and conf >= GRAMMAR_MIN_CONF and unk <= GRAMMAR_MAX_UNK:
+                s.last_stt = {"mode": "grammar", "confidence": round(conf, 2), "unknown": round(unk, 2), "corrections": 0}
+                annotate(stt_mode="grammar")
+                return text
+            mode = "open (grammar rejected)"
+        if len(pcm) > LONG_AUDIO_S * TARGET_RATE:
+            with span("stt", parallel=True):
+                text = parallel_transcriber(lang).transcribe(pcm)["text"]
+        else:
+            with span("stt"), recognizer_pool(lang).transcriber() as live:
+                text = transcribe_vosk(lang, segments, on_partial, live)
+        text, fixes = vocab.bias(text)
+        s.last_stt = {"mode": mode, "confidence": None, "unknown": None, "corrections": fixes}
+        annotate(stt_mode=mode, corrections=fixes)
+        return text
+
+    def transcribe_batch(self, raw, lang):
+        """Long-form transcription across cores: {"text", "words", "chunks"}.
+
+        Words carry start/end seconds on the original recording's timeline.
+        """
+        with SCHEDULER.stt.slot(priority=len(raw) // STT_PRIORITY_BYTES):
+            pcm = to_pcm_16k(raw)
+            if lang == "auto":
+                segments, _ = vad.trim(pcm)
+                lang = identify_language(np.concatenate(segments))[0] if segments else "en"
+            return {**parallel_transcriber(lang).transcribe(pcm), "lang": lang}
+
+    def feed(self, sid, lang, pcm):
+        """Live mode: push 16 kHz int16 PCM.
+
+        Returns {"text", "final"}; "final" is True when the VAD heard the end
+        of the utterance, in which case the recognizer has been finalized.
+        """
+        s = self.session(sid)
+        SPECULATOR.cancel(s.sid)
+        with s.lock:
+            ended = s.end_of_speech(lang).feed(pcm)
+            if lang == "auto":
+                if s.stream_lang is None:
+                    # hold audio until both models can be compared on it
+                    s.probe += bytes(pcm)
+                    if len(s.probe) < LANG_PROBE_S * TARGET_RATE * 2 and not ended:
+                        return {"text": "", "final": False}
+                    s.stream_lang, s.lang_scores = identify_language(np.frombuffer(bytes(s.probe), dtype="<i2"))
+                    s.detected_lang = s.stream_lang
+                    pcm, s.probe = bytes(s.probe), bytearray()
+                text = s.transcriber(s.stream_lang).feed(pcm)
+            else:
+                text = s.transcriber(lang).feed(pcm)
+            if ended:
+                return {"text": self._finish_locked(s, lang), "final": True}
+            return {"text": text, "final": False}
+
+    def finish(self, sid, lang):
+        s = self.session(sid)
+        with s.lock:
+            return self._finish_locked(s, lang)
+
+    def _finish_locked(self, s, lang):
+        s.end_of_speech(lang).reset()
+        if lang == "auto":
+            if s.stream_lang is None and s.probe:
+                s.stream_lang, s.lang_scores = identify_language(np.frombuffer(bytes(s.probe), dtype="<i2"))
+                s.detected_lang = s.stream_lang
+                s.transcriber(s.stream_lang).feed(bytes(s.probe))
+            lang, s.stream_lang, s.probe = s.stream_lang, None, bytearray()
+            if lang is None:
+                return ""
+        text, fixes = s.vocabulary(lang).bias(s.transcriber(lang).finish())
+        s.last_stt = {"mode": "live", "confidence": None, "unknown": None, "corrections": fixes}
+        return text
+
+    def reply(self, sid, text, lang, backend=None):
+        s = self.session(sid)
+        SPECULATOR.cancel(s.sid)
+        get_ollama().cancel(s.sid)   # a new question supersedes the old one
+        reply_lang = reply_language(text, lang)
+        with s.lock, TRACER.turn("reply", sid=s.sid, lang=lang, chars=len(text), stream=False):
+            final = generate_answer(s, text, reply_lang, backend)
+        speculate_after(s, reply_lang, backend, streamed=False)
+        return final
+
+    def reply_events(self, sid, text, lang, backend=None):
+        """Streamed reply (see reply_events).
+
+        The turn runs on a thread of its own, which holds the session lock
+        and the trace from start to end, and its events come through a
+        queue. The caller may therefore resume this generator from any
+        thread, as Starlette's threadpool does, and may stop early.
+        """
+        s = self.session(sid)
+        SPECULATOR.cancel(s.sid)
+        get_ollama().cancel(s.sid)
+        reply_lang = reply_language(text, lang)
+        q, stop, end = queue.Queue(), threading.Event(), object()
+
+        def run():
+            try:
+                done = False
+                with s.lock, TRACER.turn("reply", sid=s.sid, lang=lang, chars=len(text), stream=True):
+                    events = reply_events(s, text, reply_lang, backend)
+                    try:
+                        for ev in events:
+                            q.put(ev)
+                            done = ev["type"] == "done"
+                            if stop.is_set():
+                                break     # the consumer went away
+                    finally:
+                        events.close()
+                if done:      # even when the consumer stopped reading at "done"
+                    speculate_after(s, reply_lang, backend)
+            except Exception as e:
+                q.put(e)
+            finally:
+                q.put(end)
+
+        threading.Thread(target=run, name=f"reply-{s.sid[:8]}", daemon=True).start()
+        try:
+            while True:
+                item = q.get()
+                if item is end:
+                    return
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+        finally:
+            stop.set()
+
+    def speak(self, text, lang="en", backend=None):
+        with TRACER.turn("tts", lang=lang, backend=backend or "default", chars=len(text)), span("tts"):
+            return speak(text, lang, backend)
+
+    def set_tracing(self, enabled, path=None):
+        """Turn per-turn tracing on/off at runtime (RIVERWOOD_TRACE sets the default)."""
+        TRACER.enable(enabled, path)
+        return TRACER.stats()
+
+    # ---- introspection ----------------------------------------------------
+    def backends(self):
+        return available_backends()
+
+    def mime(self, backend=None):
+        return get_backend(backend).mime
+
+    def stats(self):
+        return {
+            "sessions": len(self.sessions),
+            "tts_cache": TTS_CACHE.stats(),
+            "response_cache": RESPONSE_CACHE.stats(),
+            "scheduler": SCHEDULER.stats(),
+            "startup": STARTUP.stats(),
+            "tracing": TRACER.stats(),
+            "models": model_stats(),
+            "speculation": SPECULATOR.stats(),
+        }
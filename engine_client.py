@@ -0,0 +1,104 @@
+import base64
+import json
+
+import requests
+
+from scheduler import Busy
+
+
+class RemoteEngine:
+    """HTTP client for service.py with the same interface as engine.VoiceEngine.
+
+    app.py uses this when RIVERWOOD_SERVICE is set, so the Streamlit UI can run
+    as a thin front end to a shared headless service.
+    """
+
+    def __init__(self, url, timeout=(3, 120)):
+        self.url = url.rstrip("/")
+        self.http = requests.Session()
+        self.timeout = timeout
+        self._mimes = None
+
+    def start(self):
+        return self
+
+    def _json(self, method, path, **kw):
+        r = self.http.request(method, self.url + path, timeout=self.timeout, **kw)
+        if r.status_code == 503 and r.headers.get("Retry-After"):
+            ev = r.json()
+            raise Busy(ev["stage"], ev["retry_after"])
+        r.raise_for_status()
+        return r.json()
+
+    def _events(self, path, **kw):
+        with self.http.post(self.url + path, stream=True, timeout=self.timeout, **kw) as r:
+            r.raise_for_status()
+            for line in r.iter_lines():
+                if not line:
+                    continue
+                ev = json.loads(line)
+                for k in ("data", "audio"):
+                    if isinstance(ev.get(k), str):
+                        ev[k] = base64.b64decode(ev[k])
+                yield ev
+
+    # ---- sessions ---------------------------------------------------------
+    def new_session(self):
+        return self._json("POST", "/sessions")["sid"]
+
+    def state(self, sid):
+        return self._json("GET", f"/sessions/{sid}")
+
+    def reset(self, sid):
+        self._json("POST", f"/sessions/{sid}/reset")
+
+    def update_memory(self, sid, mem):
+        return self._json("PUT", f"/sessions/{sid}/memory", json=mem)
+
+    def update_settings(self, sid, **settings):
+        return self._json("PUT", f"/sessions/{sid}/settings", json=settings)
+
+    def projects(self):
+        return self._json("GET", "/projects")
+
+    def add_site_log(self, sid, text, day=None):
+        return self._json("POST", f"/sessions/{sid}/logs", json={"text": text, "day": day})
+
+    # ---- pipeline ---------------------------------------------------------
+    def transcribe(self, sid, raw, lang, on_partial=None):
+        text = ""
+        for ev in self._events(f"/sessions/{sid}/transcribe", params={"lang": lang}, data=raw):
+            if ev["type"] == "busy":
+                raise Busy(ev["stage"], ev["retry_after"])
+            if ev["type"] == "partial" and on_partial:
+                on_partial(ev["text"])
+            elif ev["type"] == "transcript":
+                text = ev["text"]
+        return text
+
+    def reply(self, sid, text, lang, backend=None):
+        return self._json("POST", f"/sessions/{sid}/answer", json={"text": text, "lang": lang, "backend": backend})["text"]
+
+    def reply_events(self, sid, text, lang, backend=None):
+        yield from self._events(f"/sessions/{sid}/reply", json={"text": text, "lang": lang, "backend": backend})
+
+    def speak(self, text, lang="en", backend=None):
+        r = self.http.get(self.url + "/tts", params={"text": text, "lang": lang, "backend": backend}, timeout=self.timeout)
+        r.raise_for_status()
+        return r.content
+
+    # ---- introspection ----------------------------------------------------
+    def backends(self):
+        if self._mimes is None:
+            self._mimes = self._json("GET", "/backends")
+        return list(self._mimes)
+
+    def mime(self, backend=None):
+        self.backends()
+        return self._mimes.get(backend) or next(iter(self._mimes.values()), "audio/mp3")
+
+    def stats(self):
+        return self._json("GET", "/stats")
+
+    def set_tracing(self, enabled, path=None):
+        return self._json("PUT", "/tracing", json={"enabled": enabled})
@@ -0,0 +1,127 @@
+import re
+from collections import defaultdict
+
+import numpy as np
+from rapidfuzz import fuzz, process
+
+
+# =========================================================
+# INTENT TABLE
+# =========================================================
+STOP = set("the a an is are was were be been to for on in at from of with and or as what tell give show how when where who which do does can please kindly".split())
+
+REPL = {
+    "updation": "update",
+    "constructions": "construction",
+    "material": "materials",
+    "safety update": "safety",
+    "worksite": "site",
+}
+
+INTENTS = {
+    "daily_update": ["construction update", "project update", "progress", "status", "what happened today"],
+    "delays": ["delay", "blocked", "stuck", "issue"],
+    "materials": ["materials", "cement", "steel", "brick", "tiles", "delivery"],
+    "next_steps": ["next step", "tomorrow", "upcoming"],
+    "team": ["team", "workforce", "workers"],
+    "safety": ["safety", "ppe", "scaffold"],
+    "weather": ["weather", "rain", "hot", "wind"],
+    "percentage": ["percentage", "overall progress"],
+    "contacts": ["contact", "reach"],
+    "site_hours": ["site hours", "timings", "working hours"],
+}
+
+DEFAULT_INTENT = "daily_update"
+WHOLE_WORD_LEN = 4   # phrases this short must match a whole word ("rain" not in "training")
+
+
+
+# =========================================================
+# NORMALIZATION
+# =========================================================
+PUNCT = re.compile(r"[^\w\s]")
+# One alternation for all REPL entries, longest first, on word boundaries
+REPL_RE = re.compile(r"\b(" + "|".join(re.escape(k) for k in sorted(REPL, key=len, reverse=True)) + r")\b")
+
+
+def normalize(t):
+    t = PUNCT.sub(" ", t.lower())
+    t = REPL_RE.sub(lambda m: REPL[m.group(1)], t)
+    return " ".join([w for w in t.split() if w not in STOP])
+
+
+
+# =========================================================
+# COMPILED INTENT INDEX
+# =========================================================
+def _pad(phrase):
+    """Anchor a phrase at a word start, and short ones at a word end too.
+
+    partial_ratio scores a phrase found anywhere in the query at 100, so
+    "hot" matched "photos". With a leading space the phrase has to start a
+    word, which still lets inflections through ("delay" in "delays"). Short
+    phrases also get a trailing space, so they only match whole words.
+    """
+    return f" {phrase} " if len(phrase) <= WHOLE_WORD_LEN else f" {phrase}"
+
+
+def _grams(s, n=3):
+    s = f" {s} "
+    return {s[i:i + n] for i in range(len(s) - n + 1)}
+
+
+class IntentIndex:
+    """Intent phrases preprocessed once and scored in a single batch.
+
+    A character-trigram inverted index narrows the phrases to those that share
+    at least one trigram with the query (a phrase with none cannot score well
+    on partial_ratio); the survivors are scored with one `process.cdist` call.
+    Phrases are matched at word boundaries (see `_pad`).
+    """
+
+    def __init__(self, intents):
+        self.labels = list(intents)
+        self.choices, self.owner = [], []
+        for n, (intent, keys) in enumerate(intents.items()):
+            for k in keys:
+                self.choices.append(k.lower())
+                self.owner.append(n)
+        self.owner = np.asarray(self.owner, dtype=np.int32)
+        self.padded = [_pad(c) for c in self.choices]
+
+        self.postings = defaultdict(list)
+        for i, c in enumerate(self.choices):
+            for g in _grams(c):
+                self.postings[g].append(i)
+
+    def candidates(self, t):
+        hits = set()
+        for g in _grams(t):
+            hits.update(self.postings.get(g, ()))
+        return np.fromiter(sorted(hits), dtype=np.int32) if hits else np.arange(len(self.choices), dtype=np.int32)
+
+    def top(self, text, k=3):
+        """Return up to k (intent, score) pairs, best first."""
+        t = normalize(text)
+        if not t:
+            return [(DEFAULT_INTENT, 0.0)]
+        cand = self.candidates(t)
+        scores = process.cdist([f" {t} "], [self.padded[i] for i in cand], scorer=fuzz.partial_ratio, dtype=np.float32)[0]
+
+        # Best phrase score per intent; ties keep table order like the old loop
+        best = np.full(len(self.labels), -1.0, dtype=np.float32)
+        np.maximum.at(best, self.owner[cand], scores)
+        order = sorted(range(len(self.labels)), key=lambda n: (-best[n], n))
+        ranked = [(self.labels[n], float(best[n])) for n in order[:k] if best[n] > 0]
+        return ranked or [(DEFAULT_INTENT, 0.0)]
+
+
+INTENT_INDEX = IntentIndex(INTENTS)
+
+
+def detect_intents(text, k=3):
+    return INTENT_INDEX.top(text, k)
+
+
+def detect_intent(text):
+    return INTENT_INDEX.top(text, 1)[0][0]
@@ -0,0 +1,15 @@
+import re
+
+
+# =========================================================
+# REPLY LANGUAGE (shared by the engine and the thin UI client)
+# =========================================================
+GREETING = "Namaste! Main Miss Riverwood hoon — aapke daily construction updates ki saathi. Aap Hindi ya English mix mein puch sakte ho, aur main turant jawab dungi."
+DEVANAGARI = re.compile(r"[\u0900-\u097F]")
+
+
+def reply_language(text, lang):
+    """Reply/TTS language; "auto" follows the transcript's script."""
+    if lang != "auto":
+        return lang
+    return "hi" if DEVANAGARI.search(text) else "en"
@@ -0,0 +1,273 @@
+"""Shared Vosk model host: one process holds the models, workers decode over IPC.
+
+    python model_host.py [--address data/vosk.sock] [--langs hi en]
+    RIVERWOOD_MODEL_HOST=data/vosk.sock RIVERWOOD_MODEL_HOST_KEY=<key it printed> streamlit run app.py
+
+A Vosk model is a few hundred MB of heap once Kaldi has read it, and
+Vosk cannot map it from disk, so every process that loads one pays for its
+own copy. That covers each Streamlit server, each batch recognizer and each
+parallel_stt worker. With RIVERWOOD_MODEL_HOST set, those processes create
+a `RemoteRecognizer` instead. It has the KaldiRecognizer methods the
+engine uses, and each one drives a recognizer inside this host over a
+local socket (a Unix socket path, or "host:port" where Unix sockets are
+unavailable). Each model is therefore resident once per machine. Decoding
+runs on one host thread per connection, and Vosk's native calls release
+the GIL, so recognizers still decode in parallel.
+
+Connections are authenticated with RIVERWOOD_MODEL_HOST_KEY, since the
+host unpickles what clients send. A host started without one generates a
+random key and prints it; clients take it from the same variable, like
+the address. Unix sockets are created owner-only (0600).
+
+Each audio chunk costs one round trip: the host answers `feed` with the
+acceptance flag and the matching Result or PartialResult. Host stats hold
+per-model load time and the host's RSS. `rss_mb()` gives the same for any
+worker, for sizing machines.
+"""
+import argparse
+import logging
+import os
+import secrets
+import socket
+import sys
+import threading
+import time
+from multiprocessing.connection import Client, Listener
+
+HOST_ADDRESS = os.environ.get("RIVERWOOD_MODEL_HOST", "")   # "" = load models in-process
+KEY_ENV = "RIVERWOOD_MODEL_HOST_KEY"
+DEFAULT_ADDRESS = "data/vosk.sock" if hasattr(socket, "AF_UNIX") else "127.0.0.1:8766"
+
+log = logging.getLogger("riverwood.model_host")
+
+
+def _address(address):
+    """(address, family) for a Unix socket path or "host:port"."""
+    host, sep, port = address.rpartition(":")
+    if sep and port.isdigit() and "/" not in address:
+        return (host or "127.0.0.1", int(port)), "AF_INET"
+    return address, "AF_UNIX"
+
+
+def _authkey():
+    """This machine's host key, read when connecting (a batch sets it after import)."""
+    key = os.environ.get(KEY_ENV, "")
+    if not key:
+        raise RuntimeError(f"{KEY_ENV} is not set; use the key the model host printed")
+    return key.encode()
+
+
+def new_key():
+    """A fresh host key, also exported so child processes inherit it."""
+    os.environ[KEY_ENV] = secrets.token_hex(16)
+    return os.environ[KEY_ENV]
+
+
+def rss_mb():
+    """Resident memory of this process in MB (peak RSS where /proc is missing)."""
+    try:
+        with open("/proc/self/status") as fp:
+            for line in fp:
+                if line.startswith("VmRSS:"):
+                    return round(int(line.split()[1]) / 1024, 1)
+    except OSError:
+        pass
+    try:
+        import resource
+    except ImportError:
+        return None    # Windows
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+
+# =========================================================
+# HOST (owns the models)
+# =========================================================
+class ModelHost:
+    """Loads each model once and serves recognizers to connected workers."""
+
+    def __init__(self, model_path):
+        self.model_path = model_path      # lang -> model directory
+        self.models = {}
+        self.load_s = {}
+        self.lock = threading.Lock()
+        self.connections = self.served = 0
+
+    def model(self, lang):
+        with self.lock:
+            if lang not in self.models:
+                from vosk import Model
+                t0 = time.perf_counter()
+                self.models[lang] = Model(str(self.model_path(lang)))
+                self.load_s[lang] = round(time.perf_counter() - t0, 2)
+                log.info("model %s loaded in %.1f s, host RSS %s MB", lang, self.load_s[lang], rss_mb())
+            return self.models[lang]
+
+    def stats(self):
+        with self.lock:
+            return {
+                "pid": os.getpid(), "rss_mb": rss_mb(), "models": sorted(self.models),
+                "load_s": dict(self.load_s), "connections": self.connections, "recognizers_served": self.served,
+            }
+
+    def serve_forever(self, address):
+        addr, family = _address(address)
+        if family == "AF_UNIX" and os.path.exists(addr):
+            os.unlink(addr)       # stale socket from a previous run
+        umask = os.umask(0o177)   # the socket file is created 0600
+        try:
+            listener = Listener(addr, family, authkey=_authkey())
+        finally:
+            os.umask(umask)
+        with listener:
+            log.info("model host listening on %s", address)
+            while True:
+                try:
+                    conn = listener.accept()
+                except (OSError, EOFError) as e:    # failed handshake; keep serving
+                    log.warning("rejected connection: %s", e)
+                    continue
+                threading.Thread(target=self._serve, args=(conn,), daemon=True).start()
+
+    def _serve(self, conn):
+        rec = None
+        with self.lock:
+            self.connections += 1
+        try:
+            while True:
+                op, *args = conn.recv()
+                try:
+                    if op == "feed":
+                        accepted = rec.AcceptWaveform(args[0])
+                        out = (accepted, rec.Result() if accepted else rec.PartialResult())
+                    elif op == "open":
+                        from vosk import KaldiRecognizer
+                        lang, rate, grammar = args
+                        model = self.model(lang)
+                        rec = KaldiRecognizer(model, rate, grammar) if grammar else KaldiRecognizer(model, rate)
+                        with self.lock:
+                            self.served += 1
+                        out = None
+                    elif op == "final":
+                        out = rec.FinalResult()
+                    elif op == "reset":
+                        out = rec.Reset()
+                    elif op == "words":
+                        out = rec.SetWords(args[0])
+                    elif op == "stats":
+                        out = self.stats()
+                    else:
+                        raise ValueError(f"unknown op {op!r}")
+                    conn.send(("ok", out))
+                except Exception as e:
+                    conn.send(("error", f"{type(e).__name__}: {e}"))
+        except (EOFError, OSError):
+            pass      # worker went away
+        finally:
+            conn.close()
+            with self.lock:
+                self.connections -= 1
+
+
+
+# =========================================================
+# CLIENT (in each worker process)
+# =========================================================
+def _connect(address):
+    addr, family = _address(address)
+    return Client(addr, family, authkey=_authkey())
+
+
+class RemoteRecognizer:
+    """KaldiRecognizer stand-in whose decoding runs in the model host."""
+
+    def __init__(self, lang, rate, grammar=None, address=None):
+        self.conn = _connect(address or HOST_ADDRESS)
+        self.lock = threading.Lock()
+        self.last = ""
+        self._call("open", lang, rate, grammar)
+
+    def _call(self, op, *args):
+        with self.lock:
+            self.conn.send((op, *args))
+            status, out = self.conn.recv()
+        if status != "ok":
+            raise RuntimeError(f"model host: {out}")
+        return out
+
+    def AcceptWaveform(self, data):
+        accepted, self.last = self._call("feed", bytes(data))
+        return accepted
+
+    def Result(self):
+        return self.last        # sent along with the feed that completed it
+
+    def PartialResult(self):
+        return self.last
+
+    def FinalResult(self):
+        return self._call("final")
+
+    def Reset(self):
+        self._call("reset")
+
+    def SetWords(self, enabled):
+        self._call("words", bool(enabled))
+
+    def close(self):
+        self.conn.close()
+
+    def __del__(self):
+        if getattr(self, "conn", None) is not None:
+            self.conn.close()
+
+
+def host_stats(address=None):
+    """The host's stats ({"pid", "rss_mb", "load_s", ...})."""
+    conn = _connect(address or HOST_ADDRESS)
+    try:
+        conn.send(("stats",))
+        return conn.recv()[1]
+    finally:
+        conn.close()
+
+
+def wait_for_host(address=None, timeout=300.0):
+    """Block until the host accepts connections (its models are loaded by then)."""
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            return host_stats(address)
+        except (OSError, EOFError):
+            if time.monotonic() > deadline:
+                raise TimeoutError(f"model host {address or HOST_ADDRESS} not up after {timeout:.0f} s")
+            time.sleep(0.2)
+
+
+def serve(address, langs):
+    """Process entry point: load `langs` up front, then serve."""
+    from engine import model_path
+    from vosk import SetLogLevel
+    SetLogLevel(-1)
+    host = ModelHost(model_path)
+    for lang in langs:
+        host.model(lang)
+    host.serve_forever(address)
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--address", default=HOST_ADDRESS or DEFAULT_ADDRESS, help="Unix socket path or host:port")
+    ap.add_argument("--langs", nargs="*", default=["hi", "en"])
+    args = ap.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(name)s %(message)s")
+    if _address(args.address)[1] == "AF_UNIX":
+        os.makedirs(os.path.dirname(args.address) or ".", exist_ok=True)
+    if not os.environ.get(KEY_ENV):
+        print(f"{KEY_ENV}={new_key()}", flush=True)
+    serve(args.address, args.langs)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+import json
+import logging
+import os
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+
+# =========================================================
+# CONFIG
+# =========================================================
+OLLAMA_HOST = os.environ.get("RIVERWOOD_OLLAMA", "http://127.0.0.1:11434")
+DEFAULT_LLM = "llama3.2:1b"
+KEEP_ALIVE = "30m"      # how long Ollama keeps the model resident after a call
+
+log = logging.getLogger("riverwood.ollama")
+
+
+class OllamaError(RuntimeError):
+    pass
+
+
+class Cancelled(OllamaError):
+    """The generation was superseded by a newer request for the same key."""
+
+
+
+# =========================================================
+# CLIENT
+# =========================================================
+class OllamaClient:
+    """Pooled, keep-alive HTTP client for Ollama's /api/generate.
+
+    * one requests.Session with a connection pool, reused by every session
+    * `keep_alive` on every call and `warm_up()` to load the model up front
+    * bounded retries with backoff for connect errors / 5xx, but never once
+      tokens have been yielded
+    * separate connect and read (per-chunk) timeouts
+    * `begin(key)` cancels whatever was still generating for that key
+    """
+
+    def __init__(self, host=OLLAMA_HOST, model=DEFAULT_LLM, keep_alive=KEEP_ALIVE,
+                 connect_timeout=3.0, read_timeout=60.0, retries=2, backoff=0.4, pool_size=8):
+        self.host = host.rstrip("/")
+        self.model, self.keep_alive = model, keep_alive
+        self.timeout = (connect_timeout, read_timeout)
+        self.retries, self.backoff = retries, backoff
+        self.http = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.http.mount("http://", adapter)
+        self.http.mount("https://", adapter)
+        self._inflight = {}          # key -> (Event, Response | None)
+        self._lock = threading.Lock()
+        self.last_timing = None
+
+    # ---- cancellation -----------------------------------------------------
+    def begin(self, key):
+        """Cancel any in-flight generation for `key` and return a new token."""
+        self.cancel(key)
+        ev = threading.Event()
+        with self._lock:
+            self._inflight[key] = (ev, None)
+        return ev
+
+    def cancel(self, key):
+        with self._lock:
+            ev, resp = self._inflight.pop(key, (None, None))
+        if ev is not None:
+            ev.set()
+        if resp is not None:
+            resp.close()   # unblocks a read waiting on the socket
+
+    def _attach(self, key, ev, resp):
+        with self._lock:
+            if self._inflight.get(key, (None,))[0] is ev:
+                self._inflight[key] = (ev, resp)
+
+    def _finish(self, key, ev):
+        with self._lock:
+            if self._inflight.get(key, (None,))[0] is ev:
+                del self._inflight[key]
+
+    # ---- HTTP -------------------------------------------------------------
+    def _post(self, path, body, stream):
+        body = {"model": self.model, "keep_alive": self.keep_alive, **body}
+        for attempt in range(self.retries + 1):
+            try:
+                r = self.http.post(self.host + path, json=body, stream=stream, timeout=self.timeout)
+                if r.status_code < 500:
+                    r.raise_for_status()
+                    return r
+                err = OllamaError(f"HTTP {r.status_code}: {r.text[:200]}")
+                r.close()
+            except (requests.ConnectionError, requests.Timeout) as e:
+                err = e
+            if attempt < self.retries:
+                log.warning("ollama %s failed (%s), retry %d", path, err, attempt + 1)
+                time.sleep(self.backoff * (2 ** attempt))
+        raise OllamaError(str(err)) from err
+
+    def warm_up(self):
+        """Load the model into memory (empty prompt); returns seconds taken."""
+        t0 = time.perf_counter()
+        self._post("/api/generate", {"prompt": ""}, stream=False).close()
+        took = time.perf_counter() - t0
+        log.info("ollama warm-up of %s took %.2f s", self.model, took)
+        return took
+
+    def generate(self, payload, key=None):
+        """Blocking generation; returns Ollama's final JSON (response, context, stats)."""
+        text, final = "", {}
+        for tok in self.stream(payload, key=key, on_done=final.update):
+            text += tok
+        return {**final, "response": text}
+
+    def stream(self, payload, key=None, on_done=None):
+        """Yield tokens as they arrive; the final chunk goes to `on_done`.
+
+        Raises Cancelled if `begin(key)` is called again meanwhile.
+        """
+        ev = self.begin(key) if key is not None else threading.Event()
+        timing = {"start": time.perf_counter()}
+        try:
+            r = self._post("/api/generate", {**payload, "stream": True}, stream=True)
+            timing["connected"] = time.perf_counter()
+            if key is not None:
+                self._attach(key, ev, r)
+            with r:
+                for line in r.iter_lines():
+                    if ev.is_set():
+                        raise Cancelled(key)
+                    if not line:
+                        continue
+                    chunk = json.loads(line)
+                    if chunk.get("error"):
+                        raise OllamaError(chunk["error"])
+                    if chunk.get("response"):
+                        timing.setdefault("first_token", time.perf_counter())
+                        yield chunk["response"]
+                    if chunk.get("done"):
+                        timing["done"] = time.perf_counter()
+                        chunk["timing"] = self._timing(timing)
+                        self.last_timing = chunk["timing"]
+                        if on_done: on_done(chunk)
+                        return
+        except (requests.ConnectionError, AttributeError, ValueError):
+            # A cancelled stream surfaces as an error from the closed socket
+            if ev.is_set():
+                raise Cancelled(key)
+            raise
+        finally:
+            if key is not None:
+                self._finish(key, ev)
+
+    @staticmethod
+    def _timing(t):
+        ms = lambda a, b: round((t[b] - t[a]) * 1000, 1) if a in t and b in t else None
+        return {
+            "connect_ms": ms("start", "connected"),
+            "first_token_ms": ms("start", "first_token"),
+            "total_ms": ms("start", "done"),
+        }
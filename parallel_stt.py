@@ -0,0 +1,142 @@
+"""Batch transcription of long recordings across CPU cores.
+
+The recording is cut at silence (vad.py) into chunks of roughly
+CHUNK_TARGET_S; a process pool decodes them, each worker holding one loaded
+Vosk model and one KaldiRecognizer with word timestamps enabled, and the
+results are stitched back in order on the original timeline.
+
+With RIVERWOOD_MODEL_HOST set, workers hold a RemoteRecognizer on the
+shared model host instead of their own model copy (see model_host.py).
+"""
+import json
+import multiprocessing as mp
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+import vad
+from model_host import HOST_ADDRESS, RemoteRecognizer, rss_mb
+
+RATE = 16000
+CHUNK_TARGET_S = 30.0    # aim for chunks about this long
+CHUNK_MAX_S = 60.0       # force a cut (at the quietest frame) beyond this
+
+_worker = {}             # per-process: loaded model + recognizer
+
+
+
+# =========================================================
+# CHUNK PLANNING
+# =========================================================
+def _quietest_cut(pcm, start, lo, hi):
+    """Sample index of the lowest-energy frame in pcm[start + lo : start + hi]."""
+    db, _ = vad.frame_features(pcm[start + lo:start + hi])
+    return start + lo + int(np.argmin(db)) * vad.FRAME if db.size else start + hi
+
+
+def plan_chunks(pcm, target_s=CHUNK_TARGET_S, max_s=CHUNK_MAX_S):
+    """Group VAD speech segments into [(start, end)] chunks of ~target_s."""
+    target, longest = int(target_s * RATE), int(max_s * RATE)
+    chunks = []
+    for s, e in vad.speech_segments(pcm):
+        # split a segment with no usable pause at its quietest point
+        while e - s > longest:
+            cut = _quietest_cut(pcm, s, target, longest)
+            chunks.append([s, cut])
+            s = cut
+        if chunks and e - chunks[-1][0] <= target:
+            chunks[-1][1] = e
+        else:
+            chunks.append([s, e])
+    return [tuple(c) for c in chunks]
+
+
+
+# =========================================================
+# WORKER
+# =========================================================
+def _init_worker(lang, model_path):
+    t0 = time.perf_counter()
+    if HOST_ADDRESS:
+        _worker["rec"] = RemoteRecognizer(lang, RATE)
+    else:
+        from vosk import KaldiRecognizer, Model, SetLogLevel
+        SetLogLevel(-1)
+        _worker["model"] = Model(model_path)
+        _worker["rec"] = KaldiRecognizer(_worker["model"], RATE)
+    _worker["rec"].SetWords(True)
+    _worker["lang"] = lang
+    _worker["load_s"] = round(time.perf_counter() - t0, 2)
+
+
+def _decode(job):
+    idx, start, pcm = job
+    rec = _worker["rec"]
+    rec.Reset()
+    words, texts = [], []
+
+    def collect(res):
+        r = json.loads(res)
+        if r.get("text"):
+            texts.append(r["text"])
+        for w in r.get("result", ()):
+            words.append({
+                "word": w["word"], "conf": w.get("conf", 1.0),
+                "start": round(w["start"] + start / RATE, 3), "end": round(w["end"] + start / RATE, 3),
+            })
+
+    step = 8000
+    for i in range(0, len(pcm), step):
+        if rec.AcceptWaveform(pcm[i:i + step]):
+            collect(rec.Result())
+    collect(rec.FinalResult())
+    return idx, " ".join(texts), words
+
+
+
+# =========================================================
+# POOL
+# =========================================================
+class ParallelTranscriber:
+    """Process pool of Vosk workers for one language."""
+
+    def __init__(self, lang, model_path, workers=None):
+        self.lang = lang
+        self.workers = workers or os.cpu_count() or 1
+        self.pool = ProcessPoolExecutor(
+            self.workers, mp_context=mp.get_context("spawn"),   # never fork the threaded server (or Vosk/Kaldi state)
+            initializer=_init_worker, initargs=(lang, str(model_path)),
+        )
+
+    def transcribe(self, pcm, target_s=CHUNK_TARGET_S):
+        """Return {"text", "words", "chunks"}; words carry absolute timestamps."""
+        pcm = np.asarray(pcm, dtype="<i2")
+        chunks = plan_chunks(pcm, target_s)
+        jobs = [(i, s, pcm[s:e].tobytes()) for i, (s, e) in enumerate(chunks)]
+        results = sorted(self.pool.map(_decode, jobs))
+        return {
+            "text": " ".join(t for _, t, _ in results if t),
+            "words": [w for _, _, ws in results for w in ws],
+            "chunks": [(s / RATE, e / RATE) for s, e in chunks],
+        }
+
+    def warm_up(self):
+        """Make every worker load its model now rather than on first use."""
+        list(self.pool.map(_noop, range(self.workers * 2)))
+
+    def worker_stats(self):
+        """[{"pid", "rss_mb", "load_s"}] of the workers that answered (one per pid)."""
+        return list({w["pid"]: w for w in self.pool.map(_stats, range(self.workers * 2))}.values())
+
+    def close(self):
+        self.pool.shutdown(cancel_futures=True)
+
+
+def _noop(_):
+    return os.getpid()
+
+
+def _stats(_):
+    return {"pid": os.getpid(), "rss_mb": rss_mb(), "load_s": _worker.get("load_s")}
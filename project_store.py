@@ -0,0 +1,264 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+
+# =========================================================
+# CONFIG
+# =========================================================
+DB_PATH = Path(os.environ.get("RIVERWOOD_DB", "data/riverwood.db"))
+DEFAULT_PROJECT_ID = os.environ.get("RIVERWOOD_PROJECT", "tower-a")
+
+log = logging.getLogger("riverwood.store")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS projects (
+    id       TEXT PRIMARY KEY,
+    name     TEXT NOT NULL,
+    version  INTEGER NOT NULL DEFAULT 1,
+    updated  REAL NOT NULL
+);
+-- one row per milestone / material / delay / ... ; scalars are a single row
+CREATE TABLE IF NOT EXISTS records (
+    project_id TEXT NOT NULL REFERENCES projects(id) ON DELETE CASCADE,
+    kind       TEXT NOT NULL,          -- memory field: milestones, materials, site_hours, ...
+    pos        INTEGER NOT NULL,       -- order within the field
+    shape      TEXT NOT NULL,          -- list | dict | value | empty (an empty list / dict)
+    key        TEXT,                   -- dict entries: material name, team role, ...
+    value      TEXT NOT NULL,          -- JSON
+    PRIMARY KEY (project_id, kind, pos)
+);
+DROP INDEX IF EXISTS records_by_key;  -- no query filters on (project_id, key); it only slowed edits
+-- free-text daily site logs, searched by retrieval.py
+CREATE TABLE IF NOT EXISTS site_logs (
+    id         INTEGER PRIMARY KEY,
+    project_id TEXT NOT NULL REFERENCES projects(id) ON DELETE CASCADE,
+    day        TEXT NOT NULL,          -- ISO date
+    text       TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS site_logs_by_day ON site_logs (project_id, day);
+"""
+
+
+
+# =========================================================
+# PROJECT STORE (SQLite, shared by every session and process)
+# =========================================================
+def _rows(mem):
+    """Project-memory dict -> {kind: [(pos, shape, key, value_json)]}."""
+    out = {}
+    for kind, v in mem.items():
+        if isinstance(v, (dict, list)) and not v:
+            out[kind] = [(0, "empty", None, json.dumps(v))]   # keeps the field when it is emptied
+        elif isinstance(v, dict):
+            out[kind] = [(i, "dict", k, json.dumps(x, ensure_ascii=False)) for i, (k, x) in enumerate(v.items())]
+        elif isinstance(v, list):
+            out[kind] = [(i, "list", None, json.dumps(x, ensure_ascii=False)) for i, x in enumerate(v)]
+        else:
+            out[kind] = [(0, "value", None, json.dumps(v, ensure_ascii=False))]
+    return out
+
+
+def _assemble(rows):
+    """(kind, shape, key, value_json) rows in pos order -> project-memory dict."""
+    mem = {}
+    for kind, shape, key, value in rows:
+        v = json.loads(value)
+        if shape == "dict":
+            mem.setdefault(kind, {})[key] = v
+        elif shape == "list":
+            mem.setdefault(kind, []).append(v)
+        elif shape == "empty":
+            mem[kind] = v
+        else:
+            mem[kind] = v
+    return mem
+
+
+class ProjectStore:
+    """Versioned project memory, one record per milestone, material, delay...
+
+    Every write bumps the project's version and tells subscribers
+    `(project_id, old_version, new_version)`, so caches built on the old
+    data can be dropped. Reads are served from an in-memory snapshot per
+    project that is only rebuilt when the version moves. A write from
+    another process (the service and the app can share one file) is
+    picked up by a cheap `PRAGMA data_version` check.
+    """
+
+    def __init__(self, path=DB_PATH, seed=None):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.db = sqlite3.connect(str(self.path), check_same_thread=False, isolation_level=None)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA foreign_keys=ON")
+        self.db.executescript(SCHEMA)
+        self.lock = threading.RLock()
+        self.snapshots = {}          # project_id -> (version, mem)
+        self.versions = {}           # project_id -> last version seen by this process
+        self.listeners = []
+        self.data_version = self._data_version()
+        if seed and not self.projects():
+            for pid, mem in seed.items():
+                self.save(pid, mem)
+
+    # ---- change notifications ---------------------------------------------
+    def subscribe(self, fn):
+        """Call fn(project_id, old_version, new_version) after every change."""
+        self.listeners.append(fn)
+
+    def _notify(self, pid, old, new):
+        for fn in self.listeners:
+            try:
+                fn(pid, old, new)
+            except Exception as e:
+                log.warning("project listener failed: %s", e)
+
+    def _data_version(self):
+        return self.db.execute("PRAGMA data_version").fetchone()[0]
+
+    def _sync(self):
+        """Drop snapshots another connection has made stale."""
+        dv = self._data_version()
+        if dv == self.data_version:
+            return
+        self.data_version = dv
+        current = dict(self.db.execute("SELECT id, version FROM projects"))
+        for pid, ver in list(self.versions.items()):
+            if current.get(pid) != ver:
+                self.snapshots.pop(pid, None)
+                self.versions[pid] = current.get(pid)
+                self._notify(pid, ver, current.get(pid))
+
+    # ---- reads --------------------------------------------------------------
+    def projects(self):
+        with self.lock:
+            return [
+                {"id": pid, "name": name, "version": ver}
+                for pid, name, ver in self.db.execute("SELECT id, name, version FROM projects ORDER BY id")
+            ]
+
+    def get(self, pid):
+        """(version, memory dict) for a project. The dict is shared: treat it as read-only."""
+        with self.lock:
+            self._sync()
+            snap = self.snapshots.get(pid)
+            if snap is None:
+                row = self.db.execute("SELECT version FROM projects WHERE id = ?", (pid,)).fetchone()
+                if row is None:
+                    raise KeyError(pid)
+                mem = _assemble(self.db.execute(
+                    "SELECT kind, shape, key, value FROM records WHERE project_id = ? ORDER BY kind, pos", (pid,),
+                ))
+                snap = self.snapshots[pid] = (row[0], mem)
+                self.versions[pid] = row[0]
+            return snap
+
+    def records(self, pid):
+        """(kind, key, value) for every record of a project, in field order."""
+        with self.lock:
+            return [
+                (kind, key, json.loads(value)) for kind, key, value in self.db.execute(
+                    "SELECT kind, key, value FROM records WHERE project_id = ? AND shape != 'empty' "
+                    "ORDER BY kind, pos", (pid,),
+                )
+            ]
+
+    def logs(self, pid, since=None):
+        """(day, text) site-log entries, oldest first."""
+        with self.lock:
+            return self.db.execute(
+                "SELECT day, text FROM site_logs WHERE project_id = ? AND day >= ? ORDER BY day, id",
+                (pid, since or ""),
+            ).fetchall()
+
+    def logs_since(self, pid, after_id=0):
+        """(id, day, text) site-log entries added after `after_id`, in insertion order."""
+        with self.lock:
+            return self.db.execute(
+                "SELECT id, day, text FROM site_logs WHERE project_id = ? AND id > ? ORDER BY id", (pid, after_id),
+            ).fetchall()
+
+    # ---- writes -------------------------------------------------------------
+    def add_log(self, pid, text, day=None):
+        """Append a daily site-log entry; bumps the project's version."""
+        day = day or time.strftime("%Y-%m-%d")
+        with self.lock:
+            self._sync()
+            # version read inside the write transaction, so two processes cannot both bump to N+1
+            self.db.execute("BEGIN IMMEDIATE")
+            try:
+                row = self.db.execute("SELECT version FROM projects WHERE id = ?", (pid,)).fetchone()
+                if row is None:
+                    raise KeyError(pid)
+                version = row[0] + 1
+                self.db.execute("INSERT INTO site_logs (project_id, day, text) VALUES (?, ?, ?)", (pid, day, text))
+                self.db.execute("UPDATE projects SET version = ?, updated = ? WHERE id = ?", (version, time.time(), pid))
+                self.db.execute("COMMIT")
+            except Exception:
+                self.db.execute("ROLLBACK")
+                raise
+            self.data_version = self._data_version()
+            snap = self.snapshots.get(pid)
+            if snap is not None:
+                self.snapshots[pid] = (version, snap[1])   # records themselves did not change
+            self.versions[pid] = version
+        self._notify(pid, row[0], version)
+        return version
+
+    def save(self, pid, mem):
+        """Write a project's memory, touching only the fields that changed.
+
+        Returns the (possibly unchanged) version.
+        """
+        new = _rows(mem)
+        with self.lock:
+            self._sync()
+            # read and bump the version inside the write transaction (other processes share the file)
+            self.db.execute("BEGIN IMMEDIATE")
+            try:
+                row = self.db.execute("SELECT version FROM projects WHERE id = ?", (pid,)).fetchone()
+                old_version = row[0] if row else None
+                old = {}
+                for kind, pos, shape, key, value in self.db.execute(
+                    "SELECT kind, pos, shape, key, value FROM records WHERE project_id = ? ORDER BY kind, pos", (pid,),
+                ):
+                    old.setdefault(kind, []).append((pos, shape, key, value))
+                changed = [k for k in new.keys() | old.keys() if new.get(k) != old.get(k)]
+                if row and not changed:
+                    self.db.execute("ROLLBACK")
+                    return old_version
+
+                version = (old_version or 0) + 1
+                self.db.execute(
+                    "INSERT INTO projects (id, name, version, updated) VALUES (?, ?, ?, ?) "
+                    "ON CONFLICT(id) DO UPDATE SET name = excluded.name, version = excluded.version, "
+                    "updated = excluded.updated",
+                    (pid, str(mem.get("project_name", pid)), version, time.time()),
+                )
+                for kind in changed:
+                    self.db.execute("DELETE FROM records WHERE project_id = ? AND kind = ?", (pid, kind))
+                    self.db.executemany(
+                        "INSERT INTO records (project_id, kind, pos, shape, key, value) VALUES (?, ?, ?, ?, ?, ?)",
+                        [(pid, kind, *r) for r in new.get(kind, ())],
+                    )
+                self.db.execute("COMMIT")
+            except Exception:
+                self.db.execute("ROLLBACK")
+                raise
+            self.data_version = self._data_version()
+            self.snapshots.pop(pid, None)
+            self.versions[pid] = version
+        log.info("project %s v%d: %s changed", pid, version, ", ".join(sorted(changed)))
+        if old_version is not None:
+            self._notify(pid, old_version, version)
+        return version
+
+
+def version_key(pid, version):
+    """Cache key for one version of one project's memory."""
+    return f"{pid}@{version}"
@@ -0,0 +1,108 @@
+import threading
+import time
+from collections import OrderedDict
+
+from rapidfuzz import fuzz, process
+
+
+# =========================================================
+# CONFIG
+# =========================================================
+MAX_ITEMS = 512
+TTL_S = 15 * 60          # answers older than this are re-generated
+SIMILARITY = 88          # token_sort_ratio needed to reuse a neighbour's answer
+
+
+
+def clamp_similarity(value):
+    """Similarity thresholds are rapidfuzz scores: 0..100."""
+    return min(100.0, max(0.0, float(value)))
+
+
+
+# =========================================================
+# SEMANTIC RESPONSE CACHE
+# =========================================================
+class ResponseCache:
+    """LLM answers keyed by (intent, lang, memory version, normalized query).
+
+    Exact keys hit directly; otherwise the closest cached query in the same
+    (intent, lang, version) bucket is reused if it is at least `threshold`
+    similar, so rephrasings of the same question share one answer.
+    token_sort_ratio (not token_set_ratio) is used, because a question whose
+    words are a subset of another's ("any delays" / "any delays in steel
+    delivery") is a different question.
+    """
+
+    def __init__(self, max_items=MAX_ITEMS, ttl=TTL_S, threshold=SIMILARITY):
+        self.max_items, self.ttl, self.threshold = max_items, ttl, threshold
+        self.items: "OrderedDict[tuple, tuple]" = OrderedDict()   # key -> (answer, stored_at)
+        self.buckets = {}                                          # (intent, lang, ver) -> [query]
+        self.lock = threading.Lock()
+        self.hits = self.fuzzy_hits = self.misses = self.expired = 0
+
+    def get(self, query, intent, lang, version, threshold=None):
+        bucket = (intent, lang, version)
+        now = time.time()
+        threshold = clamp_similarity(self.threshold if threshold is None else threshold)
+        with self.lock:
+            key = bucket + (query,)
+            if key not in self.items:
+                near = process.extractOne(
+                    query, self.buckets.get(bucket, ()), scorer=fuzz.token_sort_ratio, score_cutoff=threshold,
+                )
+                if near is None:
+                    self.misses += 1
+                    return None
+                key = bucket + (near[0],)
+                fuzzy = True
+            else:
+                fuzzy = False
+
+            answer, stored = self.items[key]
+            if now - stored > self.ttl:
+                self._drop(key)
+                self.expired += 1
+                self.misses += 1
+                return None
+            self.items.move_to_end(key)
+            self.hits += 1
+            self.fuzzy_hits += fuzzy
+            return answer
+
+    def put(self, query, intent, lang, version, answer):
+        bucket = (intent, lang, version)
+        key = bucket + (query,)
+        with self.lock:
+            if key not in self.items:
+                self.buckets.setdefault(bucket, []).append(query)
+            self.items[key] = (answer, time.time())
+            self.items.move_to_end(key)
+            while len(self.items) > self.max_items:
+                self._drop(next(iter(self.items)))
+
+    def invalidate(self, version):
+        """Forget every answer generated against `version` of the memory."""
+        with self.lock:
+            for key in [k for k in self.items if k[2] == version]:
+                self._drop(key)
+
+    def stats(self):
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits, "fuzzy_hits": self.fuzzy_hits, "misses": self.misses,
+                "expired": self.expired, "items": len(self.items),
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+    def _drop(self, key):
+        self.items.pop(key, None)
+        queries = self.buckets.get(key[:3])
+        if queries is not None:
+            queries.remove(key[3])
+            if not queries:
+                del self.buckets[key[:3]]
+
+
+RESPONSE_CACHE = ResponseCache()
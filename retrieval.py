@@ -0,0 +1,147 @@
+import math
+import threading
+from collections import defaultdict
+
+import numpy as np
+
+from intents import normalize
+
+
+# =========================================================
+# CONFIG
+# =========================================================
+RETRIEVE_K = 6        # snippets sent to the prompt per turn
+INTENT_BONUS = 1.5    # added to snippets from the fields the detected intent needs
+K1, B = 1.2, 0.75     # BM25 term-frequency saturation / length normalization
+
+
+
+# =========================================================
+# TOKENIZATION (words + word bigrams)
+# =========================================================
+def _stem(w):
+    return w[:-1] if len(w) > 3 and w.endswith("s") and not w.endswith("ss") else w
+
+
+def terms(text):
+    words = [_stem(w) for w in normalize(text).split()]
+    return words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+
+
+
+# =========================================================
+# BM25 INDEX
+# =========================================================
+class BM25Index:
+    """Okapi BM25 over short snippets, with an inverted index.
+
+    Each term maps to NumPy arrays of (doc id, term frequency). A query
+    only touches the postings of its own terms, so its cost follows how
+    often those terms occur, not the corpus size (apart from one vector
+    add and a partial sort). Term weights are computed at query time from
+    the current document count and lengths, so `add` can append documents
+    (new site-log lines) without rebuilding the index.
+    """
+
+    def __init__(self, docs=(), kinds=()):
+        self.docs, self.kinds = [], []
+        self.lengths = np.zeros(0, dtype=np.float32)
+        self.postings = {}                  # term -> (doc ids, term frequencies)
+        self.by_kind = defaultdict(list)
+        self.lock = threading.Lock()
+        self.add(docs, kinds)
+
+    def __len__(self):
+        return len(self.docs)
+
+    def add(self, docs, kinds):
+        """Append documents; only the postings of their own terms are touched."""
+        docs, kinds = list(docs), list(kinds)
+        if not docs:
+            return
+        postings = defaultdict(dict)
+        lengths = np.zeros(len(docs), dtype=np.float32)
+        with self.lock:
+            base = len(self.docs)
+            for j, doc in enumerate(docs):
+                ts = terms(doc)
+                lengths[j] = len(ts) or 1
+                for t in ts:
+                    postings[t][base + j] = postings[t].get(base + j, 0) + 1
+            for t, hits in postings.items():
+                ids = np.fromiter(hits.keys(), dtype=np.int32, count=len(hits))
+                tf = np.fromiter(hits.values(), dtype=np.float32, count=len(hits))
+                old = self.postings.get(t)
+                self.postings[t] = (ids, tf) if old is None else (np.concatenate([old[0], ids]), np.concatenate([old[1], tf]))
+            for j, kind in enumerate(kinds):
+                self.by_kind[kind].append(base + j)
+            self.docs += docs
+            self.kinds += kinds
+            self.lengths = np.concatenate([self.lengths, lengths])
+
+    def search(self, query, k=RETRIEVE_K, prefer=()):
+        """Top-k (score, doc) for the query; docs of `prefer` kinds get INTENT_BONUS.
+
+        Returns [] when no query term occurs in the corpus.
+        """
+        with self.lock:
+            n = len(self.docs)
+            if not n:
+                return []
+            avgdl = float(self.lengths.mean())
+            scores = np.zeros(n, dtype=np.float32)
+            matched = False
+            for t in set(terms(query)):
+                hit = self.postings.get(t)
+                if hit is None:
+                    continue
+                ids, tf = hit
+                idf = math.log(1 + (n - len(ids) + 0.5) / (len(ids) + 0.5))
+                norm = K1 * (1 - B + B * self.lengths[ids] / avgdl)
+                scores[ids] += idf * tf * (K1 + 1) / (tf + norm)
+                matched = True
+            if not matched:
+                return []
+            for kind in prefer:
+                ids = self.by_kind.get(kind)
+                if ids:
+                    scores[ids] += INTENT_BONUS
+            k = min(k, n)
+            top = np.argpartition(-scores, k - 1)[:k]
+            top = top[np.argsort(-scores[top])]
+            return [(float(scores[i]), self.docs[i]) for i in top if scores[i] > 0]
+
+
+
+# =========================================================
+# PROJECT CORPUS (records + site logs, one live index per project)
+# =========================================================
+def snippet(kind, key, value):
+    label = kind.replace("_", " ")
+    return f"{label} · {key.replace('_', ' ')}: {value}" if key else f"{label}: {value}"
+
+
+_indexes = {}     # (store, pid) -> (version, records, last log id, BM25Index)
+_index_lock = threading.Lock()
+
+
+def project_index(store, pid, version):
+    """The BM25 index of a project, kept current with its version.
+
+    One index per project. A version bump from new site-log entries only
+    appends those lines; an edit of the records themselves rebuilds it.
+    """
+    with _index_lock:
+        cached = _indexes.get((store, pid))
+        if cached is not None and cached[0] == version:
+            return cached[3]
+        records = store.records(pid)
+        if cached is not None and cached[1] == records:
+            index, last_id = cached[3], cached[2]
+        else:
+            index, last_id = BM25Index(), 0
+            index.add([snippet(kind, key, value) for kind, key, value in records], [kind for kind, _, _ in records])
+        logs = store.logs_since(pid, last_id)
+        index.add([f"site log {day}: {text}" for _, day, text in logs], ["site_log"] * len(logs))
+        _indexes[(store, pid)] = (version, records, logs[-1][0] if logs else last_id, index)
+        return index
@@ -0,0 +1,123 @@
+import heapq
+import itertools
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+
+# =========================================================
+# CONFIG
+# =========================================================
+STT_CONCURRENCY = int(os.environ.get("RIVERWOOD_STT_WORKERS", os.cpu_count() or 2))
+STT_QUEUE = int(os.environ.get("RIVERWOOD_STT_QUEUE", 16))
+LLM_CONCURRENCY = int(os.environ.get("RIVERWOOD_LLM_CONCURRENCY", 1))
+LLM_QUEUE = int(os.environ.get("RIVERWOOD_LLM_QUEUE", 8))
+MAX_WAIT_S = float(os.environ.get("RIVERWOOD_MAX_WAIT", 20))
+
+
+class Busy(RuntimeError):
+    """A stage queue is full (or the wait would be too long); retry later."""
+
+    def __init__(self, stage, retry_after):
+        super().__init__(f"{stage} is busy, retry in ~{retry_after:.0f}s")
+        self.stage, self.retry_after = stage, retry_after
+
+
+
+# =========================================================
+# STAGE (bounded, prioritized admission)
+# =========================================================
+class Stage:
+    """Admit at most `concurrency` jobs; queue up to `max_queue` more.
+
+    Waiters are served lowest `priority` first (FIFO within a priority).
+    A job that cannot be queued, or that waits longer than `max_wait`,
+    gets `Busy` instead of piling onto an overloaded backend.
+
+    Background work (summaries, speculation) passes `preempt`: while it
+    holds a slot, any foreground job that has to wait calls it, so the
+    background job stops and frees the slot instead of finishing first.
+    """
+
+    def __init__(self, name, concurrency, max_queue, max_wait=MAX_WAIT_S):
+        self.name = name
+        self.concurrency, self.max_queue, self.max_wait = concurrency, max_queue, max_wait
+        self.cv = threading.Condition()
+        self.running = 0
+        self.queue = []                     # heap of (priority, seq)
+        self.seq = itertools.count()
+        self.waits = deque(maxlen=512)      # seconds, recent admitted jobs
+        self.busy_s = deque(maxlen=64)      # seconds, recent job run times
+        self.admitted = self.rejected = self.preempted = 0
+        self.background = {}                # ticket -> preempt callback, while running
+
+    @contextmanager
+    def slot(self, priority=1, preempt=None):
+        ticket = (priority, next(self.seq))
+        t0 = time.monotonic()
+        with self.cv:
+            if self.running >= self.concurrency and len(self.queue) >= self.max_queue:
+                self.rejected += 1
+                raise Busy(self.name, self._eta())
+            heapq.heappush(self.queue, ticket)
+            if preempt is None and self.running >= self.concurrency and self.background:
+                for stop in self.background.values():
+                    stop()
+                self.preempted += len(self.background)
+                self.background.clear()
+            while self.running >= self.concurrency or self.queue[0] != ticket:
+                left = self.max_wait - (time.monotonic() - t0)
+                if left <= 0:
+                    self.queue.remove(ticket)
+                    heapq.heapify(self.queue)
+                    self.rejected += 1
+                    self.cv.notify_all()
+                    raise Busy(self.name, self._eta())
+                self.cv.wait(left)
+            heapq.heappop(self.queue)
+            self.running += 1
+            self.admitted += 1
+            self.waits.append(time.monotonic() - t0)
+            if preempt is not None:
+                self.background[ticket] = preempt
+            self.cv.notify_all()
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            with self.cv:
+                self.background.pop(ticket, None)
+                self.running -= 1
+                self.busy_s.append(time.monotonic() - started)
+                self.cv.notify_all()
+
+    def _eta(self):
+        per_job = sum(self.busy_s) / len(self.busy_s) if self.busy_s else 1.0
+        return per_job * (len(self.queue) + 1) / self.concurrency
+
+    def stats(self):
+        with self.cv:
+            w = sorted(self.waits)
+            pct = lambda p: round(w[min(len(w) - 1, int(p * len(w)))] * 1000, 1) if w else 0.0
+            return {
+                "running": self.running, "depth": len(self.queue),
+                "concurrency": self.concurrency, "max_queue": self.max_queue,
+                "admitted": self.admitted, "rejected": self.rejected, "preempted": self.preempted,
+                "wait_p50_ms": pct(0.50), "wait_p95_ms": pct(0.95),
+            }
+
+
+class Scheduler:
+    """One Stage per shared backend: Vosk decoding and Ollama generation."""
+
+    def __init__(self):
+        self.stt = Stage("stt", STT_CONCURRENCY, STT_QUEUE)
+        self.llm = Stage("llm", LLM_CONCURRENCY, LLM_QUEUE)
+
+    def stats(self):
+        return {"stt": self.stt.stats(), "llm": self.llm.stats()}
+
+
+SCHEDULER = Scheduler()
@@ -0,0 +1,281 @@
+"""Headless Miss Riverwood service: HTTP + WebSocket front for VoiceEngine.
+
+    uvicorn service:app --host 0.0.0.0 --port 8765
+
+HTTP (JSON unless noted)
+    POST /sessions                         -> {"sid"}
+    GET  /sessions/{sid}                   -> session state
+    PUT  /sessions/{sid}/memory            project memory JSON
+    PUT  /sessions/{sid}/settings          {"fast_path_score", "cache_similarity", "project_id"}
+    GET  /projects                         [{"id", "name", "version"}]
+    POST /sessions/{sid}/logs              {"text", "day"?} daily site log for the session's project
+    POST /sessions/{sid}/reset
+    POST /sessions/{sid}/transcribe?lang=  raw audio body -> NDJSON partial/transcript
+    POST /transcribe/batch?lang=           long recording -> {"text", "words", "chunks", "lang"}
+    POST /sessions/{sid}/answer            {"text", "lang", "backend"?} -> {"text", "state"} (blocking)
+    POST /sessions/{sid}/reply             {"text", "lang", "backend"} -> NDJSON events
+    GET  /tts?text=&lang=&backend=         audio bytes
+    GET  /stats                            caches, per-stage queue depth / wait, startup, traces,
+                                           model RSS / load time (and the shared model host's),
+                                           speculation hit rate / wasted compute
+    PUT  /tracing                          {"enabled"} -> per-stage p50/p95 of traced turns
+    A full stage queue answers 503 + Retry-After (or a {"type": "busy"} event).
+    lang is "hi", "en" or "auto" (pick the Vosk model per recording, reply in
+    the transcript's script); the detected language is in the session state.
+
+WebSocket /ws/{sid}
+    client -> {"type": "start", "lang"}     then binary frames of 16 kHz int16 PCM
+    server -> {"type": "partial", "text"}   after every frame
+    client -> {"type": "stop"}              server -> {"type": "transcript", "text"}
+                                            (also sent unprompted, "auto": true,
+                                            when the VAD hears the end of speech)
+    client -> {"type": "text", "text", "lang", "backend"}
+    server -> token / audio / done events; each audio event's bytes follow as
+              one binary frame
+
+Blocking work (Vosk, Ollama, TTS) runs on worker threads, so one event loop
+serves many sessions concurrently.
+"""
+import asyncio
+import base64
+import json
+import logging
+import math
+import queue
+import threading
+
+from fastapi import FastAPI, HTTPException, Request, WebSocket, WebSocketDisconnect
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+
+from engine import VoiceEngine
+from scheduler import Busy
+
+log = logging.getLogger("riverwood.service")
+
+ENGINE = VoiceEngine()
+app = FastAPI(title="Miss Riverwood voice agent")
+
+
+@app.on_event("startup")
+def startup():
+    ENGINE.start()
+
+
+@app.exception_handler(Busy)
+async def busy(request: Request, exc: Busy):
+    return JSONResponse(
+        busy_event(exc), status_code=503, headers={"Retry-After": str(math.ceil(exc.retry_after))},
+    )
+
+
+
+# =========================================================
+# HELPERS
+# =========================================================
+def wire(event):
+    """JSON-safe copy of an engine event (audio bytes -> base64)."""
+    out = dict(event)
+    for k in ("data", "audio"):
+        if isinstance(out.get(k), (bytes, bytearray)):
+            out[k] = base64.b64encode(out[k]).decode("ascii")
+    return out
+
+
+def busy_event(exc):
+    return {"type": "busy", "stage": exc.stage, "retry_after": round(exc.retry_after, 1), "error": str(exc)}
+
+
+def ndjson(events):
+    for ev in events:
+        yield json.dumps(wire(ev), ensure_ascii=False) + "\n"
+
+
+async def in_thread(gen_fn, *args):
+    """Run a blocking generator on a worker thread, yielding its items async."""
+    loop = asyncio.get_running_loop()
+    queue: asyncio.Queue = asyncio.Queue()
+    done = object()
+
+    def pump():
+        try:
+            for item in gen_fn(*args):
+                loop.call_soon_threadsafe(queue.put_nowait, item)
+        except Exception as e:
+            loop.call_soon_threadsafe(queue.put_nowait, e)
+        finally:
+            loop.call_soon_threadsafe(queue.put_nowait, done)
+
+    threading.Thread(target=pump, daemon=True).start()
+    while True:
+        item = await queue.get()
+        if item is done:
+            return
+        if isinstance(item, Exception):
+            raise item
+        yield item
+
+
+
+# =========================================================
+# HTTP
+# =========================================================
+@app.post("/sessions")
+def create_session():
+    return {"sid": ENGINE.new_session()}
+
+
+@app.get("/sessions/{sid}")
+def get_session(sid: str):
+    return ENGINE.state(sid)
+
+
+@app.put("/sessions/{sid}/memory")
+def put_memory(sid: str, mem: dict):
+    return ENGINE.update_memory(sid, mem)
+
+
+@app.put("/sessions/{sid}/settings")
+def put_settings(sid: str, settings: dict):
+    try:
+        return ENGINE.update_settings(sid, **settings)
+    except KeyError as e:
+        raise HTTPException(404, f"unknown project {e}")
+
+
+@app.get("/projects")
+def projects():
+    return ENGINE.projects()
+
+
+@app.post("/sessions/{sid}/logs")
+def add_site_log(sid: str, body: dict):
+    return ENGINE.add_site_log(sid, body["text"], body.get("day"))
+
+
+@app.post("/sessions/{sid}/reset")
+def reset_session(sid: str):
+    ENGINE.reset(sid)
+    return {"ok": True}
+
+
+@app.post("/sessions/{sid}/transcribe")
+async def transcribe(sid: str, request: Request, lang: str = "en"):
+    raw = await request.body()
+    if not raw:
+        raise HTTPException(400, "empty audio body")
+
+    def events():
+        # decode on its own thread so each partial is sent as Vosk produces it
+        q, done = queue.Queue(), object()
+
+        def run():
+            try:
+                text = ENGINE.transcribe(sid, raw, lang, on_partial=lambda p: q.put({"type": "partial", "text": p}))
+                q.put({"type": "transcript", "text": text})
+            except Busy as e:
+                q.put(busy_event(e))
+            except Exception as e:
+                q.put(e)
+            finally:
+                q.put(done)
+
+        threading.Thread(target=run, daemon=True).start()
+        while (ev := q.get()) is not done:
+            if isinstance(ev, Exception):
+                raise ev
+            yield ev
+
+    return StreamingResponse(ndjson(events()), media_type="application/x-ndjson")
+
+
+@app.post("/transcribe/batch")
+async def transcribe_batch(request: Request, lang: str = "en"):
+    raw = await request.body()
+    if not raw:
+        raise HTTPException(400, "empty audio body")
+    return await asyncio.to_thread(ENGINE.transcribe_batch, raw, lang)
+
+
+@app.post("/sessions/{sid}/answer")
+def answer(sid: str, body: dict):
+    text = (body.get("text") or "").strip()
+    if not text:
+        raise HTTPException(400, "text is required")
+    return {"text": ENGINE.reply(sid, text, body.get("lang", "en"), body.get("backend")), "state": ENGINE.state(sid)}
+
+
+@app.post("/sessions/{sid}/reply")
+def reply(sid: str, body: dict):
+    text = (body.get("text") or "").strip()
+    if not text:
+        raise HTTPException(400, "text is required")
+    events = ENGINE.reply_events(sid, text, body.get("lang", "en"), body.get("backend"))
+    # Starlette iterates a sync generator on its threadpool, a thread per next() at worst;
+    # ENGINE.reply_events keeps the turn itself (session lock, trace) on one thread
+    return StreamingResponse(ndjson(events), media_type="application/x-ndjson")
+
+
+@app.get("/tts")
+def tts(text: str, lang: str = "en", backend: str = None):
+    return Response(ENGINE.speak(text, lang, backend), media_type=ENGINE.mime(backend))
+
+
+@app.get("/backends")
+def backends():
+    return {name: ENGINE.mime(name) for name in ENGINE.backends()}
+
+
+@app.get("/stats")
+def stats():
+    return ENGINE.stats()
+
+
+@app.put("/tracing")
+def put_tracing(body: dict):
+    # the JSONL path stays whatever RIVERWOOD_TRACE set on the server
+    return ENGINE.set_tracing(bool(body.get("enabled", True)))
+
+
+
+# =========================================================
+# WEBSOCKET (streamed audio in, streamed text + audio out)
+# =========================================================
+@app.websocket("/ws/{sid}")
+async def voice_socket(ws: WebSocket, sid: str):
+    await ws.accept()
+    lang = "en"
+    try:
+        while True:
+            msg = await ws.receive()
+            if msg.get("bytes") is not None:
+                res = await asyncio.to_thread(ENGINE.feed, sid, lang, msg["bytes"])
+                if res["final"]:   # VAD end-of-speech: no "stop" needed
+                    await ws.send_json({"type": "transcript", "text": res["text"], "auto": True})
+                else:
+                    await ws.send_json({"type": "partial", "text": res["text"]})
+                continue
+            if msg.get("type") == "websocket.disconnect":
+                break
+
+            cmd = json.loads(msg.get("text") or "{}")
+            kind = cmd.get("type")
+            if kind == "start":
+                lang = cmd.get("lang", lang)
+            elif kind == "stop":
+                text = await asyncio.to_thread(ENGINE.finish, sid, lang)
+                await ws.send_json({"type": "transcript", "text": text})
+            elif kind == "text":
+                async for ev in in_thread(
+                    ENGINE.reply_events, sid, cmd["text"], cmd.get("lang", lang), cmd.get("backend"),
+                ):
+                    if ev["type"] == "audio":
+                        await ws.send_json({k: v for k, v in ev.items() if k != "data"})
+                        await ws.send_bytes(ev["data"])
+                    elif ev["type"] == "done":
+                        await ws.send_json({k: v for k, v in ev.items() if k != "audio"})
+                    else:
+                        await ws.send_json(ev)
+            else:
+                await ws.send_json({"type": "error", "error": f"unknown message type {kind!r}"})
+    except WebSocketDisconnect:
+        pass
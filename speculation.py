@@ -0,0 +1,214 @@
+import logging
+import os
+import threading
+import time
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+
+# =========================================================
+# CONFIG
+# =========================================================
+SPECULATE = os.environ.get("RIVERWOOD_SPECULATE", "1") == "1"
+TOP_K = 2                 # predicted next intents prepared after each reply
+POLISH_TOP = 1            # of those, how many also get an LLM answer (only while the LLM is idle)
+LEARNED_WEIGHT = 1.0      # one observed transition counts as much as one step of the static order
+SPECULATE_TOKENS = 120    # token budget of one polished answer (background work stays short)
+
+log = logging.getLogger("riverwood.speculation")
+
+# Likely follow-ups per intent, most likely first (mirrors the suggested-query chips)
+FOLLOW_UPS = {
+    "daily_update": ["delays", "next_steps", "percentage"],
+    "delays": ["next_steps", "materials", "weather"],
+    "materials": ["delays", "next_steps"],
+    "next_steps": ["team", "delays"],
+    "team": ["safety", "site_hours"],
+    "safety": ["team", "weather"],
+    "weather": ["delays", "next_steps"],
+    "percentage": ["next_steps", "delays"],
+    "contacts": ["site_hours"],
+    "site_hours": ["contacts", "team"],
+}
+
+# The question asked for each intent when its answer is polished ahead of time,
+# per turn language. Hindi has none: a cached answer only helps when the user's
+# words normalize to the same key, so Hindi turns get the template audio only.
+CANONICAL = {
+    "en": {
+        "daily_update": "What is the construction update today?",
+        "delays": "Any delays or blockers?",
+        "materials": "Materials delivery status?",
+        "next_steps": "What are the next steps tomorrow?",
+        "team": "Team on site today?",
+        "safety": "Safety updates?",
+        "weather": "Weather impact today?",
+        "percentage": "Overall progress percentage?",
+        "contacts": "Contacts and site hours?",
+        "site_hours": "What are the site working hours?",
+    },
+}
+
+
+
+# =========================================================
+# NEXT-INTENT PREDICTION
+# =========================================================
+class FollowUpModel:
+    """FOLLOW_UPS as a prior, re-ranked by the transitions users actually make."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counts = defaultdict(Counter)    # intent -> Counter(next intent)
+
+    def observe(self, prev, nxt):
+        if prev and nxt and prev != nxt:
+            with self.lock:
+                self.counts[prev][nxt] += 1
+
+    def predict(self, intent, k=TOP_K):
+        prior = FOLLOW_UPS.get(intent, [])
+        score = Counter({x: len(prior) - i for i, x in enumerate(prior)})
+        with self.lock:
+            for x, n in self.counts[intent].items():
+                score[x] += LEARNED_WEIGHT * n
+        score.pop(intent, None)
+        return [x for x, _ in score.most_common(k)]
+
+
+
+# =========================================================
+# SPECULATOR (idle-time pre-generation, one job per session)
+# =========================================================
+class Job:
+    def __init__(self, intent, lang, version, extra):
+        self.intent, self.lang, self.version, self.extra = intent, lang, version, extra
+        self.cancelled = threading.Event()
+        self.settled = False   # its cost has been booked as used / wasted
+        self.items = {}        # predicted intent -> {"state", "ms", "answer", "polish"}
+
+
+class Speculator:
+    """Prepare the answers to the likely next questions while the user listens.
+
+    `work(job, intent, polish) -> answer or None` does the preparing
+    (template TTS, plus an LLM answer when `polish`) and is supplied by the engine, like
+    ConversationMemory's summarizer. Jobs run one at a time on a single
+    background thread. `cancel(sid)` stops a session's job as soon as the
+    user speaks again, and whatever finished is kept.
+
+    The next turn calls `resolve`. A turn served by prepared work is a hit,
+    and the time spent on predictions that were not used is counted as
+    wasted.
+    """
+
+    def __init__(self, work, on_cancel=None):
+        self.work, self.on_cancel = work, on_cancel
+        self.model = FollowUpModel()
+        self.pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="speculate")
+        self.lock = threading.Lock()
+        self.jobs = {}       # sid -> Job
+        self.last_intent = {}
+        self.enabled = SPECULATE
+        self.scheduled = self.completed = self.cancelled = self.failed = 0
+        self.hits = self.misses = self.polished = 0
+        self.used_ms = self.wasted_ms = 0.0
+
+    def schedule(self, sid, intent, lang, version, **extra):
+        """After a reply: start preparing the predicted next intents for this session."""
+        with self.lock:
+            self.last_intent[sid] = intent
+        if not self.enabled:
+            return
+        self.cancel(sid)
+        job = Job(intent, lang, version, extra)
+        for i, x in enumerate(self.model.predict(intent)):
+            job.items[x] = {"state": "pending", "ms": 0.0, "answer": None, "polish": i < POLISH_TOP}
+        with self.lock:
+            self._settle(self.jobs.pop(sid, None))
+            self.jobs[sid] = job
+            self.scheduled += len(job.items)
+        self.pool.submit(self._run, sid, job)
+
+    def _run(self, sid, job):
+        for intent, item in job.items.items():
+            if job.cancelled.is_set():
+                break
+            t0 = time.perf_counter()
+            try:
+                item["answer"] = self.work(job, intent, item["polish"])
+                state = "cancelled" if job.cancelled.is_set() else "ready"
+            except Exception as e:
+                state = "cancelled" if job.cancelled.is_set() else "failed"
+                if state == "failed":
+                    log.warning("speculating %s failed: %s", intent, e)
+            with self.lock:
+                item.update(state=state, ms=(time.perf_counter() - t0) * 1000)
+                if job.settled:        # the next turn came while this item was running
+                    self.wasted_ms += item["ms"]
+                self.completed += state == "ready"
+                self.failed += state == "failed"
+                self.polished += state == "ready" and item["answer"] is not None
+
+    def cancel(self, sid):
+        """The user is talking again: stop preparing (finished items are kept)."""
+        with self.lock:
+            job = self.jobs.get(sid)
+            if job is None or job.cancelled.is_set():
+                return
+            job.cancelled.set()
+            self.cancelled += sum(it["state"] == "pending" for it in job.items.values())
+        if self.on_cancel:
+            self.on_cancel(sid)
+
+    def resolve(self, sid, route, lang, version, backend=None):
+        """Score the session's prepared work against the turn that was asked.
+
+        Returns True when the turn is served from it: a template answer whose
+        audio was synthesized ahead (with the TTS `backend` this turn uses),
+        or the polished answer coming back from the response cache.
+        """
+        intent = route["intent"]
+        with self.lock:
+            self.model.observe(self.last_intent.get(sid), intent)
+            job = self.jobs.pop(sid, None)
+            if job is None:
+                return False
+            job.cancelled.set()
+            item = job.items.get(intent)
+            hit = (
+                item is not None and item["state"] == "ready" and job.lang == lang and job.version == version
+                and job.extra.get("backend") == backend
+                and (route["path"] == "template" or (route["path"] == "cache" and route.get("answer") == item["answer"]))
+            )
+            if hit:
+                self.hits += 1
+                self.used_ms += item["ms"]
+                item["ms"] = 0.0
+            else:
+                self.misses += 1
+            self._settle(job)
+            return hit
+
+    def _settle(self, job):
+        if job is not None:
+            job.settled = True
+            self.wasted_ms += sum(it["ms"] for it in job.items.values())
+
+    def forget(self, sid):
+        self.cancel(sid)
+        with self.lock:
+            self._settle(self.jobs.pop(sid, None))
+            self.last_intent.pop(sid, None)
+
+    def stats(self):
+        with self.lock:
+            turns = self.hits + self.misses
+            spent = self.used_ms + self.wasted_ms
+            return {
+                "enabled": self.enabled, "scheduled": self.scheduled, "completed": self.completed,
+                "cancelled": self.cancelled, "failed": self.failed, "polished": self.polished,
+                "hits": self.hits, "misses": self.misses, "hit_rate": self.hits / turns if turns else 0.0,
+                "used_ms": round(self.used_ms, 1), "wasted_ms": round(self.wasted_ms, 1),
+                "wasted_share": self.wasted_ms / spent if spent else 0.0,
+            }
@@ -0,0 +1,86 @@
+import logging
+import threading
+import time
+
+
+log = logging.getLogger("riverwood.startup")
+
+PROCESS_T0 = time.monotonic()   # as close to process start as an import gets
+
+
+# =========================================================
+# READINESS (background warm-up tasks)
+# =========================================================
+class Readiness:
+    """Run warm-up tasks on background threads and remember how each went.
+
+    Every task is reported as pending / loading / ready / failed with its
+    start offset and duration, so the UI can show what is still warming
+    and where cold-start time went. Nothing waits on a task unless it
+    asks to (`wait`); the first user request simply finds the work done.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.tasks = {}       # name -> {"state", "start_s", "ms", "error"}
+        self.done = {}        # name -> threading.Event
+
+    def mark(self, name, t0, error=None):
+        """Record a step that already ran inline (e.g. a timed import)."""
+        with self.lock:
+            self.tasks[name] = {
+                "state": "failed" if error else "ready",
+                "start_s": round(t0 - PROCESS_T0, 3),
+                "ms": round((time.monotonic() - t0) * 1000, 1),
+                "error": error,
+            }
+            self.done.setdefault(name, threading.Event()).set()
+
+    def run(self, name, fn, after=()):
+        """Start `fn` on a daemon thread (once per name), after the tasks in `after`."""
+        with self.lock:
+            if name in self.tasks:
+                return
+            self.tasks[name] = {"state": "pending", "start_s": None, "ms": None, "error": None}
+            done = self.done.setdefault(name, threading.Event())
+
+        def task():
+            for dep in after:
+                self.wait(dep)
+            t0 = time.monotonic()
+            with self.lock:
+                self.tasks[name].update(state="loading", start_s=round(t0 - PROCESS_T0, 3))
+            try:
+                fn()
+                state, error = "ready", None
+            except Exception as e:
+                state, error = "failed", str(e)
+                log.warning("warm-up %s failed: %s", name, e)
+            ms = round((time.monotonic() - t0) * 1000, 1)
+            with self.lock:
+                self.tasks[name].update(state=state, ms=ms, error=error)
+            log.info("warm-up %s %s in %.0f ms", name, state, ms)
+            done.set()
+
+        threading.Thread(target=task, name=f"warmup-{name}", daemon=True).start()
+
+    def wait(self, name, timeout=None):
+        with self.lock:
+            done = self.done.setdefault(name, threading.Event())
+        return done.wait(timeout)
+
+    def ready(self, name):
+        with self.lock:
+            return self.tasks.get(name, {}).get("state") == "ready"
+
+    def stats(self):
+        with self.lock:
+            tasks = {k: dict(v) for k, v in self.tasks.items()}
+        return {
+            "uptime_s": round(time.monotonic() - PROCESS_T0, 1),
+            "ready": all(t["state"] in ("ready", "failed") for t in tasks.values()),
+            "tasks": tasks,
+        }
+
+
+STARTUP = Readiness()
@@ -0,0 +1,197 @@
+import contextvars
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from collections import defaultdict, deque
+from contextlib import contextmanager, nullcontext
+
+
+# =========================================================
+# CONFIG
+# =========================================================
+TRACE_PATH = os.environ.get("RIVERWOOD_TRACE", "")   # JSONL file; unset = tracing off
+KEEP = 512                                           # recent durations kept per stage
+
+log = logging.getLogger("riverwood.tracing")
+_current = contextvars.ContextVar("riverwood_trace", default=None)
+_OFF = nullcontext()
+
+
+
+# =========================================================
+# TRACE (one turn: transcription, reply or synthesis)
+# =========================================================
+class Trace:
+    """Spans of one turn, timed relative to its start.
+
+    A finished trace is one JSON object:
+    {"trace_id", "kind", "ts", "total_ms", "attrs", "spans": [{"name",
+    "start_ms", "ms", ...attrs, "error"?}], "error"?}
+    """
+
+    def __init__(self, kind, attrs):
+        self.id = uuid.uuid4().hex[:16]
+        self.kind = kind
+        self.ts = time.time()
+        self.t0 = time.perf_counter()
+        self.attrs = dict(attrs)
+        self.spans = []
+        self.error = None
+        self.closed = False
+
+    @contextmanager
+    def span(self, name, **attrs):
+        t0 = time.perf_counter()
+        rec = {"name": name, "start_ms": round((t0 - self.t0) * 1000, 2), **attrs}
+        try:
+            yield rec
+        except GeneratorExit:
+            raise     # a streaming consumer stopped early: not a failure
+        except BaseException as e:
+            rec["error"] = repr(e)
+            raise
+        finally:
+            rec["ms"] = round((time.perf_counter() - t0) * 1000, 2)
+            self.spans.append(rec)
+
+    def add(self, name, ms, start_ms=None, **attrs):
+        """Record a span measured elsewhere (e.g. Ollama's first-token time)."""
+        if ms is not None:
+            self.spans.append({"name": name, "start_ms": start_ms, "ms": round(ms, 2), **attrs})
+
+    def to_json(self):
+        out = {
+            "trace_id": self.id, "kind": self.kind, "ts": round(self.ts, 3),
+            "total_ms": round((time.perf_counter() - self.t0) * 1000, 2),
+            "attrs": self.attrs, "spans": self.spans,
+        }
+        if self.error:
+            out["error"] = self.error
+        return out
+
+
+
+# =========================================================
+# TRACER (JSONL export + live per-stage percentiles)
+# =========================================================
+class Tracer:
+    """Collects finished traces while enabled.
+
+    Disabled, `turn()` and the module-level `span()` return a shared no-op
+    context manager, so instrumented code pays one attribute lookup.
+    """
+
+    def __init__(self, path=TRACE_PATH):
+        self.lock = threading.Lock()
+        self.path = path or None
+        self.enabled = bool(path)
+        self.fp = None
+        self.durations = defaultdict(lambda: deque(maxlen=KEEP))   # "kind.span" -> ms
+        self.recent = deque(maxlen=20)
+        self.turns = self.errors = 0
+
+    def enable(self, enabled=True, path=None):
+        with self.lock:
+            self.enabled = enabled
+            if path is not None and path != self.path:
+                if self.fp:
+                    self.fp.close()
+                self.path, self.fp = path or None, None
+
+    @contextmanager
+    def turn(self, kind, **attrs):
+        """Trace one turn; the current trace lives in a context variable.
+
+        A turn that wraps a generator may end in another context than it
+        started in (a generator resumed on another thread). The variable
+        then cannot be reset there, so a finished trace is marked `closed`
+        and counts as no trace wherever it is still set.
+        """
+        if not self.enabled or current() is not None:
+            yield None      # off, or nested inside a turn that is already traced
+            return
+        trace = Trace(kind, attrs)
+        token = _current.set(trace)
+        try:
+            yield trace
+        except GeneratorExit:
+            raise           # the consumer closed the stream: a normal end
+        except BaseException as e:
+            trace.error = repr(e)
+            raise
+        finally:
+            trace.closed = True
+            try:
+                _current.reset(token)
+            except ValueError:
+                pass        # finished in another context; `closed` retires it there
+            self._finish(trace)
+
+    def _finish(self, trace):
+        rec = trace.to_json()
+        with self.lock:
+            self.turns += 1
+            self.errors += bool(trace.error) or any("error" in s for s in trace.spans)
+            self.durations[trace.kind].append(rec["total_ms"])
+            for s in trace.spans:
+                self.durations[f"{trace.kind}.{s['name']}"].append(s["ms"])
+            self.recent.append(rec)
+            if self.path:
+                try:
+                    if self.fp is None:
+                        self.fp = open(self.path, "a", encoding="utf-8")
+                    self.fp.write(json.dumps(rec, ensure_ascii=False) + "\n")
+                    self.fp.flush()
+                except OSError as e:
+                    log.warning("could not write trace to %s: %s", self.path, e)
+
+    def stats(self):
+        with self.lock:
+            stages = {}
+            for name, d in sorted(self.durations.items()):
+                w = sorted(d)
+                pct = lambda p: round(w[min(len(w) - 1, int(p * len(w)))], 1)
+                stages[name] = {"count": len(w), "p50_ms": pct(0.50), "p95_ms": pct(0.95)}
+            return {
+                "enabled": self.enabled, "path": self.path,
+                "turns": self.turns, "errors": self.errors, "stages": stages,
+            }
+
+
+TRACER = Tracer()
+
+
+def current():
+    """The trace of the turn running in this context, or None."""
+    trace = _current.get()
+    return trace if trace is not None and not trace.closed else None
+
+
+def span(name, **attrs):
+    """Time a block inside the current turn (a no-op outside one)."""
+    trace = current()
+    return trace.span(name, **attrs) if trace is not None else _OFF
+
+
+def record(name, ms, **attrs):
+    """Add a duration measured elsewhere to the current turn."""
+    trace = current()
+    if trace is not None:
+        trace.add(name, ms, **attrs)
+
+
+def fail(exc):
+    """Mark the current turn as failed for an error the pipeline recovered from."""
+    trace = current()
+    if trace is not None and trace.error is None:
+        trace.error = repr(exc)
+
+
+def annotate(**attrs):
+    """Attach attributes (audio duration, token counts, ...) to the current turn."""
+    trace = current()
+    if trace is not None:
+        trace.attrs.update(attrs)
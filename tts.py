@@ -0,0 +1,360 @@
+import abc
+import hashlib
+import importlib.util
+import io
+import os
+import re
+import shutil
+import socket
+import struct
+import subprocess
+import tempfile
+import threading
+import unicodedata
+import wave
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+
+
+# =========================================================
+# CONFIG
+# =========================================================
+CACHE_DIR = Path(os.environ.get("RIVERWOOD_TTS_CACHE", ".cache/tts"))
+MEM_LIMIT = 64 * 1024 * 1024     # bytes of audio kept in RAM
+DISK_LIMIT = 512 * 1024 * 1024   # bytes of audio kept under CACHE_DIR
+AUDIO_EXT = (".mp3", ".wav")     # cached clip formats, one per backend mime
+GTTS_HOST = ("translate.google.com", 443)   # probed before prewarming an online backend
+
+
+
+# =========================================================
+# CONTENT-ADDRESSED AUDIO CACHE
+# =========================================================
+class TTSCache:
+    """Two-level (RAM + disk) LRU cache of synthesized clips.
+
+    Keys are a SHA-1 of the normalized text, language and voice, so the same
+    sentence is only ever synthesized once across sessions and restarts.
+    Each key ends in its backend's file extension (``<sha1>.wav``), which
+    is also the name of its file on disk.
+    """
+
+    def __init__(self, root=CACHE_DIR, mem_limit=MEM_LIMIT, disk_limit=DISK_LIMIT):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.mem_limit, self.disk_limit = mem_limit, disk_limit
+        self.mem: "OrderedDict[str, bytes]" = OrderedDict()
+        self.mem_bytes = 0
+        self.lock = threading.Lock()
+        self.hits = self.misses = 0
+
+        # Disk index in LRU order (oldest access first)
+        files = sorted((p for p in self.root.iterdir() if p.suffix in AUDIO_EXT), key=lambda p: p.stat().st_mtime)
+        self.disk: "OrderedDict[str, int]" = OrderedDict((p.name, p.stat().st_size) for p in files)
+        self.disk_bytes = sum(self.disk.values())
+
+    @staticmethod
+    def key(text, lang, voice="gtts", ext="mp3"):
+        t = re.sub(r"\s+", " ", unicodedata.normalize("NFC", text)).strip()
+        return hashlib.sha1(f"{voice}\x1f{lang}\x1f{t}".encode("utf-8")).hexdigest() + f".{ext}"
+
+    def get(self, key):
+        with self.lock:
+            data = self.mem.get(key)
+            if data is not None:
+                self.mem.move_to_end(key)
+                self.hits += 1
+                return data
+            if key not in self.disk:
+                self.misses += 1
+                return None
+        try:
+            path = self.root / key
+            data = path.read_bytes()
+            os.utime(path)
+        except OSError:
+            with self.lock:
+                self._drop_disk(key)
+                self.misses += 1
+            return None
+        with self.lock:
+            self.disk.move_to_end(key)
+            self._put_mem(key, data)
+            self.hits += 1
+        return data
+
+    def put(self, key, data):
+        path = self.root / key
+        fd, tmp = tempfile.mkstemp(dir=self.root, suffix=".tmp")   # one per writer
+        try:
+            with os.fdopen(fd, "wb") as fp:
+                fp.write(data)
+            os.replace(tmp, path)
+        except BaseException:
+            Path(tmp).unlink(missing_ok=True)
+            raise
+        with self.lock:
+            self._put_mem(key, data)
+            self.disk_bytes += len(data) - self.disk.pop(key, 0)
+            self.disk[key] = len(data)
+            while self.disk_bytes > self.disk_limit and len(self.disk) > 1:
+                old = next(iter(self.disk))
+                self._drop_disk(old)
+                (self.root / old).unlink(missing_ok=True)
+
+    def stats(self):
+        with self.lock:
+            return {
+                "hits": self.hits, "misses": self.misses,
+                "mem_items": len(self.mem), "mem_bytes": self.mem_bytes,
+                "disk_items": len(self.disk), "disk_bytes": self.disk_bytes,
+            }
+
+    def _put_mem(self, key, data):
+        self.mem_bytes += len(data) - len(self.mem.pop(key, b""))
+        self.mem[key] = data
+        while self.mem_bytes > self.mem_limit and len(self.mem) > 1:
+            _, old = self.mem.popitem(last=False)
+            self.mem_bytes -= len(old)
+
+    def _drop_disk(self, key):
+        self.disk_bytes -= self.disk.pop(key, 0)
+
+
+TTS_CACHE = TTSCache()
+
+
+
+# =========================================================
+# BACKENDS
+# =========================================================
+class TTSBackend(abc.ABC):
+    """A speech engine: `synthesize(text, lang)` returns encoded audio bytes."""
+    name = "base"
+    mime = "audio/mp3"
+    offline = False
+
+    @property
+    def ext(self):
+        """File extension of the audio `synthesize` returns."""
+        return "wav" if self.mime == "audio/wav" else "mp3"
+
+    def available(self):
+        return True
+
+    @abc.abstractmethod
+    def synthesize(self, text, lang="en"):
+        ...
+
+
+class GTTSBackend(TTSBackend):
+    name = "gtts"
+    mime = "audio/mp3"
+
+    def available(self):
+        return importlib.util.find_spec("gtts") is not None
+
+    def synthesize(self, text, lang="en"):
+        from gtts import gTTS   # imported on first synthesis, not at startup
+        tts = gTTS(text=text, lang=lang, slow=False)
+        buf = io.BytesIO()
+        tts.write_to_fp(buf)
+        buf.seek(0)
+        return buf.read()
+
+
+def fix_wav_sizes(data):
+    """Fill in the RIFF and data chunk sizes of a WAV written to a pipe.
+
+    A writer that cannot seek back (espeak --stdout) leaves placeholder
+    sizes, so `wave` reads the wrong frame count and clips no longer join.
+    """
+    buf = bytearray(data)
+    if buf[:4] != b"RIFF" or buf[8:12] != b"WAVE":
+        return data
+    struct.pack_into("<I", buf, 4, len(buf) - 8)
+    pos = 12
+    while pos + 8 <= len(buf):
+        chunk, size = buf[pos:pos + 4], struct.unpack_from("<I", buf, pos + 4)[0]
+        if chunk == b"data":
+            struct.pack_into("<I", buf, pos + 4, len(buf) - pos - 8)
+            break
+        pos += 8 + size + (size & 1)
+    return bytes(buf)
+
+
+class EspeakBackend(TTSBackend):
+    """espeak-ng in a subprocess: no network, and calls run truly in parallel."""
+    name = "espeak"
+    mime = "audio/wav"
+    offline = True
+    voices = {"en": "en-in", "hi": "hi"}
+
+    def __init__(self):
+        self.exe = shutil.which("espeak-ng") or shutil.which("espeak")
+
+    def available(self):
+        return self.exe is not None
+
+    def synthesize(self, text, lang="en"):
+        return fix_wav_sizes(subprocess.run(
+            [self.exe, "--stdout", "-v", self.voices.get(lang, lang), "-s", "165", text],
+            check=True, capture_output=True, timeout=30,
+        ).stdout)
+
+
+class Pyttsx3Backend(TTSBackend):
+    """pyttsx3 (SAPI5 / NSSpeech / espeak driver). The engine is not
+    thread-safe, so renders are serialized behind a lock."""
+    name = "pyttsx3"
+    mime = "audio/wav"
+    offline = True
+
+    def __init__(self):
+        self.engine = None
+        self.voice_ids = {}     # lang -> voice id (None: driver default)
+        self.lock = threading.Lock()
+
+    def available(self):
+        try:
+            import pyttsx3  # noqa: F401
+            return True
+        except Exception:
+            return False
+
+    def synthesize(self, text, lang="en"):
+        import pyttsx3
+        with self.lock:
+            if self.engine is None:
+                self.engine = pyttsx3.init()
+            voice = self._voice(lang)
+            if voice is not None:
+                self.engine.setProperty("voice", voice)
+            fd, path = tempfile.mkstemp(suffix=".wav")
+            os.close(fd)
+            try:
+                self.engine.save_to_file(text, path)
+                self.engine.runAndWait()
+                return Path(path).read_bytes()
+            finally:
+                os.unlink(path)
+
+    def _voice(self, lang):
+        """First installed voice for `lang`, by its language tags or its id."""
+        if lang not in self.voice_ids:
+            def tags(v):
+                # espeak reports b"\x05hi", SAPI/NSSpeech report "en_US"-style strings
+                return [(t.decode("latin-1") if isinstance(t, bytes) else str(t)).strip("\x00\x05").lower()
+                        for t in (v.languages or [])]
+            match = [v for v in self.engine.getProperty("voices")
+                     if any(t.replace("_", "-").split("-")[0] == lang for t in tags(v))
+                     or re.search(rf"(^|[^a-z]){lang}([^a-z]|$)", (v.id or "").lower())]
+            self.voice_ids[lang] = match[0].id if match else None
+        return self.voice_ids[lang]
+
+
+BACKENDS = {b.name: b for b in (GTTSBackend(), EspeakBackend(), Pyttsx3Backend())}
+DEFAULT_BACKEND = os.environ.get("RIVERWOOD_TTS", "gtts")
+
+
+def get_backend(name=None):
+    return BACKENDS[name or DEFAULT_BACKEND]
+
+
+def available_backends():
+    return [name for name, b in BACKENDS.items() if b.available()]
+
+
+def online(addr=GTTS_HOST, timeout=2.0):
+    try:
+        socket.create_connection(addr, timeout=timeout).close()
+        return True
+    except OSError:
+        return False
+
+
+def prewarm_backends():
+    """Installed backends worth prewarming: the configured one and every
+    offline one; an online backend only when its service is reachable."""
+    names = [n for n in available_backends() if n == DEFAULT_BACKEND or BACKENDS[n].offline]
+    if any(not BACKENDS[n].offline for n in names) and not online():
+        names = [n for n in names if BACKENDS[n].offline]
+    return names
+
+
+
+# =========================================================
+# SYNTHESIS
+# =========================================================
+SYNTH_POOL = ThreadPoolExecutor(
+    max_workers=int(os.environ.get("RIVERWOOD_TTS_WORKERS", min(4, os.cpu_count() or 1))),
+    thread_name_prefix="tts",
+)
+
+
+_inflight = {}     # cache key -> Future of the synthesis already running for it
+_inflight_lock = threading.Lock()
+
+
+def speak(text, lang="en", backend=None):
+    """Cached synthesis. Concurrent calls for the same clip (a reply,
+    prewarm and speculation) share one synthesis."""
+    engine = get_backend(backend)
+    key = TTS_CACHE.key(text, lang, engine.name, engine.ext)
+    audio = TTS_CACHE.get(key)
+    if audio is not None:
+        return audio
+    with _inflight_lock:
+        fut = _inflight.get(key)
+        owner = fut is None
+        if owner:
+            fut = _inflight[key] = Future()
+    if not owner:
+        return fut.result()
+    try:
+        audio = engine.synthesize(text, lang)
+        TTS_CACHE.put(key, audio)
+        fut.set_result(audio)
+        return audio
+    except BaseException as e:
+        fut.set_exception(e)
+        raise
+    finally:
+        with _inflight_lock:
+            _inflight.pop(key, None)
+
+
+def submit(text, lang="en", backend=None):
+    """Queue a sentence on the shared synthesis pool; returns a Future of bytes."""
+    return SYNTH_POOL.submit(speak, text, lang, backend)
+
+
+def join_audio(clips, backend=None):
+    """Concatenate clips from one backend into a single playable file."""
+    if get_backend(backend).mime != "audio/wav":
+        return b"".join(clips)  # MP3 frames concatenate as-is
+    out = io.BytesIO()
+    with wave.open(out, "wb") as w:
+        for i, clip in enumerate(clips):
+            with wave.open(io.BytesIO(clip), "rb") as r:
+                if i == 0:
+                    w.setparams(r.getparams())
+                w.writeframes(r.readframes(r.getnframes()))
+    return out.getvalue()
+
+
+def prewarm(phrases, backends=None):
+    """Synthesize (text, lang) pairs into the cache on a background thread,
+    for each of `backends` (default: prewarm_backends())."""
+    def run():
+        for backend in prewarm_backends() if backends is None else backends:
+            for text, lang in phrases:
+                try:
+                    speak(text, lang, backend)
+                except Exception:
+                    break  # offline or rate-limited: phrases are synthesized on demand
+
+    t = threading.Thread(target=run, name="tts-prewarm", daemon=True)
+    t.start()
+    return t
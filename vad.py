@@ -0,0 +1,132 @@
+import numpy as np
+
+
+# =========================================================
+# CONFIG
+# =========================================================
+RATE = 16000
+FRAME_MS = 30
+FRAME = RATE * FRAME_MS // 1000        # 480 samples
+MIN_DB = -45.0          # frames quieter than this (dBFS) are never speech (room noise sits at -50..-65)
+SILENT_DB = -90.0       # digital silence (muted mic, padding): left out of the noise-floor estimate
+SNR_DB = 10.0           # speech must be this far above the noise floor
+FRIC_DB = 5.0           # ...or this far above it with a high zero-crossing rate
+FRIC_ZCR = 0.25
+PAD_MS = 200            # kept around every speech region
+MERGE_MS = 300          # gaps shorter than this are bridged
+MIN_SPEECH_MS = 120     # shorter blips are dropped
+END_SILENCE_MS = 700    # trailing silence that ends an utterance in a live stream
+MIN_VOICED_MS = 240     # speech needed in a live stream before its end can be detected
+
+
+
+# =========================================================
+# FRAME CLASSIFICATION (energy + zero-crossing rate)
+# =========================================================
+def frame_features(pcm):
+    """Per-frame energy (dBFS) and zero-crossing rate for int16 PCM."""
+    n = len(pcm) // FRAME
+    if n == 0:
+        return np.empty(0, np.float32), np.empty(0, np.float32)
+    x = np.asarray(pcm[:n * FRAME], dtype=np.float32).reshape(n, FRAME) / 32768.0
+    db = 10.0 * np.log10(np.mean(x * x, axis=1) + 1e-10)
+    zcr = np.mean(np.signbit(x[:, 1:]) != np.signbit(x[:, :-1]), axis=1)
+    return db.astype(np.float32), zcr.astype(np.float32)
+
+
+def speech_frames(db, zcr, floor=None):
+    """Boolean speech mask; the noise floor defaults to the 10th percentile
+    of the frames that are not digital silence."""
+    if floor is None:
+        live = db[db > SILENT_DB] if db.size else db
+        floor = float(np.percentile(live, 10)) if live.size else MIN_DB
+    loud = db > max(floor + SNR_DB, MIN_DB)
+    fricative = (db > max(floor + FRIC_DB, MIN_DB)) & (zcr > FRIC_ZCR)
+    return loud | fricative
+
+
+def _runs(mask):
+    """(start, end) frame index pairs of True runs."""
+    edges = np.flatnonzero(np.diff(np.concatenate([[0], mask.astype(np.int8), [0]])))
+    return list(zip(edges[::2], edges[1::2]))
+
+
+
+# =========================================================
+# OFFLINE: trim + segment a whole recording
+# =========================================================
+def speech_segments(pcm):
+    """Sample ranges [(start, end), ...] that contain speech, padded and merged."""
+    db, zcr = frame_features(pcm)
+    if db.size == 0:
+        return []
+    pad, merge = PAD_MS // FRAME_MS, MERGE_MS // FRAME_MS
+    min_len = MIN_SPEECH_MS // FRAME_MS
+
+    segs = []
+    for s, e in _runs(speech_frames(db, zcr)):
+        if e - s < min_len:
+            continue
+        s, e = max(0, s - pad), min(db.size, e + pad)
+        if segs and s - segs[-1][1] <= merge:
+            segs[-1][1] = e
+        else:
+            segs.append([s, e])
+    last = len(pcm)
+    return [(s * FRAME, last if e == db.size else e * FRAME) for s, e in segs]
+
+
+def trim(pcm):
+    """Return (speech-only segments as views of pcm, stats dict)."""
+    segs = speech_segments(pcm)
+    kept = sum(e - s for s, e in segs)
+    stats = {
+        "audio_s": len(pcm) / RATE,
+        "speech_s": kept / RATE,
+        "segments": len(segs),
+        "skipped": 1.0 - kept / len(pcm) if len(pcm) else 0.0,
+    }
+    return [pcm[s:e] for s, e in segs], stats
+
+
+
+# =========================================================
+# LIVE: end-of-speech detection on a PCM stream
+# =========================================================
+class EndOfSpeech:
+    """Tracks a live stream and reports when an utterance has finished.
+
+    The noise floor is learned from the first frames and follows the quietest
+    recent audio; `feed` returns True once at least MIN_VOICED_MS of speech
+    was heard and has been followed by END_SILENCE_MS of non-speech, so a
+    click or a burst of noise before the user starts talking cannot end
+    the utterance.
+    """
+
+    def __init__(self, end_silence_ms=END_SILENCE_MS, min_voiced_ms=MIN_VOICED_MS):
+        self.end_frames = end_silence_ms // FRAME_MS
+        self.min_voiced = min_voiced_ms // FRAME_MS
+        self.reset()
+
+    def reset(self):
+        self.rest = np.empty(0, np.int16)
+        self.floor = None
+        self.voiced = 0
+        self.heard = False
+        self.silent = 0
+
+    def feed(self, pcm):
+        x = np.concatenate([self.rest, np.frombuffer(pcm, dtype="<i2")])
+        n = len(x) // FRAME * FRAME
+        self.rest = x[n:]
+        db, zcr = frame_features(x[:n])
+        for d, z in zip(db, zcr):
+            if d > SILENT_DB:
+                self.floor = d if self.floor is None else min(d, 0.995 * self.floor + 0.005 * d + 0.05)
+            if speech_frames(d, z, self.floor if self.floor is not None else MIN_DB):
+                self.voiced += 1
+                self.silent = 0
+                self.heard = self.heard or self.voiced >= self.min_voiced
+            elif self.heard:
+                self.silent += 1
+        return self.heard and self.silent >= self.end_frames
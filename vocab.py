@@ -0,0 +1,147 @@
+import functools
+import json
+import os
+import unicodedata
+from pathlib import Path
+
+from rapidfuzz import fuzz, process
+
+from intents import INTENTS
+
+
+# =========================================================
+# CONFIG
+# =========================================================
+GLOSSARY_FILE = os.environ.get("RIVERWOOD_GLOSSARY", "")   # extra site terms, one per line
+BIAS_CUTOFF = 88          # fuzz.ratio for snapping an open-decoding word onto a site term
+BIAS_MIN_LEN = 5          # shorter words are too ambiguous to correct
+
+# Site vocabulary the small Vosk models tend to miss, per model language
+GLOSSARY = {
+    "en": [
+        "shuttering", "blockwork", "brickwork", "formwork", "scaffold", "scaffolding", "rebar", "plaster",
+        "plastering", "curing", "concreting", "slab", "raft", "footing", "column", "beam", "lintel",
+        "conduit", "conduits", "lift shaft", "waterproofing", "mep", "ppe", "toolbox talk", "snag",
+        "handover", "tiles", "tiling", "cement", "steel", "bricks", "sand", "aggregate", "crane",
+        "mason", "masons", "carpenter", "carpenters", "electrician", "electricians", "site engineer",
+        "contractor", "milestone", "delay", "level", "tower", "podium", "basement",
+    ],
+    "hi": [
+        "काम", "आज", "कल", "अपडेट", "देरी", "स्टील", "सीमेंट", "ईंट", "टाइल", "बारिश", "मौसम",
+        "सुरक्षा", "मजदूर", "ठेकेदार", "स्लैब", "शटरिंग", "प्लास्टर", "साइट", "प्रगति", "डिलीवरी",
+    ],
+}
+
+# Words of command-style questions ("any delays today", "steel delivery status")
+COMMAND_WORDS = {
+    "en": (
+        "what is the are any how when where who which today tomorrow yesterday status update "
+        "next step steps site hours timing timings progress percentage overall team workers "
+        "weather rain safety contact number delivery arriving arrive late stuck blocked issue "
+        "project construction give me tell please about of on for in at"
+    ).split(),
+    "hi": "क्या है कब कहाँ कौन कितना कितने आज कल का की के में पर".split(),
+}
+
+
+
+# =========================================================
+# VOCABULARY (grammar + phrase biasing for one project version)
+# =========================================================
+def _phrase(text):
+    """Lowercase words of `text`: letters and combining marks kept (Devanagari
+    vowel signs and virama are marks), everything else is a separator."""
+    return " ".join("".join(c if unicodedata.category(c)[0] in "LM" else " " for c in text.lower()).split())
+
+
+def _stem(w):
+    for suffix in ("ings", "ing", "es", "ed", "s"):
+        if len(w) > len(suffix) + 2 and w.endswith(suffix):
+            return w[:-len(suffix)]
+    return w
+
+
+# every glossary term must come through tokenization whole
+_split = [w for words in GLOSSARY.values() for w in words if _phrase(w) != w]
+assert not _split, f"glossary terms split by _phrase: {_split}"
+
+
+def _memory_terms(mem):
+    """Names and nouns from project memory: material names, roles, people, milestones."""
+    out = []
+    for v in mem.values():
+        items = v.items() if isinstance(v, dict) else enumerate(v) if isinstance(v, list) else [(None, v)]
+        for k, x in items:
+            if isinstance(k, str):
+                out.append(k.replace("_", " "))
+            if isinstance(x, str) and len(x) <= 60:
+                out.append(x)
+    return out
+
+
+def _glossary_file():
+    if GLOSSARY_FILE and Path(GLOSSARY_FILE).exists():
+        return Path(GLOSSARY_FILE).read_text(encoding="utf-8").splitlines()
+    return []
+
+
+class Vocabulary:
+    """Domain phrases for one (language, project version).
+
+    * `grammar` is the JSON phrase list for a constrained KaldiRecognizer:
+      intent phrases, glossary, project names and question words, plus
+      "[unk]" so out-of-grammar speech is marked instead of forced.
+    * `bias(text)` snaps near-miss words of an open transcript onto site
+      terms ("shattering" -> "shuttering") and rejoins split compounds
+      ("block work" -> "blockwork"). Inflections of a term ("delays") are
+      left alone.
+    """
+
+    def __init__(self, lang, mem):
+        phrases = set()
+        for text in (
+            [p for ps in INTENTS.values() for p in ps] + GLOSSARY.get(lang, []) + _glossary_file()
+            + _memory_terms(mem) + COMMAND_WORDS.get(lang, [])
+        ):
+            p = _phrase(text)
+            if p:
+                phrases.add(p)
+                phrases.update(p.split())      # every word also on its own
+        self.lang = lang
+        self.phrases = sorted(phrases)
+        self.grammar = json.dumps(self.phrases + ["[unk]"], ensure_ascii=False)
+        site = {_phrase(t) for t in GLOSSARY.get(lang, []) + _glossary_file() + _memory_terms(mem)}
+        self.terms = sorted({w for t in site for w in t.split() if len(w) >= BIAS_MIN_LEN})
+        self.known = set(self.terms) | set(COMMAND_WORDS.get(lang, []))
+        self.stems = {_stem(w) for w in self.known}
+        self.term_set = set(self.terms)
+
+    def _snap(self, word):
+        if len(word) < BIAS_MIN_LEN or word in self.known or _stem(word) in self.stems:
+            return None
+        hit = process.extractOne(word, self.terms, scorer=fuzz.ratio, score_cutoff=BIAS_CUTOFF)
+        return hit[0] if hit and _stem(hit[0]) != _stem(word) else None
+
+    def bias(self, text):
+        """Return (corrected text, number of corrections)."""
+        words, out, fixes, i = text.split(), [], 0, 0
+        while i < len(words):
+            if i + 1 < len(words) and min(len(words[i]), len(words[i + 1])) >= 3:
+                # a site compound split in two ("block work"); exact terms only
+                joined = words[i] + words[i + 1]
+                if joined in self.term_set:
+                    out.append(joined)
+                    fixes += 1
+                    i += 2
+                    continue
+            snapped = self._snap(words[i])
+            out.append(snapped or words[i])
+            fixes += snapped is not None
+            i += 1
+        return " ".join(out), fixes
+
+
+@functools.lru_cache(maxsize=16)
+def project_vocabulary(store, pid, version, lang):
+    """Vocabulary (and grammar) for one project version; rebuilt only when the version moves."""
+    return Vocabulary(lang, store.get(pid)[1])